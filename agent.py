@@ -4,26 +4,34 @@ agent.py
 Defines multiple agent types for 2D navigation and pathfinding experiments.
 Agents differ in how they compute movement, including:
 - Standard A* search
-- Deferred (asynchronous) planning
+- Jump Point Search
+- Any-angle Theta* waypoints
+- D* Lite incremental replanning around moving obstacles
+- Deferred (asynchronous) planning, polled or through asyncio futures
 - Simple greedy motion
-- Flow-field navigation
+- Flow-field navigation, per agent or for a whole crowd at once
 - Hierarchical A*
 - Coordinated multi-agent planning with reservations
 
 Dependencies:
 - pygame (rendering)
+- numpy (crowd positions)
 - util (vector math)
 - area (collision and goal regions)
 - problem (navigation problem definitions)
-- search, hastar (pathfinding algorithms)
+- search, hastar, jps, theta, dstar (pathfinding algorithms)
 - flowField (flow-field navigation)
 - group (multi-agent coordination utilities)
+- spatial (shared obstacle index)
+- occupancy (crowd collision prefilter)
+- path (run-length encoded path storage)
 """
 
 
 import pygame
-import util, area
-import problem, search, flowField, hastar, group
+import numpy as np
+import util, area, spatial, path, occupancy
+import problem, search, flowField, hastar, group, jps, theta, dstar
 
 
 class Agent:
@@ -32,32 +40,39 @@ class Agent:
 
     Agents move continuously toward a goal while avoiding obstacles.
     Subclasses override path planning or movement behavior.
+
+    method is the planner used for each path request, any function taking a
+    problem and returning a list of movement vectors (optimal A*, that is
+    search.weighted_astar_search with w = 1, unless given another such as
+    search.default_search). The result is kept as a path.Path and consumed
+    one move per tick.
     """
     speed = 0.5
     count = 0
 
     
 
-    def __init__(self, pos, env, goal, color = (0,0,255)):
+    def __init__(self, pos, env, goal, color = (0,0,255), method = search.weighted_astar_search):
         self.pos = pos
         self.env = env
         self.goal = goal
         self.color = color
+        self.method = method
         self.index = Agent.count
         Agent.count += 1
-        self.path_cache = []
+        self.path_cache = path.Path()
         self.steps = 0
 
     def get_next_move(self) -> tuple:
         if len(self.path_cache) == 0:
             prob = problem.ContinuousNavigation(self.pos, self.env, self.goal)
-            self.path_cache = search.astar_search(prob)
+            self.path_cache = path.Path(self.method(prob))
             
 
         if len(self.path_cache) == 0:
             return (0, 0, 0)
 
-        return self.path_cache.pop(0) # type: ignore
+        return self.path_cache.pop()
 
         
     def update(self):
@@ -89,6 +104,95 @@ class Agent:
             hold_y += node[1]
             pygame.draw.circle(screen, (200,200,255), ((hold_x - offset[0]) * scale, (hold_y - offset[1]) * scale), 0.2 * scale)
 
+class JPSAgent(Agent):
+    """
+    Agent planning with Jump Point Search on the movement lattice.
+    """
+
+    def __init__(self, pos, env, goal, color = (0,0,255)):
+        super().__init__(pos, env, goal, color, method = jps.jps_search)
+
+
+class ThetaAgent(Agent):
+    """
+    Agent following any-angle Theta* waypoints.
+
+    path_cache holds absolute waypoints instead of movement vectors. The
+    agent moves straight at the next waypoint and lands exactly on it, which
+    keeps it on the segments Theta* checked for line of sight.
+    """
+
+    def __init__(self, pos, env, goal, color = (0,0,255)):
+        super().__init__(pos, env, goal, color, method = theta.theta_star_search)
+
+    def get_next_move(self):
+        if len(self.path_cache) == 0:
+            prob = problem.ContinuousNavigation(self.pos, self.env, self.goal)
+            self.path_cache = path.Path(self.method(prob))
+
+        if len(self.path_cache) == 0:
+            return (0, 0, 0)
+
+        waypoint = self.path_cache.peek()
+        dir = (waypoint[0] - self.pos[0], waypoint[1] - self.pos[1])
+        if util.length(dir) <= self.speed:
+            self.path_cache.pop()
+        return dir
+
+    def update(self):
+        if self.goal.check_collision(self.pos):
+            return True
+
+        self.steps += 1
+
+        dir = self.get_next_move()
+        if len(dir) == 3:
+            return False
+
+        dir_length = util.length(dir)
+        if dir_length <= self.speed:
+            self.pos = (self.pos[0] + dir[0], self.pos[1] + dir[1])
+        else:
+            self.pos = (self.pos[0] + (dir[0] / dir_length) * self.speed, self.pos[1] + (dir[1] / dir_length) * self.speed)
+        return False
+
+    def render(self, screen, offset, scale, render_path = False):
+        pygame.draw.circle(screen, self.color, ((self.pos[0] - offset[0]) * scale, (self.pos[1] - offset[1]) * scale), max(1, 0.5 * scale))
+
+        if not render_path:
+            return
+        last = self.pos
+        for waypoint in self.path_cache:
+            pygame.draw.line(screen, (200,200,255), ((last[0] - offset[0]) * scale, (last[1] - offset[1]) * scale), ((waypoint[0] - offset[0]) * scale, (waypoint[1] - offset[1]) * scale))
+            last = waypoint
+
+
+class DStarAgent(Agent):
+    """
+    Agent keeping a D* Lite planner for its whole trip.
+
+    Whenever the collision index logs obstacle changes the agent has not
+    seen (or its path runs out), the planner repairs its previous search
+    from the current position instead of planning from scratch.
+    """
+
+    def __init__(self, pos, env, goal, color = (0,0,255)):
+        super().__init__(pos, env, goal, color)
+        self.planner = None
+
+    def get_next_move(self):
+        if self.planner is None:
+            self.planner = dstar.DStarLite(problem.ContinuousNavigation(self.pos, self.env, self.goal))
+            self.path_cache = path.Path(self.planner.plan())
+        elif len(self.path_cache) == 0 or len(getattr(self.planner.problem.index, "changes", ())) != self.planner.seen_changes:
+            self.path_cache = path.Path(self.planner.plan(self.pos))
+
+        if len(self.path_cache) == 0:
+            return (0, 0, 0)
+
+        return self.path_cache.pop()
+
+
 class DefferedAgent(Agent):
     """
     Agent that defers path planning to an external path manager.
@@ -109,21 +213,21 @@ class DefferedAgent(Agent):
         self.color = color
         self.index = Agent.count
         Agent.count += 1
-        self.path_cache = []
+        self.path_cache = path.Path()
         self.steps = 0
 
     def get_next_move(self):
-        if len(self.path_cache) == 0 and not self.index in self.pather.waiting:
+        if self.index in self.pather.complete:
+            self.path_cache = self.pather.complete.pop(self.index)
+        elif len(self.path_cache) == 0 and not self.index in self.pather.waiting:
             prob = problem.ContinuousNavigation(self.pos, self.env, self.goal)
             self.pather.queue_path(self.index, prob)
-        elif self.index in self.pather.complete.keys():
-            self.path_cache = self.pather.complete[self.index]
             
 
         if len(self.path_cache) == 0:
             return (0, 0, 0)
 
-        return self.path_cache.pop(0)
+        return self.path_cache.pop()
 
         
 
@@ -146,6 +250,37 @@ class DefferedAgent(Agent):
 
 
 
+class PlanningAgent(DefferedAgent):
+    """
+    Deferred agent using the asyncio planning API of the path manager.
+
+    Instead of polling pather.waiting / pather.complete, the agent holds
+    the future returned by pather.plan, which writes the path into
+    path_cache when it resolves. Needs a running event loop with
+    pather.serve() scheduled.
+    """
+
+    def __init__(self, pos, env, goal, pather, color = (0,0,255)):
+        super().__init__(pos, env, goal, pather, color)
+        self.planning = None
+
+    def get_next_move(self):
+        if len(self.path_cache) == 0 and self.planning is None:
+            prob = problem.ContinuousNavigation(self.pos, self.env, self.goal)
+            self.planning = self.pather.plan(prob)
+            self.planning.add_done_callback(self.receive)
+
+        if len(self.path_cache) == 0:
+            return (0, 0, 0)
+
+        return self.path_cache.pop()
+
+    def receive(self, future):
+        self.planning = None
+        if not future.cancelled():
+            self.path_cache = future.result()
+
+
 class simpleAgent(Agent):
     """
     Very simple greedy agent that moves directly toward the goal center.
@@ -164,7 +299,7 @@ class simpleAgent(Agent):
         self.steps = 0
         
         Agent.count += 1
-        self.path_cache = []
+        self.path_cache = path.Path()
         
 
     def get_next_move(self):
@@ -188,9 +323,8 @@ class simpleAgent(Agent):
         
         self.steps += 1
 
-        for i in self.env:
-            if i.check_collision(self.pos):
-                return True
+        if spatial.get_index(self.env).check_collision(self.pos):
+            return True
         
         dir = self.get_next_move()
         if len(dir) == 3:
@@ -220,7 +354,7 @@ class FlowAgent(Agent):
         self.color = color
         self.index = Agent.count
         Agent.count += 1
-        self.path_cache = []
+        self.path_cache = path.Path()
         self.steps = 0
 
     
@@ -240,44 +374,168 @@ class FlowAgent(Agent):
         dir_length = util.length(dir)
         self.pos = (self.pos[0] + (dir[0] / dir_length) * self.speed, self.pos[1] + (dir[1] / dir_length) * self.speed)
 
-        for object in self.env:
-            if object.check_collision(self.pos):
-                center = object.get_center()
-                if abs(center[0] - self.pos[0]) > abs(center[1] - self.pos[1]):
-                    self.pos = (self.pos[0], self.pos[1] + -2 * dir[1])
-                else:
-                    self.pos = (self.pos[0] + -2 * dir[0], self.pos[1])
-                break
+        object = spatial.get_index(self.env).first_collision(self.pos)
+        if object is not None:
+            center = object.get_center()
+            if abs(center[0] - self.pos[0]) > abs(center[1] - self.pos[1]):
+                self.pos = (self.pos[0], self.pos[1] + -2 * dir[1])
+            else:
+                self.pos = (self.pos[0] + -2 * dir[0], self.pos[1])
 
         return False
 
 
+class FlowCrowd:
+    """
+    FlowAgents sharing one flow field and goal, updated together.
+
+    Positions are kept in one array and the field is sampled once per tick
+    with get_moves_at. Goal and obstacle checks run on arrays too (goal
+    bounds and the occupancy grid), and only agents they flag get the
+    exact per-agent checks. Every agent follows the same rules as
+    FlowAgent.update.
+
+    Attributes:
+        agents (list[FlowAgent]): Agents of the crowd, written back by sync().
+        flow (FlowField | SectorFlowField): Field the agents follow.
+        pos (np.ndarray): (N, 2) agent positions.
+        steps (np.ndarray): Steps taken by each agent.
+        active (np.ndarray): Agents that have not reached the goal.
+        grid (occupancy.OccupancyGrid): Conservative raster of the obstacles.
+        seen_changes (int): Entries of the index change log the grid reflects.
+    """
+
+    def __init__(self, agents : list[FlowAgent]):
+        if len(agents) == 0:
+            raise ValueError("FlowCrowd needs at least one agent to take its field and goal from")
+        self.agents = agents
+        self.env = agents[0].env
+        self.goal = agents[0].goal
+        self.flow = agents[0].flow
+        self.speed = agents[0].speed
+        self.pos = np.array([agent.pos for agent in agents], dtype=np.float64).reshape(-1, 2)
+        self.steps = np.array([agent.steps for agent in agents], dtype=np.int64)
+        self.active = np.ones(len(agents), dtype=bool)
+        self.index = spatial.get_index(self.env)
+        self.grid = self.env if isinstance(self.env, occupancy.OccupancyGrid) else occupancy.get_grid(self.env)
+        self.seen_changes = len(getattr(self.index, "changes", ()))
+
+    def in_goal(self, pos) -> np.ndarray:
+        bounds = self.goal.get_bounds()
+        if bounds is None:
+            return np.array([self.goal.check_collision((x, y)) for x, y in pos.tolist()], dtype=bool)
+        near = (pos[:, 0] >= bounds[0]) & (pos[:, 0] <= bounds[2]) & (pos[:, 1] >= bounds[1]) & (pos[:, 1] <= bounds[3])
+        for i in np.flatnonzero(near):
+            near[i] = self.goal.check_collision((pos[i, 0], pos[i, 1]))
+        return near
+
+    def update(self) -> np.ndarray:
+        """
+        Moves every active agent one step.
+
+        Returns:
+            np.ndarray: Indices of the agents that reached the goal this tick.
+        """
+        changes = len(getattr(self.index, "changes", ()))
+        if changes != self.seen_changes:
+            # Obstacles moved since the grid was rasterized
+            self.grid = occupancy.OccupancyGrid(self.env)
+            self.seen_changes = changes
+
+        moving = np.flatnonzero(self.active)
+        pos = self.pos[moving]
+        done = self.in_goal(pos)
+        finished = moving[done]
+        self.active[finished] = False
+        moving = moving[~done]
+        pos = pos[~done]
+        self.steps[moving] += 1
+
+        dirs = self.flow.get_moves_at(pos)
+        # Agents on NaN rows have no direction and stand still
+        has_dir = ~np.isnan(dirs[:, 0])
+        moving = moving[has_dir]
+        dirs = dirs[has_dir]
+        pos = pos[has_dir]
+        length = np.sqrt(dirs[:, 0] ** 2 + dirs[:, 1] ** 2)
+        pos[:, 0] += (dirs[:, 0] / length) * self.speed
+        pos[:, 1] += (dirs[:, 1] / length) * self.speed
+
+        for i in np.flatnonzero(self.grid.check_points(pos)):
+            obstacle = self.index.first_collision((pos[i, 0], pos[i, 1]))
+            if obstacle is not None:
+                center = obstacle.get_center()
+                if abs(center[0] - pos[i, 0]) > abs(center[1] - pos[i, 1]):
+                    pos[i, 1] += -2 * dirs[i, 1]
+                else:
+                    pos[i, 0] += -2 * dirs[i, 0]
+
+        self.pos[moving] = pos
+        return finished
+
+    def sync(self):
+        """Writes positions and step counts back into the FlowAgent objects."""
+        for agent, (x, y), steps in zip(self.agents, self.pos.tolist(), self.steps.tolist()):
+            agent.pos = (x, y)
+            agent.steps = steps
+
+
 class HAAgent(Agent):
     """
-    Agent using hierarchical A* for pathfinding.
+    Agent using hierarchical A* for pathfinding, over the environment's
+    shared HPA* graph or, with abstract=False, a coarse grid search.
+    With a hastar.SegmentPool, its segments are refined in parallel.
+
+    With lazy=True (and no pool), segments are refined one at a time from
+    hastar.stream_hierarchical_astar as the agent comes within lookahead
+    moves of the end of its refined path, so the first move only waits
+    for the first segment and segments never walked are never searched.
+
+    Attributes:
+        path_cache (path.Path): Refined moves not yet taken.
+        segments (generator): Segments of the current plan not yet refined,
+            None once the plan is exhausted.
+        lazy (bool): Refine segments on demand instead of all at once.
+        lookahead (int): Moves left at which the next segment is refined.
     """
     speed = 0.5
     count = 0
 
-    def __init__(self, pos, env, goal, color=(0, 0, 255)):
+    def __init__(self, pos, env, goal, color=(0, 0, 255), abstract = True, pool = None, lazy = True, lookahead = 8):
         self.pos = pos
         self.env = env
         self.goal = goal
         self.color = color
+        self.abstract = abstract
+        self.pool = pool
+        self.lazy = lazy and pool is None
+        self.lookahead = lookahead
         self.index = HAAgent.count
         HAAgent.count += 1
-        self.path_cache = []
+        self.path_cache = path.Path()
+        self.segments = None
         self.steps = 0
 
     def get_next_move(self):
-        if len(self.path_cache) == 0:
+        if len(self.path_cache) == 0 and self.segments is None:
             prob = problem.ContinuousNavigation(self.pos, self.env, self.goal)
-            self.path_cache = hastar.hierarchical_astar_search(prob)
+            if self.lazy:
+                self.segments = hastar.stream_hierarchical_astar(prob, abstract = self.abstract)
+            else:
+                self.path_cache = path.Path(hastar.hierarchical_astar_search(prob, abstract = self.abstract, pool = self.pool))
+
+        # Refine the next segment only once the agent nears the end of the refined path
+        while self.segments is not None and len(self.path_cache) <= self.lookahead:
+            segment = next(self.segments, None)
+            if segment is None:
+                self.segments = None
+            else:
+                self.path_cache.extend(segment)
 
         if len(self.path_cache) == 0:
             return (0, 0, 0)
 
-        return self.path_cache.pop(0)
+        return self.path_cache.pop()
 
     def update(self):
         if self.goal.check_collision(self.pos):
@@ -312,7 +570,7 @@ class CoordinatedAgent(Agent):
         self.color = color
         self.index = CoordinatedAgent.count
         CoordinatedAgent.count += 1
-        self.path_cache = []
+        self.path_cache = path.Path()
         self.steps = 0
         self.time_step = 0  # Tracks time for reservation system
 
@@ -320,19 +578,19 @@ class CoordinatedAgent(Agent):
         if len(self.path_cache) == 0:
             prob = problem.ContinuousNavigation(self.pos, self.env, self.goal)
 
-            # Run standard A*
-            calculated_path = search.astar_search(prob)
+            # Run optimal A*
+            calculated_path = search.weighted_astar_search(prob)
 
             if calculated_path:
                 # Reserve the entire path in the global system
                 group.ReservationSystem.reserve_path(self.index, calculated_path, self.pos)
-                self.path_cache = calculated_path
+                self.path_cache = path.Path(calculated_path)
 
             if len(self.path_cache) == 0:
                 return (0, 0, 0)
 
         # Look at the next move in the cache
-        next_move = self.path_cache[0]
+        next_move = self.path_cache.peek()
 
         # Calculate the potential next position
         dir_length = util.length(next_move)
@@ -349,7 +607,7 @@ class CoordinatedAgent(Agent):
             return (0, 0, 0)  # Use the "no move" sentinel
 
         # Move is clear, pop it and return
-        return self.path_cache.pop(0)
+        return self.path_cache.pop()
 
     def update(self):
         if self.goal.check_collision(self.pos):
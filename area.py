@@ -8,9 +8,11 @@ Areas provide a unified interface for:
 - Collision checks
 - Center queries
 - Nearest-point queries
+- Bounding box queries
 - Rendering
 
-Concrete implementations include rectangular and circular areas.
+Concrete implementations include rectangular and circular areas, and a
+rectangle that moves on update() for dynamic environments.
 """
 
 import pygame
@@ -43,6 +45,10 @@ class Area:
     def get_nearest(self, pos) -> tuple[float, float]:
         pass
 
+    @abstractmethod
+    def get_bounds(self) -> tuple[float, float, float, float]:
+        pass
+
     @abstractmethod
     def update(self) -> None:
         pass
@@ -68,7 +74,11 @@ class RectArea(Area):
         return (self.pos[0] + self.size[0] / 2, self.pos[1] + self.size[1] / 2)
 
     def get_nearest(self, pos):
-        pass
+        return (min(max(pos[0], self.pos[0]), self.pos[0] + self.size[0]),
+                min(max(pos[1], self.pos[1]), self.pos[1] + self.size[1]))
+
+    def get_bounds(self):
+        return (self.pos[0], self.pos[1], self.pos[0] + self.size[0], self.pos[1] + self.size[1])
 
     def update(self):
         pass
@@ -97,7 +107,14 @@ class CircleArea(Area):
 
     def get_nearest(self, pos):
         #nearest is just direction from center to pos scaled to radius plus center
-        pass
+        offset = (pos[0] - self.center[0], pos[1] - self.center[1])
+        dist = math.sqrt(offset[0] ** 2 + offset[1] ** 2)
+        if dist <= self.radius:
+            return pos
+        return (self.center[0] + offset[0] / dist * self.radius, self.center[1] + offset[1] / dist * self.radius)
+
+    def get_bounds(self):
+        return (self.center[0] - self.radius, self.center[1] - self.radius, self.center[0] + self.radius, self.center[1] + self.radius)
 
     def update(self):
         pass
@@ -107,5 +124,24 @@ class CircleArea(Area):
         pygame.draw.circle(screen, self.color, ((self.center[0] - offset[0]) * scale, (self.center[1] - offset[1]) * scale), self.radius * scale)
 
 
+class MovingRectArea(RectArea):
+    """
+    Rectangular obstacle sliding back and forth along a fixed offset.
 
+    Each update() moves it by velocity, reversing when it has travelled
+    span units from its starting position. Environments holding moving
+    areas must call SpatialIndex.update(area, old_bounds) after update().
+    """
+    def __init__(self, pos, size, color, velocity = (0, 1), span = 10):
+        super().__init__(pos, size, color)
+        self.origin = pos
+        self.velocity = velocity
+        self.span = span
+        self.travelled = 0
 
+    def update(self):
+        if self.travelled + math.hypot(*self.velocity) > self.span:
+            self.velocity = (-self.velocity[0], -self.velocity[1])
+            self.travelled = 0
+        self.pos = (self.pos[0] + self.velocity[0], self.pos[1] + self.velocity[1])
+        self.travelled += math.hypot(*self.velocity)
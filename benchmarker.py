@@ -10,12 +10,12 @@ This module:
 - Runs time-stepped simulations
 - Reports completion statistics and performance metrics
 
-Used to compare A*, flow-field, hierarchical A*, and coordinated agents
+Used to compare A*, JPS, Theta*, D* Lite, flow-field (full and sectorized), hierarchical A*, and coordinated agents
 under varying environment densities and scales.
 """
 
-import time, random
-import area, agent, flowField, pathfinder, search
+import time, math, random, itertools, functools, tracemalloc, asyncio, os, shutil, tempfile
+import area, agent, flowField, sectorFlow, pathfinder, search, spatial, occupancy, problem, path, dstar, hastar, store
 
 def generate_env_A():
     env_state = []
@@ -49,75 +49,905 @@ def generate_density_env(dist=200, density = 30):
 
     return env_state, goal, (0, 0, 50, dist/2), (0, 0, dist, dist/2) 
 
+def generate_moving_env(dist=200, density = 30, movers = 4, span = 10):
+    """
+    Density environment where movers random obstacles slide up and down
+    by span units, one unit per update.
+    """
+    env_state, goal, start_region, region = generate_density_env(dist = dist, density = density)
+    for i in random.sample(range(len(env_state)), min(movers, len(env_state))):
+        obstacle = env_state[i]
+        env_state[i] = area.MovingRectArea(obstacle.pos, obstacle.size, obstacle.color, velocity = (0, 1), span = span)
+    return env_state, goal, start_region, region
+
+def move_obstacles(env_state, index):
+    """Steps every MovingRectArea once and logs the move in the collision index."""
+    for obstacle in env_state:
+        if isinstance(obstacle, area.MovingRectArea):
+            old_bounds = obstacle.get_bounds()
+            obstacle.update()
+            index.update(obstacle, old_bounds)
+
 def main():
     envs = ["Density"]
-    agent_types = ["Simple", "Flow", "HAstar", "Group", "Astar"] # "Astar", "Simple"
+    agent_types = ["Simple", "Flow", "HAstar", "Group", "Astar"] # "Astar", "Simple", "FlowBFS", "SectorFlow", "JPS", "BiAstar", "Theta", "Deffered", "Planning", "DStar", "HAstarGrid"
     agent_counts = [1] #10, 100, 1000] #[1, 10, 100, 1000, 10000, 100_000]
-    dists = [200, 400]#, 800, 1600]
+    dists = [200, 400]#, 800, 1200, 1600]
     densities = [35]#[27, 30, 35, 40, 50, 100, 200]
+    backends = ["Exact"] # "Exact", "Grid"
+    quanta = [0.25] # None, 0.1, 0.25, 0.5
+    weights = [None] # None or 1 (optimal A*), search.DEFAULT_WEIGHT (search.default_search), 1.5, 2, 5, also used by BiAstar
+    worker_counts = [None] # None (main thread), 1, 2, 4, 8, only used by Deffered, Planning, HAstar and HAstarGrid
+    batch_modes = [True] # False (FlowAgent.update per agent), True (agent.FlowCrowd), only used by Flow, FlowBFS and SectorFlow
+
+    for env, agent_type, agent_count, dist, density, backend, quantum, weight, workers, batch in itertools.product(envs, agent_types, agent_counts, dists, densities, backends, quanta, weights, worker_counts, batch_modes):
+        time_taken, total_finished, average_steps, stats = run_bench(env, agent_type, agent_count, dist, density, max_steps = dist * 100, backend = backend, quantum = quantum, weight = weight, workers = workers, batch = batch)
+
+        print("----- Benchmark Result -----")
+        print(f"Environment     : {env}")
+        print(f"Agent Type      : {agent_type}")
+        print(f"Agent Count     : {agent_count}")
+        print(f"Env Scale       : {dist}")
+        print(f"Env Density     : {density}")
+        print(f"Collision       : {backend}")
+        print(f"State Quantum   : {quantum}")
+        print(f"A* Weight       : {weight}")
+        print(f"Path Workers    : {workers}")
+        print(f"Batched Flow    : {batch}")
+        print(f"Time Taken      : {(time_taken / 1_000_000_000):.3f} s")
+        print(f"Total Finished  : {total_finished}")
+        print(f"Average Steps   : {average_steps:.2f}")
+        print(f"Obstacles       : {stats['obstacles']}")
+        print(f"Index Build     : {(stats['build_time'] / 1_000_000):.3f} ms")
+        print(f"Index Queries   : {stats['queries']}")
+        print(f"Checks / Query  : {stats['checks_per_query']:.2f}")
+        print(f"Search Time     : {stats['search_time']:.3f} s")
+        print(f"Expansions      : {stats['expansions']}")
+        print(f"Expansions / s  : {stats['expansions_per_second']:.0f}")
+        print(f"Expansions / Q  : {stats['expansions_per_query']:.1f}")
+        print(f"Path Moves / Q  : {stats['moves_per_query']:.1f}")
+        if "pather_requests" in stats:
+            print(f"Path Requests   : {stats['pather_requests']}")
+            print(f"Path Searches   : {stats['pather_searches']}")
+            print(f"Max Queue Depth : {stats['pather_max_queue_depth']}")
+            print(f"Dedupe Rate     : {stats['pather_dedupe_rate']:.2f}")
+            print(f"Unclear Reuses  : {stats['pather_unclear']}")
+            print(f"Avg Wait        : {(stats['pather_avg_wait'] / 1_000_000):.1f} ms")
+            print(f"Max Wait        : {(stats['pather_max_wait'] / 1_000_000):.1f} ms")
+        if "hastar_segment_hits" in stats:
+            print(f"Waypoint Cache  : {stats['hastar_waypoint_hit_rate']:.2f} hit rate, {stats['hastar_waypoint_entries']} held, {stats['hastar_waypoint_evictions']} evicted")
+            print(f"Segment Cache   : {stats['hastar_segment_hit_rate']:.2f} hit rate, {stats['hastar_segment_entries']} held, {stats['hastar_segment_evictions']} evicted, {stats['hastar_segment_unclear']} unclear")
+        print("----------------------------\n")
+
+    memory_dists = [200] # 400, 800
+    memory_queries = 3
+
+    for env, dist, density, weight in itertools.product(envs, memory_dists, densities, weights):
+        results = memory_bench(env, dist, density, memory_queries, weight)
+
+        print("----- Memory Result -----")
+        print(f"Environment     : {env}")
+        print(f"Env Scale       : {dist}")
+        print(f"Env Density     : {density}")
+        print(f"A* Weight       : {weight}")
+        print(f"Queries         : {memory_queries}")
+        for kind, label in (("dict", "Dict Node"), ("slots", "Slotted Node")):
+            print(f"{label:16s}: {(results[kind + '_peak'] / 1024):.0f} KB / query, {results[kind + '_per_expansion']:.0f} B / expand, {results[kind + '_per_node']:.0f} B / node")
+        print("-------------------------\n")
+
+    flow_dists = [200, 400] # 800, 1600
+    flow_samples = 100_000
+
+    for env, dist, density in itertools.product(envs, flow_dists, densities):
+        build_ms, peak, field_bytes, sample_ns = flow_bench(env, dist, density, flow_samples)
+
+        print("----- Flow Field Result -----")
+        print(f"Environment     : {env}")
+        print(f"Env Scale       : {dist}")
+        print(f"Env Density     : {density}")
+        print(f"Build Time      : {build_ms:.2f} ms")
+        print(f"Build Peak      : {(peak / 1024):.0f} KB")
+        print(f"Field Size      : {(field_bytes / 1024):.0f} KB")
+        print(f"Sample Time     : {sample_ns:.0f} ns")
+        print("-----------------------------\n")
+
+    goal_counts = [8] # 1, 32
+    goal_agents = 200
+    pool_sizes = [0, 16 * 1024 * 1024] # 0 (fit every request), bytes of fields kept
+
+    for env, dist, density, goal_count, max_bytes in itertools.product(envs, memory_dists, densities, goal_counts, pool_sizes):
+        setup_ms, pool_stats, finished, average_steps = goal_bench(env, dist, density, goal_count, goal_agents, max_bytes, max_steps = dist * 100)
+
+        print("----- Flow Pool Result -----")
+        print(f"Environment     : {env}")
+        print(f"Env Scale       : {dist}")
+        print(f"Env Density     : {density}")
+        print(f"Goals           : {goal_count}")
+        print(f"Agents          : {goal_agents}")
+        print(f"Pool Bytes      : {max_bytes}")
+        print(f"Field Setup     : {setup_ms:.1f} ms")
+        print(f"Hit Rate        : {pool_stats['hit_rate']:.2f}")
+        print(f"Fields Held     : {pool_stats['fields']}")
+        print(f"Bytes Held      : {(pool_stats['bytes'] / 1024):.0f} KB")
+        print(f"Evictions       : {pool_stats['evictions']}")
+        print(f"Total Finished  : {finished}")
+        print(f"Average Steps   : {average_steps:.2f}")
+        print("----------------------------\n")
+
+    sector_dists = [1600] # 3200
+    sector_agents = [1, 10]
+    sector_sizes = [50] # 25, lattice steps along a sector side
+    max_sectors = 64
+
+    for env, dist, density, agent_count, sector_nodes in itertools.product(envs, sector_dists, densities, sector_agents, sector_sizes):
+        results = sector_bench(env, dist, density, agent_count, sector_nodes, max_sectors, max_steps = dist * 100)
+
+        print("----- Sector Flow Result -----")
+        print(f"Environment     : {env}")
+        print(f"Env Scale       : {dist}")
+        print(f"Env Density     : {density}")
+        print(f"Agents          : {agent_count}")
+        print(f"Sector Nodes    : {sector_nodes}")
+        print(f"Full Time       : {results['full_time']:.3f} s, {results['full_finished']} finished, {results['full_steps']:.1f} avg steps")
+        print(f"Sector Time     : {results['sector_time']:.3f} s, {results['sector_finished']} finished, {results['sector_steps']:.1f} avg steps")
+        print(f"Full Bytes      : {(results['full_bytes'] / 1024):.0f} KB")
+        print(f"Sector Bytes    : {(results['sector_bytes'] / 1024):.0f} KB peak")
+        print(f"Sector Builds   : {results['sector_builds']}, {results['sector_evictions']} evicted")
+        print("------------------------------\n")
+
+    crowd_counts = [1000, 10_000] # 100_000
+    crowd_ticks = 20
+
+    for env, dist, density, agent_count in itertools.product(envs, memory_dists, densities, crowd_counts):
+        single_ms, batch_ms, drift = crowd_bench(env, dist, density, agent_count, crowd_ticks)
+
+        print("----- Flow Crowd Result -----")
+        print(f"Environment     : {env}")
+        print(f"Env Scale       : {dist}")
+        print(f"Env Density     : {density}")
+        print(f"Agents          : {agent_count}")
+        print(f"Ticks           : {crowd_ticks}")
+        print(f"Per Agent Tick  : {single_ms:.2f} ms")
+        print(f"Batched Tick    : {batch_ms:.2f} ms")
+        print(f"Speedup         : {single_ms / batch_ms:.1f}x")
+        print(f"Max Drift       : {drift:.2e}")
+        print("-----------------------------\n")
+
+    hpa_dists = [400, 1600] # 200, 800
+    hpa_queries = 100
+
+    for env, dist, density in itertools.product(envs, hpa_dists, densities):
+        results = hpa_bench(env, dist, density, hpa_queries)
 
-    for env in envs:
-        for agent_type in agent_types:
-            for agent_count in agent_counts:
-                for dist in dists:
-                    for density in densities:
-                        time_taken, total_finished, average_steps = run_bench(env, agent_type, agent_count, dist, density, max_steps = dist * 100)
-
-                        print("----- Benchmark Result -----")
-                        print(f"Environment     : {env}")
-                        print(f"Agent Type      : {agent_type}")
-                        print(f"Agent Count     : {agent_count}")
-                        print(f"Env Scale       : {dist}")
-                        print(f"Env Density     : {density}")
-                        print(f"Time Taken      : {(time_taken / 1_000_000_000):.3f} s")
-                        print(f"Total Finished  : {total_finished}")
-                        print(f"Average Steps   : {average_steps:.2f}")
-                        print("----------------------------\n")
+        print("----- HPA* Graph Result -----")
+        print(f"Environment     : {env}")
+        print(f"Env Scale       : {dist}")
+        print(f"Env Density     : {density}")
+        print(f"Queries         : {hpa_queries}")
+        print(f"Graph Build     : {results['build']:.1f} ms")
+        print(f"Graph Size      : {results['nodes']} nodes, {results['edges']} edges")
+        print(f"Grid Query      : {results['grid_query']:.2f} ms")
+        print(f"HPA* Query      : {results['hpa_query']:.2f} ms")
+        print(f"Tree Expansions : {results['expansions_per_query']:.1f} / query")
+        print("-----------------------------\n")
+
+    segment_dists = [800] # 1600
+    segment_queries = 3
+    segment_workers = [] # 2, 4, 8, off until the speedup is measured on a multi-core machine
+
+    for env, dist, density, workers in itertools.product(envs, segment_dists, densities, segment_workers):
+        results = segment_bench(env, dist, density, segment_queries, workers)
+
+        print("----- Parallel Segment Result -----")
+        print(f"Environment     : {env}")
+        print(f"Env Scale       : {dist}")
+        print(f"Env Density     : {density}")
+        print(f"Workers         : {workers}")
+        print(f"Segments / Q    : {results['segments']:.1f}")
+        print(f"Serial Query    : {results['serial']:.1f} ms")
+        print(f"Parallel Query  : {results['parallel']:.1f} ms")
+        print("-----------------------------------\n")
+
+    stream_dists = [800] # 1600
+    stream_agents = 10
+    stream_ticks = 100 # 1000, long enough for most agents to finish
+
+    for env, dist, density in itertools.product(envs, stream_dists, densities):
+        results = stream_bench(env, dist, density, stream_agents, stream_ticks)
+
+        print("----- Lazy Segment Result -----")
+        print(f"Environment     : {env}")
+        print(f"Env Scale       : {dist}")
+        print(f"Env Density     : {density}")
+        print(f"Agents          : {stream_agents}")
+        print(f"Ticks           : {stream_ticks}")
+        print(f"Eager First     : {results['eager_first']:.1f} ms")
+        print(f"Lazy First      : {results['lazy_first']:.1f} ms")
+        print(f"Eager Total     : {results['eager_total']:.1f} ms, {results['eager_segments']} segments")
+        print(f"Lazy Total      : {results['lazy_total']:.1f} ms, {results['lazy_segments']} segments")
+        print("-------------------------------\n")
+
+    store_dists = [400] # 800, 1600
+    store_queries = 10
+    store_root = os.path.join(tempfile.gettempdir(), "bench_store")
+
+    for env, dist, density in itertools.product(envs, store_dists, densities):
+        results = store_bench(env, dist, density, store_queries, store_root)
+
+        print("----- Precompute Store Result -----")
+        print(f"Environment     : {env}")
+        print(f"Env Scale       : {dist}")
+        print(f"Env Density     : {density}")
+        print(f"HA* Queries     : {store_queries}")
+        print(f"Field Cold      : {results['cold_field']:.1f} ms")
+        print(f"Field Warm      : {results['warm_field']:.1f} ms")
+        print(f"HA* Cold        : {results['cold_hastar']:.1f} ms")
+        print(f"HA* Warm        : {results['warm_hastar']:.1f} ms")
+        print(f"Store Size      : {(results['bytes'] / 1024):.0f} KB")
+        print("-----------------------------------\n")
+
+    moving_counts = [4] # 16, 64
+    moving_updates = 10
+    moving_walk = 20
+    moving_agents = 4
+
+    for dist, density, movers in itertools.product(memory_dists, densities, moving_counts):
+        results = moving_bench(dist, density, movers, moving_updates, moving_walk, moving_agents)
+
+        print("----- Moving Obstacle Result -----")
+        print(f"Env Scale       : {dist}")
+        print(f"Env Density     : {density}")
+        print(f"Moving Obstacles: {movers}")
+        print(f"Updates         : {moving_updates}")
+        print(f"Moves / Update  : {moving_walk}")
+        print(f"D* Repair       : {results['repair_ms']:.2f} ms, {results['repair_expansions']:.0f} expansions")
+        print(f"D* Full Replan  : {results['dstar_ms']:.2f} ms, {results['dstar_expansions']:.0f} expansions")
+        print(f"A* Full Replan  : {results['astar_ms']:.2f} ms, {results['astar_expansions']:.0f} expansions")
+        print(f"D* Agents       : {results['agent_finished']} / {moving_agents} finished, {results['agent_steps']:.1f} steps, {results['agent_ms']:.0f} ms")
+        print("----------------------------------\n")
+
+    frame_agents = 10
+    frame_budgets = [None, 8_000_000] # None (one whole search per frame), nanoseconds of search per frame
+
+    for env, dist, density, frame_budget in itertools.product(envs, memory_dists, densities, frame_budgets):
+        p50, p99, worst, frames, finished = frame_bench(env, frame_agents, dist, density, frame_budget)
+
+        print("----- Frame Time Result -----")
+        print(f"Environment     : {env}")
+        print(f"Env Scale       : {dist}")
+        print(f"Env Density     : {density}")
+        print(f"Agents          : {frame_agents}")
+        print(f"Frame Budget    : {frame_budget}")
+        print(f"Frames          : {frames}")
+        print(f"Total Finished  : {finished}")
+        print(f"p50 Frame       : {p50:.2f} ms")
+        print(f"p99 Frame       : {p99:.2f} ms")
+        print(f"Max Frame       : {worst:.2f} ms")
+        print("-----------------------------\n")
+
+    path_agents = 1000 # 10_000
+
+    for env, dist, density in itertools.product(envs, memory_dists, densities):
+        list_bytes, path_bytes, list_walk, path_walk = path_bench(env, dist, density, path_agents)
+
+        print("----- Path Storage Result -----")
+        print(f"Environment     : {env}")
+        print(f"Env Scale       : {dist}")
+        print(f"Env Density     : {density}")
+        print(f"Agents          : {path_agents}")
+        print(f"List Bytes / A  : {list_bytes:.0f}")
+        print(f"Path Bytes / A  : {path_bytes:.0f}")
+        print(f"List Walk / A   : {(list_walk / 1000):.1f} us")
+        print(f"Path Walk / A   : {(path_walk / 1000):.1f} us")
+        print("-------------------------------\n")
     
 
-def run_bench(env_select, agent_select, agent_count, dist, density, max_steps=10000):
+def run_bench(env_select, agent_select, agent_count, dist, density, max_steps=10000, backend="Exact", quantum=problem.ContinuousNavigation.QUANTUM, weight=None, workers=None, batch=False):
 
     match env_select:
         case "Density":
             env_state, goal, start_region, region = generate_density_env(dist = dist, density = density)
+
+    # Drop indexes from earlier runs and build this environment's up front
+    spatial.clear_cache()
+    occupancy.clear_cache()
+    flowField.clear_cache()
+    hastar.clear_graphs()
+    hastar.clear_caches()
+    if backend == "Grid":
+        env_state = occupancy.get_grid(env_state, resolution = 2)
+    index = spatial.get_index(env_state)
+    search.reset_stats()
+    # Restored afterwards so later runs and their worker processes get the default back
+    old_quantum = problem.ContinuousNavigation.QUANTUM
+    problem.ContinuousNavigation.QUANTUM = quantum
+    try:
+        agents = []
+        flow = None
+        pather = None
+        segment_pool = None
+        method = search.weighted_astar_search
+        if weight is not None:
+            method = functools.partial(search.weighted_astar_search, w = weight)
+        match agent_select:
+            case "Astar":
+                for i in range(agent_count):
+                    agents.append(agent.Agent((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, goal, method = method))
+            case "BiAstar":
+                method = functools.partial(search.bidirectional_astar_search, w = weight or 1)
+                for i in range(agent_count):
+                    agents.append(agent.Agent((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, goal, method = method))
+            case "Deffered":
+                pather = pathfinder.Pathfinder(method, workers = workers)
+                for i in range(agent_count):
+                    agents.append(agent.DefferedAgent((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, goal, pather))
+            case "Planning":
+                pather = pathfinder.Pathfinder(method, workers = workers)
+                for i in range(agent_count):
+                    agents.append(agent.PlanningAgent((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, goal, pather))
+            case "DStar":
+                for i in range(agent_count):
+                    agents.append(agent.DStarAgent((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, goal))
+            case "Theta":
+                for i in range(agent_count):
+                    agents.append(agent.ThetaAgent((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, goal))
+            case "JPS":
+                for i in range(agent_count):
+                    agents.append(agent.JPSAgent((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, goal))
+            case "Simple":
+                for i in range(agent_count):
+                    agents.append(agent.simpleAgent((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, goal))
+            case "Flow":
+                flow = flowField.get_field(goal, env_state, density = 2, region = region)
+                for i in range(agent_count):
+                    agents.append(agent.FlowAgent((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, goal, flow))
+            case "SectorFlow":
+                flow = sectorFlow.SectorFlowField(goal, env_state, density = 2, region = region)
+                for i in range(agent_count):
+                    agents.append(agent.FlowAgent((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, goal, flow))
+            case "FlowBFS":
+                flow = flowField.get_field(goal, env_state, density = 2, region = region, eikonal = False)
+                for i in range(agent_count):
+                    agents.append(agent.FlowAgent((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, goal, flow))
+            case "HAstar":
+                segment_pool = hastar.SegmentPool(workers) if workers is not None else None
+                for i in range(agent_count):
+                    agents.append(agent.HAAgent((random.random() * 50,random.random() * dist/2), env_state, goal, pool = segment_pool))
+            case "HAstarGrid":
+                segment_pool = hastar.SegmentPool(workers) if workers is not None else None
+                for i in range(agent_count):
+                    agents.append(agent.HAAgent((random.random() * 50,random.random() * dist/2), env_state, goal, abstract = False, pool = segment_pool))
+            case "Group":
+                for i in range(agent_count):
+                    agents.append(agent.CoordinatedAgent((random.random() * 50,random.random() * dist/2), env_state, goal))
+
+        if agent_select == "Planning":
+            time_taken, total_finished, average_steps = asyncio.run(run_simulations(pather, [agents], max_steps = max_steps))[0]
+        else:
+            time_taken, total_finished, average_steps = benchmark(agents, flow, max_steps=max_steps, pather=pather, batch=batch and flow is not None)
+        stats = index.stats()
+        if agent_select in ("HAstar", "HAstarGrid"):
+            stats.update({"hastar_" + key: value for key, value in hastar.get_caches(env_state).stats().items()})
+        if segment_pool is not None:
+            segment_pool.close()
+        if pather is not None:
+            pather.close()
+            stats.update({"pather_" + key: value for key, value in pather.stats().items()})
+        stats["expansions"] = search.SEARCH_STATS["expansions"]
+        searches = search.SEARCH_STATS["searches"]
+        stats["expansions_per_query"] = stats["expansions"] / searches if searches > 0 else 0
+        stats["moves_per_query"] = search.SEARCH_STATS["moves"] / searches if searches > 0 else 0
+        search_time = search.SEARCH_STATS["time"] / 1_000_000_000
+        stats["search_time"] = search_time
+        stats["expansions_per_second"] = stats["expansions"] / search_time if search_time > 0 else 0
+        return time_taken, total_finished, average_steps, stats
+    finally:
+        problem.ContinuousNavigation.QUANTUM = old_quantum
+
     
+
+def dict_node_class():
+    """Copy of problem.Node keeping its fields in a per-instance __dict__, the layout before __slots__."""
+    skip = ("__slots__", "__dict__", "__weakref__") + problem.Node.__slots__
+    return type("DictNode", (), {name: value for name, value in vars(problem.Node).items() if name not in skip})
+
+def memory_bench(env_select, dist, density, queries, weight = None):
+    """
+    Measures peak traced memory of single A* queries from random starts,
+    once with problem.Node swapped for dict_node_class() as the baseline
+    and once with the slotted Node.
+
+    Returns:
+        dict: Average peak bytes per query, peak bytes per expanded node and
+        per created node, for "dict" and "slots".
+    """
+    match env_select:
+        case "Density":
+            env_state, goal, start_region, region = generate_density_env(dist = dist, density = density)
+
+    method = search.weighted_astar_search
+    if weight is not None:
+        method = functools.partial(search.weighted_astar_search, w = weight)
+
+    starts = [(start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]) for i in range(queries)]
+    slotted = problem.Node
+    results = {}
+    for kind, node_class in (("dict", dict_node_class()), ("slots", slotted)):
+        # search and problem both look Node up as a module global
+        problem.Node = search.Node = node_class
+        total_peak = 0
+        total_expansions = 0
+        total_nodes = 0
+        try:
+            for pos in starts:
+                prob = problem.ContinuousNavigation(pos, env_state, goal)
+                search.reset_stats()
+                created = node_class.count
+                tracemalloc.start()
+                method(prob)
+                total_peak += tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                total_expansions += search.SEARCH_STATS["expansions"]
+                total_nodes += node_class.count - created
+        finally:
+            problem.Node = search.Node = slotted
+        results[kind + "_peak"] = total_peak / queries
+        results[kind + "_per_expansion"] = total_peak / total_expansions if total_expansions > 0 else 0
+        results[kind + "_per_node"] = total_peak / total_nodes if total_nodes > 0 else 0
+    return results
+
+def path_bench(env_select, dist, density, agent_count):
+    """
+    Compares storing and walking one planned path per agent as a plain list
+    (consumed with pop(0)) against path.Path.
+
+    Returns:
+        tuple[float, float, float, float]: List bytes, Path bytes, list walk ns and Path walk ns, per agent.
+    """
+    match env_select:
+        case "Density":
+            env_state, goal, start_region, region = generate_density_env(dist = dist, density = density)
+
+    prob = problem.ContinuousNavigation((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, goal)
+    moves = search.default_search(prob)
+
+    results = []
+    for build in (list, path.Path):
+        tracemalloc.start()
+        paths = [build(moves) for i in range(agent_count)]
+        results.append(tracemalloc.get_traced_memory()[0] / agent_count)
+        tracemalloc.stop()
+
+        start = time.time_ns()
+        pop = (lambda p: p.pop(0)) if build is list else (lambda p: p.pop())
+        for p in paths:
+            while len(p) > 0:
+                pop(p)
+        results.append((time.time_ns() - start) / agent_count)
+
+    return results[0], results[2], results[1], results[3]
+
+def flow_bench(env_select, dist, density, samples):
+    """
+    Measures building a FlowField over the whole region and sampling it
+    from random start positions.
+
+    Returns:
+        tuple[float, float, float, float]: Build ms, peak traced bytes while building, field bytes and ns per sample.
+    """
+    match env_select:
+        case "Density":
+            env_state, goal, start_region, region = generate_density_env(dist = dist, density = density)
+
+    tracemalloc.start()
+    flow = flowField.FlowField(goal, env_state, density = 2, region = region)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # Timed again without tracing
+    flow.fit()
+    stats = flow.stats()
+
+    points = [(start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]) for i in range(samples)]
+    start = time.perf_counter_ns()
+    for pos in points:
+        flow.get_move_at(pos)
+    sample_time = (time.perf_counter_ns() - start) / samples
+
+    return stats["build_time"] / 1_000_000, peak, stats["bytes"], sample_time
+
+def goal_bench(env_select, dist, density, goal_count, agent_count, max_bytes, max_steps = 10000):
+    """
+    Runs Flow agents spread over goal_count goals along the far side of
+    the environment, each agent getting its goal's field from one
+    FlowFieldPool of max_bytes.
+
+    Returns:
+        tuple[float, dict, int, float]: Ms spent getting fields, pool stats, agents finished and their average steps.
+    """
+    match env_select:
+        case "Density":
+            env_state, goal, start_region, region = generate_density_env(dist = dist, density = density)
+
+    spacing = (dist / 2 - 20) / max(goal_count - 1, 1)
+    goals = [area.RectArea((dist - 30, i * spacing), (20, 20), "green") for i in range(goal_count)]
+    pool = flowField.FlowFieldPool(max_bytes)
+
     agents = []
-    flow = None
-    pather = None
-    match agent_select:
-        case "Astar":
-            for i in range(agent_count):
-                agents.append(agent.Agent((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, goal))
-        case "Simple":
-            for i in range(agent_count):
-                agents.append(agent.simpleAgent((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, goal))
-        case "Flow":
+    start = time.perf_counter_ns()
+    for i in range(agent_count):
+        # A fresh goal object each time, equal goals still share a field
+        target = random.choice(goals)
+        target = area.RectArea(target.pos, target.size, target.color)
+        flow = pool.get(target, env_state, density = 2, region = region)
+        agents.append(agent.FlowAgent((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, target, flow))
+    setup_time = (time.perf_counter_ns() - start) / 1_000_000
+
+    time_taken, total_finished, average_steps = benchmark(agents, max_steps = max_steps)
+    return setup_time, pool.stats(), total_finished, average_steps
+
+def sector_bench(env_select, dist, density, agent_count, sector_nodes, max_sectors, max_steps = 10000):
+    """
+    Runs the same Flow agents on one full FlowField and on a
+    sectorFlow.SectorFlowField, timing field construction along with the run.
+
+    Returns:
+        dict: Seconds, finished agents, average steps and peak field bytes for each field.
+    """
+    match env_select:
+        case "Density":
+            env_state, goal, start_region, region = generate_density_env(dist = dist, density = density)
+
+    starts = [(start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]) for i in range(agent_count)]
+    results = {}
+    for kind in ("full", "sector"):
+        start = time.time_ns()
+        if kind == "full":
             flow = flowField.FlowField(goal, env_state, density = 2, region = region)
-            for i in range(agent_count):
-                agents.append(agent.FlowAgent((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, goal, flow))
-        case "HAstar":
-            for i in range(agent_count):
-                agents.append(agent.HAAgent((random.random() * 50,random.random() * dist/2), env_state, goal))
-        case "Group":
-            for i in range(agent_count):
-                agents.append(agent.CoordinatedAgent((random.random() * 50,random.random() * dist/2), env_state, goal))
-    
-    return benchmark(agents, flow, max_steps=max_steps)
+        else:
+            flow = sectorFlow.SectorFlowField(goal, env_state, density = 2, region = region, sector_nodes = sector_nodes, max_sectors = max_sectors)
+        agents = [agent.FlowAgent(pos, env_state, goal, flow) for pos in starts]
+        time_taken, total_finished, average_steps = benchmark(agents, max_steps = max_steps)
+        stats = flow.stats()
+        results[kind + "_time"] = (time.time_ns() - start) / 1_000_000_000
+        results[kind + "_finished"] = total_finished
+        results[kind + "_steps"] = average_steps
+        results[kind + "_bytes"] = stats.get("max_bytes", stats["bytes"])
+        if kind == "sector":
+            results["sector_builds"] = stats["builds"]
+            results["sector_evictions"] = stats["evictions"]
+    return results
 
-    
+def crowd_bench(env_select, dist, density, agent_count, ticks):
+    """
+    Steps the same Flow agents for a number of ticks with FlowAgent.update
+    one agent at a time, and with one agent.FlowCrowd.
+
+    Returns:
+        tuple[float, float, float]: Ms per tick for each, and the largest
+        distance between the positions the two reached.
+    """
+    match env_select:
+        case "Density":
+            env_state, goal, start_region, region = generate_density_env(dist = dist, density = density)
+
+    flowField.clear_cache()
+    flow = flowField.get_field(goal, env_state, density = 2, region = region)
+    starts = [(start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]) for i in range(agent_count)]
+
+    agents = [agent.FlowAgent(pos, env_state, goal, flow) for pos in starts]
+    start = time.perf_counter_ns()
+    for i in range(ticks):
+        for a in agents:
+            a.update()
+    single_time = (time.perf_counter_ns() - start) / ticks / 1_000_000
+
+    crowd = agent.FlowCrowd([agent.FlowAgent(pos, env_state, goal, flow) for pos in starts])
+    start = time.perf_counter_ns()
+    for i in range(ticks):
+        crowd.update()
+    batch_time = (time.perf_counter_ns() - start) / ticks / 1_000_000
+
+    drift = max(math.dist(a.pos, pos) for a, pos in zip(agents, crowd.pos.tolist()))
+    return single_time, batch_time, drift
+
+def hpa_bench(env_select, dist, density, queries):
+    """
+    Times the high level of HA* for queries random starts: the coarse grid
+    search (high_level_search) against the environment's HPA* graph.
+
+    Returns:
+        dict: Graph build ms, ms per query for each, and the graph's stats.
+    """
+    match env_select:
+        case "Density":
+            env_state, goal, start_region, region = generate_density_env(dist = dist, density = density)
+
+    starts = [(start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]) for i in range(queries)]
+    results = {}
+
+    start = time.perf_counter_ns()
+    for pos in starts:
+        hastar.get_caches(env_state).waypoints.clear()
+        hastar.high_level_search(problem.ContinuousNavigation(pos, env_state, goal), 25)
+    results["grid_query"] = (time.perf_counter_ns() - start) / queries / 1_000_000
+
+    hastar.clear_graphs()
+    graph = hastar.get_graph(env_state)
+    start = time.perf_counter_ns()
+    for pos in starts:
+        graph.find_waypoints(pos, goal.get_center())
+    results["hpa_query"] = (time.perf_counter_ns() - start) / queries / 1_000_000
+    results["build"] = graph.build_time / 1_000_000
+    results.update(graph.stats())
+    return results
+
+def segment_bench(env_select, dist, density, queries, workers):
+    """
+    Times single HA* queries from random starts with empty caches, refining
+    segments one after another and on a hastar.SegmentPool of workers. The
+    pool is started before timing.
+
+    Returns:
+        dict: Ms per query for each, and segments per query.
+    """
+    match env_select:
+        case "Density":
+            env_state, goal, start_region, region = generate_density_env(dist = dist, density = density)
+
+    starts = [(start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]) for i in range(queries)]
+    segment_pool = hastar.SegmentPool(workers)
+    segment_pool.start(env_state)
+    results = {}
+    for kind, pool in (("serial", None), ("parallel", segment_pool)):
+        hastar.clear_caches()
+        hastar.get_graph(env_state)
+        start = time.perf_counter_ns()
+        for pos in starts:
+            hastar.get_caches(env_state).segments.clear()
+            hastar.hierarchical_astar_search(problem.ContinuousNavigation(pos, env_state, goal), pool = pool)
+        results[kind] = (time.perf_counter_ns() - start) / queries / 1_000_000
+    results["segments"] = hastar.get_caches(env_state).segments.misses / queries
+    segment_pool.close()
+    return results
+
+def stream_bench(env_select, dist, density, agent_count, ticks):
+    """
+    Runs the same HAAgents for ticks updates with segments refined all at
+    once and lazily, each with empty caches. Agents that have not reached
+    their goal by then stand in for agents re-planned or stopped early.
+
+    Returns:
+        dict: Ms to the first move of every agent, ms for all ticks and
+        segments searched, for each mode.
+    """
+    match env_select:
+        case "Density":
+            env_state, goal, start_region, region = generate_density_env(dist = dist, density = density)
+
+    starts = [(start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]) for i in range(agent_count)]
+    results = {}
+    for kind, lazy in (("eager", False), ("lazy", True)):
+        hastar.clear_caches()
+        hastar.get_graph(env_state)
+        agents = [agent.HAAgent(pos, env_state, goal, lazy = lazy) for pos in starts]
+
+        start = time.perf_counter_ns()
+        for a in agents:
+            a.update()
+        results[kind + "_first"] = (time.perf_counter_ns() - start) / 1_000_000
+        for i in range(ticks - 1):
+            for a in agents:
+                a.update()
+        results[kind + "_total"] = (time.perf_counter_ns() - start) / 1_000_000
+        results[kind + "_segments"] = hastar.get_caches(env_state).segments.misses
+    return results
+
+def store_bench(env_select, dist, density, queries, root):
+    """
+    Times precomputation with an empty store.PrecomputeStore at root, and
+    again with a fresh store over the same directory, as a new process would
+    start: one flow field, and HA* searches from queries random starts.
+
+    Returns:
+        dict: Cold and warm ms for the field and the searches, and bytes on disk.
+    """
+    match env_select:
+        case "Density":
+            env_state, goal, start_region, region = generate_density_env(dist = dist, density = density)
+
+    shutil.rmtree(root, ignore_errors = True)
+    starts = [(start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]) for i in range(queries)]
+    results = {}
+    for kind in ("cold", "warm"):
+        disk = store.PrecomputeStore(root)
+        hastar.clear_caches()
+
+        start = time.perf_counter_ns()
+        disk.get_field(goal, env_state, density = 2, region = region)
+        results[kind + "_field"] = (time.perf_counter_ns() - start) / 1_000_000
+
+        start = time.perf_counter_ns()
+        disk.load_hastar(env_state)
+        for pos in starts:
+            hastar.hierarchical_astar_search(problem.ContinuousNavigation(pos, env_state, goal))
+        if kind == "cold":
+            disk.save_hastar(env_state)
+        results[kind + "_hastar"] = (time.perf_counter_ns() - start) / 1_000_000
+
+    results["bytes"] = store.folder_bytes(root)
+    shutil.rmtree(root, ignore_errors = True)
+    return results
+
+def moving_bench(dist, density, movers, updates, walk, agent_count = 4):
+    """
+    Measures replanning after obstacles move, for one agent walking its path.
+
+    After every obstacle update the agent's persistent D* Lite planner is
+    repaired, and compared to a fresh D* Lite plan and a fresh A* search
+    from the same position. Then agent_count DStarAgents walk the same
+    layout while its obstacles keep moving once every walk ticks.
 
-def benchmark(agents, flow = None, max_steps = 10000):
+    Returns:
+        dict: Average time (ms) and expansions per replan for each method,
+        and the DStarAgents' run time (ms), finished count and average steps.
+    """
+    env_state, goal, start_region, region = generate_moving_env(dist = dist, density = density, movers = movers)
+    spatial.clear_cache()
+    index = spatial.get_index(env_state)
+    pos = (start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3])
+    planner = dstar.DStarLite(problem.ContinuousNavigation(pos, env_state, goal))
+    moves = planner.plan(pos)
+
+    totals = {"repair_ms": 0, "repair_expansions": 0, "dstar_ms": 0, "dstar_expansions": 0, "astar_ms": 0, "astar_expansions": 0}
+    for i in range(updates):
+        for move in moves[:walk]:
+            pos = (pos[0] + move[0], pos[1] + move[1])
+        move_obstacles(env_state, index)
+
+        expansions = planner.expansions
+        start = time.perf_counter_ns()
+        moves = planner.plan(pos)
+        totals["repair_ms"] += (time.perf_counter_ns() - start) / 1_000_000
+        totals["repair_expansions"] += planner.expansions - expansions
+
+        start = time.perf_counter_ns()
+        fresh = dstar.DStarLite(problem.ContinuousNavigation(pos, env_state, goal))
+        fresh.plan()
+        totals["dstar_ms"] += (time.perf_counter_ns() - start) / 1_000_000
+        totals["dstar_expansions"] += fresh.expansions
+
+        search.reset_stats()
+        start = time.perf_counter_ns()
+        search.astar_search(problem.ContinuousNavigation(pos, env_state, goal))
+        totals["astar_ms"] += (time.perf_counter_ns() - start) / 1_000_000
+        totals["astar_expansions"] += search.SEARCH_STATS["expansions"]
+
+    results = {key: value / updates for key, value in totals.items()}
+
+    agents = [agent.DStarAgent((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, goal) for i in range(agent_count)]
+    step_counts = []
+    start = time.perf_counter_ns()
+    for tick in range(dist * 10):
+        if len(agents) == 0:
+            break
+        if tick % walk == walk - 1:
+            move_obstacles(env_state, index)
+        for a in [a for a in agents if a.update()]:
+            step_counts.append(a.steps)
+            agents.remove(a)
+    results["agent_ms"] = (time.perf_counter_ns() - start) / 1_000_000
+    results["agent_finished"] = len(step_counts)
+    results["agent_steps"] = sum(step_counts) / len(step_counts) if step_counts else 0
+    return results
+
+def frame_bench(env_select, agent_count, dist, density, frame_budget = None, max_frames = 100_000):
+    """
+    Simulates main.gameloop frames with Deffered agents, without rendering.
+
+    Without frame_budget the Pathfinder solves one whole request per frame,
+    like main.py, with it searches are time sliced within the budget.
+
+    Returns:
+        tuple[float, float, float, int, int]: p50, p99 and max frame time in ms,
+        frames until every agent finished and agents finished.
+    """
+    match env_select:
+        case "Density":
+            env_state, goal, start_region, region = generate_density_env(dist = dist, density = density)
+
+    pather = pathfinder.Pathfinder(search.default_search, frame_budget = frame_budget)
+    agents = []
+    for i in range(agent_count):
+        agents.append(agent.DefferedAgent((start_region[0] + random.random() * start_region[2], start_region[1] + random.random() * start_region[3]), env_state, goal, pather))
+
+    frame_times = []
+    finished = 0
+    while len(agents) > 0 and len(frame_times) < max_frames:
+        start = time.perf_counter_ns()
+        if pather.busy():
+            pather.pop_queue()
+        for i in reversed(range(len(agents))):
+            if agents[i].update():
+                agents.pop(i)
+                finished += 1
+        frame_times.append(time.perf_counter_ns() - start)
+
+    frame_times.sort()
+    p50 = frame_times[len(frame_times) // 2]
+    p99 = frame_times[min(len(frame_times) - 1, len(frame_times) * 99 // 100)]
+    return p50 / 1_000_000, p99 / 1_000_000, frame_times[-1] / 1_000_000, len(frame_times), finished
+
+async def benchmark_async(agents, max_steps = 10000):
+    """
+    Coroutine version of benchmark for PlanningAgents.
+
+    A step runs while any agent can move, yielding to the event loop after
+    it. When every agent is waiting on a plan the simulation awaits their
+    futures instead of stepping.
+    """
     step = 0
 
     start = time.time_ns()
 
-    if flow != None:
+    step_counts = []
+
+    while step < max_steps and len(agents) != 0:
+        planning = [a.planning for a in agents if a.planning is not None and len(a.path_cache) == 0]
+        if len(planning) == len(agents):
+            await asyncio.wait(planning, return_when = asyncio.FIRST_COMPLETED)
+            continue
+
+        step += 1
+        for i in reversed(range(len(agents))):
+            if agents[i].update():
+                step_counts.append(agents[i].steps)
+                agents.pop(i)
+        await asyncio.sleep(0)
+
+    time_taken = time.time_ns() - start
+    total_finished = len(step_counts)
+    avg = 0
+    for i in step_counts:
+        avg += i / total_finished
+    return time_taken, total_finished, avg
+
+async def run_simulations(pather, agent_groups, max_steps = 10000):
+    """
+    Runs one benchmark_async simulation per agent group concurrently,
+    sharing pather, and returns their results in order.
+    """
+    server = asyncio.create_task(pather.serve())
+    try:
+        return await asyncio.gather(*(benchmark_async(agents, max_steps) for agents in agent_groups))
+    finally:
+        server.cancel()
+
+def benchmark(agents, flow = None, max_steps = 10000, pather = None, batch = False):
+    step = 0
+
+    start = time.time_ns()
+
+    # Fields restored from a store (build_time 0) keep their memory-mapped arrays instead of refitting
+    if flow != None and not (isinstance(flow, flowField.FlowField) and flow.build_time == 0):
         flow.fit()
 
     step_counts = []
 
+    if batch and len(agents) > 0:
+        # FlowAgents sharing flow, moved together through one get_moves_at per step
+        crowd = agent.FlowCrowd(agents)
+        while step < max_steps and crowd.active.any():
+            step += 1
+            step_counts.extend(crowd.steps[crowd.update()].tolist())
+        crowd.sync()
+        agents[:] = [a for a, active in zip(agents, crowd.active.tolist()) if active]
+
     while step < max_steps:
         step += 1
+        # Solve every queued request before moving, so only path throughput is timed
+        if pather is not None:
+            pather.wait()
         finished = []
         for i in range(len(agents)):
             if agents[i].update():
@@ -136,6 +966,5 @@ def benchmark(agents, flow = None, max_steps = 10000):
         avg += i / total_finished
     return time_taken, total_finished, avg
 
-main()
-if __name__ == "main":
-    main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+dstar.py
+
+Implements D* Lite incremental replanning for ContinuousNavigation.
+
+D* Lite searches backward from the goal cells to the agent, keeping g
+and rhs values for every cell it touched. When obstacles move, only the
+cells whose walkability changed (and their neighbors) are re-queued,
+and the next plan() repairs the affected part of the search instead of
+starting over. As the agent moves, the key modifier km keeps old queue
+keys valid without reordering the queue.
+
+The float lattice of ContinuousNavigation has no fixed vertex set, so
+D* Lite runs on the same grid view JPS and Theta* use (jps.JumpPointGrid),
+8-connected without corner cutting, and converts cell paths back into
+agent movement vectors.
+
+Dependencies:
+- problem (ContinuousNavigation problem definition)
+- search (shared search statistics)
+- jps (grid view of the problem, path conversion)
+"""
+
+import heapq
+import math
+import time
+import search
+from problem import ContinuousNavigation
+from jps import JumpPointGrid, jump_points_to_moves, sign
+
+SQRT2 = math.sqrt(2)
+INF = float("inf")
+NEIGHBORS = tuple((dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dx != 0 or dy != 0)
+
+
+class DStarLite:
+    """
+    Persistent D* Lite planner for one agent and one goal.
+
+    Attributes:
+        problem (ContinuousNavigation): Problem the planner was built for.
+        grid (JumpPointGrid): Grid the search runs on, anchored at the first start.
+        start (tuple[int, int]): Cell of the agent.
+        goals (set[tuple[int, int]]): Cells fully inside the goal area.
+        g (dict[tuple[int, int], float]): Settled cost-to-goal of each cell.
+        rhs (dict[tuple[int, int], float]): One-step lookahead cost-to-goal.
+        queue (list): Heap of (k1, k2, counter, cell), stale entries skipped.
+        queued (dict[tuple[int, int], tuple]): Current key of each queued cell.
+        km (float): Key modifier accumulated as the agent moves.
+        seen_changes (int): Entries of the index change log already applied.
+        expansions (int): Cells expanded over the planner's lifetime.
+    """
+
+    def __init__(self, problem: ContinuousNavigation, step: float = 1.0):
+        self.problem = problem
+        self.grid = JumpPointGrid(problem, step = step)
+        self.start = (0, 0)
+        self.last = self.start
+        self.km = 0
+        self.g = {}
+        self.rhs = {}
+        self.queue = []
+        self.queued = {}
+        self.counter = 0
+        self.expansions = 0
+        self.seen_changes = len(getattr(problem.index, "changes", ()))
+
+        self.goals = set()
+        for y in range(self.grid.goal_min[1], self.grid.goal_max[1] + 1):
+            for x in range(self.grid.goal_min[0], self.grid.goal_max[0] + 1):
+                if self.grid.is_goal(x, y):
+                    self.goals.add((x, y))
+        for cell in self.goals:
+            self.rhs[cell] = 0
+            self.push(cell)
+
+    def passable(self, cell) -> bool:
+        # The agent's own cell, even if its square touches an obstacle or one moved over it
+        return cell == self.start or self.grid.walkable(cell[0], cell[1])
+
+    def cost(self, u, v) -> float:
+        if not (self.passable(u) and self.passable(v)):
+            return INF
+        dx = v[0] - u[0]
+        dy = v[1] - u[1]
+        if dx != 0 and dy != 0:
+            if not (self.passable((u[0] + dx, u[1])) and self.passable((u[0], u[1] + dy))):
+                return INF
+            return SQRT2
+        return 1
+
+    def h(self, a, b) -> float:
+        dx = abs(a[0] - b[0])
+        dy = abs(a[1] - b[1])
+        return max(dx, dy) + (SQRT2 - 1) * min(dx, dy)
+
+    def calculate_key(self, cell) -> tuple[float, float]:
+        best = min(self.g.get(cell, INF), self.rhs.get(cell, INF))
+        # Costs are sums of 1 and sqrt(2), round so ties on the optimal path
+        # compare equal and fall through to the second key instead of float noise
+        return (round(best + self.h(self.start, cell) + self.km, 9), round(best, 9))
+
+    def push(self, cell):
+        key = self.calculate_key(cell)
+        self.queued[cell] = key
+        heapq.heappush(self.queue, (key[0], key[1], self.counter, cell))
+        self.counter += 1
+
+    def top(self):
+        # Drops entries whose cell was removed or re-queued with another key
+        while self.queue:
+            k1, k2, _, cell = self.queue[0]
+            if self.queued.get(cell) == (k1, k2):
+                return (k1, k2), cell
+            heapq.heappop(self.queue)
+        return (INF, INF), None
+
+    def update_vertex(self, cell):
+        consistent = self.g.get(cell, INF) == self.rhs.get(cell, INF)
+        if not consistent:
+            self.push(cell)
+        elif cell in self.queued:
+            del self.queued[cell]
+
+    def recompute_rhs(self, cell):
+        if cell in self.goals:
+            return
+        best = INF
+        for dx, dy in NEIGHBORS:
+            succ = (cell[0] + dx, cell[1] + dy)
+            g = self.g.get(succ, INF)
+            if g == INF:
+                continue
+            best = min(best, self.cost(cell, succ) + g)
+        self.rhs[cell] = best
+
+    def compute_shortest_path(self) -> int:
+        expansions = 0
+        while True:
+            key, cell = self.top()
+            start_rhs = self.rhs.get(self.start, INF)
+            if cell is None or (key >= self.calculate_key(self.start) and start_rhs <= self.g.get(self.start, INF)):
+                break
+
+            new_key = self.calculate_key(cell)
+            if key < new_key:
+                self.push(cell)
+                continue
+
+            expansions += 1
+            del self.queued[cell]
+            g_cell = self.g.get(cell, INF)
+            rhs_cell = self.rhs.get(cell, INF)
+            if g_cell > rhs_cell:
+                self.g[cell] = rhs_cell
+                for dx, dy in NEIGHBORS:
+                    pred = (cell[0] + dx, cell[1] + dy)
+                    if pred in self.goals:
+                        continue
+                    c = self.cost(pred, cell)
+                    if c + rhs_cell < self.rhs.get(pred, INF):
+                        self.rhs[pred] = c + rhs_cell
+                        self.update_vertex(pred)
+            else:
+                self.g[cell] = INF
+                for dx, dy in NEIGHBORS + ((0, 0),):
+                    pred = (cell[0] + dx, cell[1] + dy)
+                    if self.rhs.get(pred, INF) == self.cost(pred, cell) + g_cell or pred == cell:
+                        self.recompute_rhs(pred)
+                    self.update_vertex(pred)
+        self.expansions += expansions
+        return expansions
+
+    def to_cell(self, pos) -> tuple[int, int]:
+        return (round((pos[0] - self.grid.origin[0]) / self.grid.step), round((pos[1] - self.grid.origin[1]) / self.grid.step))
+
+    def move_to(self, pos):
+        """Moves the search start to the agent's current position."""
+        cell = self.to_cell(pos)
+        if cell != self.start:
+            old = self.start
+            self.km += self.h(self.last, cell)
+            self.last = cell
+            self.start = cell
+            # Only the start is passable regardless of obstacles, so the old and new start flip if blocked
+            self.repair([c for c in (old, cell) if not self.grid.walkable(c[0], c[1])])
+
+    def notify(self, bounds):
+        """
+        Re-checks the cells overlapping a changed area and re-queues the
+        cells whose costs depend on them.
+        """
+        grid = self.grid
+        half = grid.step / 2
+        min_x = math.floor((bounds[0] - half - grid.origin[0]) / grid.step)
+        min_y = math.floor((bounds[1] - half - grid.origin[1]) / grid.step)
+        max_x = math.ceil((bounds[2] + half - grid.origin[0]) / grid.step)
+        max_y = math.ceil((bounds[3] + half - grid.origin[1]) / grid.step)
+
+        changed = []
+        for y in range(min_y, max_y + 1):
+            for x in range(min_x, max_x + 1):
+                # Cells never looked at are evaluated fresh when first reached
+                if (x, y) not in grid.walkable_cache:
+                    continue
+                before = grid.walkable_cache.pop((x, y))
+                if grid.walkable(x, y) != before:
+                    changed.append((x, y))
+        self.repair(changed)
+
+    def repair(self, changed):
+        """Re-queues the cells whose costs depend on cells that changed passability."""
+        affected = set()
+        for cell in changed:
+            affected.add(cell)
+            for dx, dy in NEIGHBORS:
+                affected.add((cell[0] + dx, cell[1] + dy))
+        for cell in affected:
+            self.recompute_rhs(cell)
+            self.update_vertex(cell)
+
+    def sync_changes(self):
+        """Applies the collision index's change log entries not seen yet."""
+        changes = getattr(self.problem.index, "changes", ())
+        for bounds in changes[self.seen_changes:]:
+            self.notify(bounds)
+        self.seen_changes = len(changes)
+
+    def plan(self, pos = None) -> list[tuple[float, float]]:
+        """
+        Repairs the search for the agent at pos (the first start if None)
+        after any environment changes, and returns movement vectors to the goal.
+        """
+        start_time = time.perf_counter_ns()
+        search.SEARCH_STATS["searches"] += 1
+
+        if pos is None:
+            pos = self.grid.origin
+        self.move_to(pos)
+        self.sync_changes()
+        expansions = self.compute_shortest_path()
+
+        # Follow the cheapest successor to a goal cell, keeping only turns
+        jump_points = []
+        cell = self.start
+        direction = None
+        limit = len(self.g) + 1
+        while cell not in self.goals and limit > 0:
+            limit -= 1
+            best = None
+            best_cost = INF
+            for dx, dy in NEIGHBORS:
+                succ = (cell[0] + dx, cell[1] + dy)
+                c = self.cost(cell, succ) + self.g.get(succ, INF)
+                if c < best_cost:
+                    best_cost = c
+                    best = succ
+            if best is None:
+                # rhs of the start is infinite, no known path
+                break
+            step = (sign(best[0] - cell[0]), sign(best[1] - cell[1]))
+            if direction is not None and step != direction:
+                jump_points.append(cell)
+            direction = step
+            cell = best
+
+        moves = []
+        if cell in self.goals:
+            jump_points.append(cell)
+            moves = jump_points_to_moves(self.grid, jump_points, pos)
+
+        search.SEARCH_STATS["expansions"] += expansions
+        search.SEARCH_STATS["moves"] += len(moves)
+        search.SEARCH_STATS["time"] += time.perf_counter_ns() - start_time
+        return moves
+
+
+def dstar_lite_search(problem: ContinuousNavigation) -> list[tuple[float, float]]:
+    """Plans once with a fresh D* Lite planner, returning movement vectors like astar_search."""
+    return DStarLite(problem).plan()
@@ -5,14 +5,52 @@ Implements a simple flow-field pathfinding system using backpropagation
 from a goal area. Each node stores a direction vector that agents can
 query to move toward the goal while avoiding obstacles.
 
+Nodes sit on a lattice of spacing density covering the region, and the
+field is stored as NumPy arrays over that lattice instead of one object
+per node. Obstacles are rasterized onto the lattice once and the
+integration field is built a whole wavefront per array operation.
+
+Two integration fields are available. The default solves the eikonal
+equation |grad T| = 1 with the fast iterative method (a parallel form of
+fast marching), so T approximates Euclidean distance around obstacles.
+Directions follow the upwind gradient of T and are bilinearly
+interpolated between the four nodes around the agent, giving smooth
+any-angle motion. With eikonal=False the field is a 4-connected breadth
+first search where each node points at a neighbor one step closer and
+agents read the nearest node, which produces staircase paths.
+get_moves_at applies the same sampling to a whole array of positions with
+array operations, for crowds moved together (agent.FlowCrowd).
+
+Fields are shared through a FlowFieldPool, a least recently used cache
+bounded by the bytes of field arrays it holds and keyed by goal geometry,
+environment fingerprint, density, region and field type. Agents heading
+to the same goal share one field, and returning to an earlier goal reuses
+its field instead of fitting a new one. get_field uses the module's
+shared pool, the way spatial.get_index shares indexes. A pool given a
+store.PrecomputeStore loads missing fields from disk before fitting them.
+
 Dependencies:
 - pygame (for rendering)
+- numpy (array storage)
 - area (defines Area objects with position and collision checks)
-- util (vector math helpers)
+- spatial (change log of moved obstacles, for environment fingerprints)
 """
 
+import bisect
+import collections
+import math
+import time
 import pygame
-import area, util
+import numpy as np
+import area, spatial
+
+# Lattice steps in (x, y), in the order a node's parent is chosen among equally close neighbors
+OFFSETS = ((-1, 0), (1, 0), (0, 1), (0, -1))
+NO_DIR = (0, 0, 0)      # Returned where the field has no node, agents stand still on it
+TOLERANCE = 1e-4        # Change in T (lattice units) below which a node has converged
+CORNER_X = np.array([0, 1, 0, 1])     # Cell corners in the order interpolate weighs them
+CORNER_Y = np.array([0, 0, 1, 1])
+
 
 class FlowField:
     """
@@ -22,122 +60,539 @@ class FlowField:
     Each node stores a direction vector pointing toward the goal or
     away from obstacles. Agents can sample the field to determine
     movement direction.
-    """
 
-    class FlowNode:
-        """
-        A single node within the flow field.
+    Attributes:
+        goal (area.Area): Area the field leads to.
+        env (list[Area]): Obstacles avoided by the field.
+        density (float): Spacing between nodes.
+        region (tuple): (min_x, min_y, max_x, max_y) covered by nodes.
+        eikonal (bool): Fast marching field with interpolation, or BFS with nearest node.
+        origin (tuple[int, int]): Lattice index (x / density, y / density) of array cell [0, 0].
+        blocked (np.ndarray): Nodes inside an obstacle, indexed as [row (y), column (x)].
+        distance (np.ndarray): Integration field in lattice steps to the goal, inf where unreached.
+        dirs (np.ndarray): Direction field, [row, column] → (dx, dy), NaN where unreached.
+        reached (np.ndarray): Nodes holding a direction.
+        free (np.ndarray): Reached nodes outside obstacles, the ones interpolated between.
+        seeds (tuple | None): (index_x, index_y, times, dirs) arrays of lattice nodes
+            (global lattice indices) with fixed arrival times and directions, used as
+            the sources instead of the goal. Eikonal fields only, see sectorFlow.
+        build_time (int): Nanoseconds spent in the last fit(), 0 for restored fields.
+    """
 
-        Each node has a position and a direction vector that indicates
-        where an agent at that position should move.
-        """
-        def __init__(self, pos : tuple, target_pos : tuple, target_dir : tuple = None):
-            #Calculate direction to target
-            self.pos = pos
-
-            
-            #if target_dir == (0,0):
-            if target_dir == None:
-                self.dir = (target_pos[0] - self.pos[0], target_pos[1] - self.pos[1])
-            else:
-                self.dir = target_dir
-            #else:
-            #    self.dir = util.dir_average((target_pos[0] - self.pos[0], target_pos[1] - self.pos[1]), target_dir)
-
-            
-        
-
-        def get_dir(self):
-            return self.dir
-        
-        def get_pos(self):
-            return self.pos
-        
-        def render(self, surface, offset = (0,0), scale = 1):
-            pygame.draw.line(surface, (0, 255, 0), ((self.pos[0] - offset[0]) * scale, (self.pos[1] - offset[1]) * scale), ((self.pos[0] + self.dir[0] * 2 - offset[0]) * scale, (self.pos[1] + self.dir[1] * 2 - offset[1]) * scale))
-            pygame.draw.circle(surface, (0,200,0), ((self.pos[0] - offset[0]) * scale, (self.pos[1] - offset[1]) * scale), 0.25 * scale)
-            
-
-
-    def __init__(self, goal : area.Area, env, density = 5, region = (0, 0, 200, 125)):
-        self.goal : area.Area = goal  
+    def __init__(self, goal : area.Area, env, density = 5, region = (0, 0, 200, 125), eikonal = True, seeds = None, arrays = None):
+        self.goal : area.Area = goal
         self.env = env
         self.density = density
         self.region = region
-        self.fit()
+        self.eikonal = eikonal
+        self.seeds = seeds
+        if arrays is None:
+            self.fit()
+        else:
+            self.restore(arrays)
+
+    def restore(self, arrays):
+        """
+        Takes the arrays of an earlier fit (origin, blocked, distance, dirs,
+        reached and free, possibly memory-mapped, see store) instead of fitting.
+        """
+        self.origin = (int(arrays["origin"][0]), int(arrays["origin"][1]))
+        self.blocked = arrays["blocked"]
+        self.distance = arrays["distance"]
+        self.dirs = arrays["dirs"]
+        self.reached = arrays["reached"]
+        self.free = arrays["free"]
+        self.rows, self.cols = self.blocked.shape
+        self.xs = np.arange(self.origin[0], self.origin[0] + self.cols) * self.density
+        self.ys = np.arange(self.origin[1], self.origin[1] + self.rows) * self.density
+        self.build_time = 0
 
     def fit(self):
         #Perform backpropogation
-        start = (int(self.goal.get_center()[0]) // self.density * self.density, int(self.goal.get_center()[1]) // self.density * self.density)
-        
-        root_node = FlowField.FlowNode(start, self.goal.get_center())
-
-        self.nodes = {start : root_node}
-        node_queue = [root_node]
-
-        offsets = ((-self.density, 0), (self.density, 0), (0, self.density), (0, -self.density))
-
-        while len(node_queue) > 0:
-            current = node_queue.pop(0)
-            #print(current.pos)
-            for i in offsets:
-                new_pos = (current.pos[0] + i[0], current.pos[1] + i[1])
-                if new_pos in self.nodes.keys():
-                    continue
-                if not (self.region[0] <= new_pos[0] <= self.region[2] and self.region[1] <= new_pos[1] <= self.region[3]):
-                    continue
-                test = False
-                for i in self.env:
-                    if i.check_collision(new_pos):
-                        test = True
-                        self.nodes[new_pos] = FlowField.FlowNode(new_pos, None, (new_pos[0] - i.get_center()[0], new_pos[1] - i.get_center()[1]))
-                        break
-                
-                if test:
-                    continue
-                self.nodes[new_pos] = FlowField.FlowNode(new_pos, current.pos)
-                node_queue.append(self.nodes[new_pos])
-        
-        #print(self.nodes)
+        start_time = time.perf_counter_ns()
+        center = self.goal.get_center()
+        start = (int(center[0]) // self.density, int(center[1]) // self.density)
+
+        min_x = math.ceil(self.region[0] / self.density)
+        min_y = math.ceil(self.region[1] / self.density)
+        max_x = math.floor(self.region[2] / self.density)
+        max_y = math.floor(self.region[3] / self.density)
+        if self.seeds is None:
+            # The goal node is kept even if it falls outside the region
+            min_x, min_y = min(min_x, start[0]), min(min_y, start[1])
+            max_x, max_y = max(max_x, start[0]), max(max_y, start[1])
+        self.origin = (min_x, min_y)
+        cols = max_x - min_x + 1
+        rows = max_y - min_y + 1
+        self.rows = rows
+        self.cols = cols
+        self.xs = np.arange(min_x, max_x + 1) * self.density
+        self.ys = np.arange(min_y, max_y + 1) * self.density
+        x_list = self.xs.tolist()
+        y_list = self.ys.tolist()
+
+        self.blocked = np.zeros((rows, cols), dtype=bool)
+        owner = np.full((rows, cols), -1, dtype=np.int32)
+        for i, obstacle in enumerate(self.env):
+            covered = self.cover(obstacle, x_list, y_list)
+            if covered is None:
+                continue
+            window, hit = covered
+            # Keep the first obstacle in env order as each node's owner
+            owned = owner[window]
+            owned[hit & (owned < 0)] = i
+            self.blocked[window] |= hit
+
+        sources = np.zeros((rows, cols), dtype=bool)
+        if self.seeds is not None:
+            seed_x, seed_y, seed_times, seed_dirs = self.seeds
+            seed_rows = np.asarray(seed_y) - min_y
+            seed_cols = np.asarray(seed_x) - min_x
+            sources[seed_rows, seed_cols] = True
+            initial = np.full((rows, cols), np.inf)
+            initial[seed_rows, seed_cols] = seed_times
+            distance = self.march(initial)
+        else:
+            root = (start[1] - min_y, start[0] - min_x)
+            self.blocked[root] = False
+            sources[root] = True
+            if self.eikonal:
+                # Every free node inside the goal is a source, not just the one under its center
+                covered = self.cover(self.goal, x_list, y_list)
+                if covered is not None:
+                    window, hit = covered
+                    sources[window] |= hit & ~self.blocked[window]
+                distance = self.march(np.where(sources, 0.0, np.inf))
+            else:
+                distance = self.propagate(root)
+        distance[self.blocked] = np.inf
+        self.distance = distance
+
+        # Blocked nodes are reached when they border a reached free node
+        self.free = np.isfinite(distance)
+        padded = np.pad(self.free, 1, constant_values = False)
+        touched = padded[1:-1, :-2] | padded[1:-1, 2:] | padded[:-2, 1:-1] | padded[2:, 1:-1]
+        edge = self.blocked & touched
+        self.reached = self.free | edge
+
+        self.dirs = np.full((rows, cols, 2), np.nan, dtype=np.float32)
+        if self.eikonal:
+            self.descend()
+        else:
+            # Free nodes point at the first neighbor one step closer
+            padded = np.pad(distance, 1, constant_values = np.inf)
+            unset = self.free & ~sources
+            for dx, dy in OFFSETS:
+                parent = unset & (padded[1 + dy:rows + 1 + dy, 1 + dx:cols + 1 + dx] == distance - 1)
+                self.dirs[parent] = (dx * self.density, dy * self.density)
+                unset &= ~parent
+
+        # Blocked nodes point away from their obstacle
+        if edge.any():
+            centers = np.array([obstacle.get_center() for obstacle in self.env], dtype=np.float64)
+            rows_hit, cols_hit = np.nonzero(edge)
+            hit = centers[owner[rows_hit, cols_hit]]
+            self.dirs[rows_hit, cols_hit, 0] = self.xs[cols_hit] - hit[:, 0]
+            self.dirs[rows_hit, cols_hit, 1] = self.ys[rows_hit] - hit[:, 1]
+
+        if self.seeds is not None:
+            # Seeds keep the directions they were given
+            self.dirs[seed_rows, seed_cols] = seed_dirs
+        else:
+            # Sources point at the goal center
+            rows_hit, cols_hit = np.nonzero(sources)
+            self.dirs[rows_hit, cols_hit, 0] = center[0] - self.xs[cols_hit]
+            self.dirs[rows_hit, cols_hit, 1] = center[1] - self.ys[rows_hit]
+        self.build_time = time.perf_counter_ns() - start_time
+
+    def cover(self, shape : area.Area, x_list, y_list):
+        """
+        Finds the nodes inside an Area.
+
+        Returns:
+            tuple | None: (window, hit), the slices of the node arrays around
+            the Area and which nodes in them it contains, or None if it misses the lattice.
+        """
+        bounds = shape.get_bounds()
+        if bounds is None:
+            min_col, max_col, min_row, max_row = 0, len(x_list), 0, len(y_list)
+        else:
+            min_col = bisect.bisect_left(x_list, bounds[0])
+            max_col = bisect.bisect_right(x_list, bounds[2])
+            min_row = bisect.bisect_left(y_list, bounds[1])
+            max_row = bisect.bisect_right(y_list, bounds[3])
+        if min_col >= max_col or min_row >= max_row:
+            return None
+
+        if isinstance(shape, area.RectArea):
+            hit = np.ones((max_row - min_row, max_col - min_col), dtype=bool)
+        elif isinstance(shape, area.CircleArea):
+            node_x, node_y = np.meshgrid(self.xs[min_col:max_col], self.ys[min_row:max_row])
+            hit = np.sqrt((node_x - shape.center[0]) ** 2 + (node_y - shape.center[1]) ** 2) <= shape.radius
+        else:
+            # Unknown shape, use the exact check on each node
+            hit = np.array([[shape.check_collision((x, y)) for x in x_list[min_col:max_col]] for y in y_list[min_row:max_row]], dtype=bool)
+
+        return (slice(min_row, max_row), slice(min_col, max_col)), hit
+
+    def propagate(self, root) -> np.ndarray:
+        """
+        Breadth first search from the root over free nodes, one wavefront at a time.
+
+        Blocked nodes next to the wavefront are reached but not expanded.
+
+        Returns:
+            np.ndarray: Lattice steps from the root, inf where unreached.
+        """
+        rows, cols = self.blocked.shape
+        width = cols + 2
+        # A border of -2 stops the wavefront without bounds checks
+        distance = np.full((rows + 2, width), -2, dtype=np.int32)
+        distance[1:-1, 1:-1] = -1
+        free = np.pad(~self.blocked, 1, constant_values = False).ravel()
+        flat = distance.ravel()
+        steps = np.array([dx + dy * width for dx, dy in OFFSETS])
+        # Last write wins on repeated indices, so each node keeps one slot in the next frontier
+        slot = np.zeros(flat.size, dtype=np.int64)
+
+        frontier = np.array([(root[0] + 1) * width + root[1] + 1])
+        flat[frontier] = 0
+        step = 0
+        while frontier.size > 0:
+            step += 1
+            neighbors = (frontier[:, None] + steps).ravel()
+            neighbors = neighbors[flat[neighbors] == -1]
+            order = np.arange(neighbors.size)
+            slot[neighbors] = order
+            neighbors = neighbors[slot[neighbors] == order]
+            flat[neighbors] = step
+            frontier = neighbors[free[neighbors]]
+
+        distance = distance[1:-1, 1:-1].astype(np.float32)
+        distance[distance < 0] = np.inf
+        return distance
+
+    def march(self, initial) -> np.ndarray:
+        """
+        Solves |grad T| = 1 over free nodes with T fixed at the source nodes
+        (the finite entries of initial), using the fast iterative method.
+
+        An active band of nodes is updated together with the upwind eikonal
+        solver. Converged nodes leave the band and add any neighbor they
+        improve, so the band sweeps outward like the BFS wavefront, and nodes
+        behind obstacles are revisited until their arrival times settle.
+
+        Returns:
+            np.ndarray: Arrival times in lattice steps, inf where unreached.
+        """
+        rows, cols = self.blocked.shape
+        width = cols + 2
+        times = np.pad(initial.astype(np.float64), 1, constant_values = np.inf)
+        flat = times.ravel()
+        free = np.pad(~self.blocked, 1, constant_values = False).ravel()
+        steps = np.array([dx + dy * width for dx, dy in OFFSETS])
+        slot = np.zeros(flat.size, dtype=np.int64)
+        active = np.zeros(flat.size, dtype=bool)
+
+        def solve(nodes):
+            a = np.minimum(flat[nodes - 1], flat[nodes + 1])
+            b = np.minimum(flat[nodes - width], flat[nodes + width])
+            low = np.minimum(a, b)
+            gap = np.abs(a - b)
+            # Two sided update when both axes are close enough, otherwise one step from the lower
+            two_sided = (a + b + np.sqrt(np.maximum(2 - gap * gap, 0))) / 2
+            return np.where(gap < 1, two_sided, low + 1)
+
+        def unique(nodes):
+            order = np.arange(nodes.size)
+            slot[nodes] = order
+            return nodes[slot[nodes] == order]
 
+        seeds = np.flatnonzero(np.isfinite(flat))
+        band = (seeds[:, None] + steps).ravel()
+        band = unique(band[free[band] & np.isinf(flat[band])])
+        active[band] = True
 
+        with np.errstate(invalid = "ignore"):
+            while band.size > 0:
+                old = flat[band]
+                new = np.minimum(solve(band), old)
+                flat[band] = new
+                converged = ~(old - new > TOLERANCE)
+                done = band[converged]
+                band = band[~converged]
+                active[done] = False
 
+                # Neighbors outside the band that the settled nodes improve join it
+                neighbors = (done[:, None] + steps).ravel()
+                neighbors = unique(neighbors[free[neighbors] & ~active[neighbors]])
+                better = solve(neighbors)
+                improved = better < flat[neighbors] - TOLERANCE
+                neighbors = neighbors[improved]
+                flat[neighbors] = better[improved]
+                active[neighbors] = True
+                band = np.concatenate((band, neighbors))
 
+        return times[1:-1, 1:-1].astype(np.float32)
+
+    def descend(self):
+        """
+        Points each free node down the upwind gradient of the arrival times,
+        scaled to the node spacing.
+        """
+        times = self.distance
+        padded = np.pad(times, 1, constant_values = np.inf)
+        left, right = padded[1:-1, :-2], padded[1:-1, 2:]
+        up, down = padded[:-2, 1:-1], padded[2:, 1:-1]
+
+        # Toward the lower neighbor on each axis, if it is lower than the node
+        with np.errstate(invalid = "ignore"):
+            dx = np.where(left < right, np.minimum(left - times, 0), -np.minimum(right - times, 0))
+            dy = np.where(up < down, np.minimum(up - times, 0), -np.minimum(down - times, 0))
+        dx[~self.free] = 0
+        dy[~self.free] = 0
+        norm = np.sqrt(dx * dx + dy * dy)
+        moving = norm > 0
+        self.dirs[moving, 0] = dx[moving] / norm[moving] * self.density
+        self.dirs[moving, 1] = dy[moving] / norm[moving] * self.density
 
     def get_move_at(self, pos):
-        #Find closest nodes and interpolate
-        start = (int(pos[0]) // self.density * self.density, int(pos[1]) // self.density * self.density)
-        
-        offsets = ((0,0), (0, self.density), (self.density, 0), (self.density, self.density))
-        
-        # dir = (0,0)
-
-        # for i in offsets:
-        #     loc = (start[0] + i[0], start[1] + i[1])
-        #     if loc in self.nodes:
-        #         dir = util.dir_average(dir, self.nodes[loc].dir)
-        
-        # if len(dir) == 3:
-        #     for i in offsets:
-        #         loc = (start[0] + i[0], start[1] + i[1])
-        #         if loc in self.nodes:
-        #             dir = self.nodes[loc].dir
-        #             break
-
-        # return dir 
-
-        closest = None
-        min = 999999999999999
-        for i in offsets:
-            loc = (start[0] + i[0], start[1] + i[1])
-            dist = util.length((pos[0] - loc[0], pos[1] - loc[1]))
-            if loc in self.nodes and dist < min:
-                closest = self.nodes[loc]
-                min = dist
-
-        return closest.dir
+        x = pos[0] / self.density - self.origin[0]
+        y = pos[1] / self.density - self.origin[1]
+        if self.eikonal:
+            move = self.interpolate(x, y)
+            if move is not None:
+                return move
+        else:
+            #Find the closest node and read its direction
+            col = x + 0.5
+            row = y + 0.5
+            if 0 <= col < self.cols and 0 <= row < self.rows:
+                dx = self.dirs.item(int(row), int(col), 0)
+                # Unreached nodes hold NaN, the only value not equal to itself
+                if dx == dx:
+                    return (dx, self.dirs.item(int(row), int(col), 1))
+
+        # Fall back to the closest reached corner of the cell around pos
+        col = math.floor(x)
+        row = math.floor(y)
+        corners = sorted(((col + dx, row + dy) for dx in (0, 1) for dy in (0, 1)), key = lambda c: (c[0] - x) ** 2 + (c[1] - y) ** 2)
+        for c, r in corners:
+            if 0 <= r < self.rows and 0 <= c < self.cols and self.reached[r, c]:
+                return (self.dirs.item(r, c, 0), self.dirs.item(r, c, 1))
+        return NO_DIR
+
+    def interpolate(self, x, y):
+        """
+        Bilinear blend of the free corner directions of the cell around
+        lattice position (x, y), weights renormalized over the free corners.
+        Returns None if no corner is free or the blend cancels out.
+        """
+        col = math.floor(x)
+        row = math.floor(y)
+        fx = x - col
+        fy = y - row
+        dx = 0
+        dy = 0
+        total = 0
+        for c, r, weight in ((col, row, (1 - fx) * (1 - fy)), (col + 1, row, fx * (1 - fy)),
+                             (col, row + 1, (1 - fx) * fy), (col + 1, row + 1, fx * fy)):
+            if 0 <= r < self.rows and 0 <= c < self.cols and self.free.item(r, c):
+                dx += self.dirs.item(r, c, 0) * weight
+                dy += self.dirs.item(r, c, 1) * weight
+                total += weight
+        if total == 0 or (dx == 0 and dy == 0):
+            return None
+        return (dx / total, dy / total)
+
+    def get_moves_at(self, positions, interpolate = None) -> np.ndarray:
+        """
+        Samples the field at many positions at once, following the same
+        rules as get_move_at.
+
+        Args:
+            positions: (N, 2) array of positions.
+            interpolate (bool | None): Blend the free corners bilinearly, or read
+                the nearest reached corner. Defaults to the field type, like get_move_at.
+
+        Returns:
+            np.ndarray: (N, 2) directions, NaN rows where get_move_at returns NO_DIR.
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        if interpolate is None:
+            interpolate = self.eikonal
+        x = positions[:, 0] / self.density - self.origin[0]
+        y = positions[:, 1] / self.density - self.origin[1]
+        col = np.floor(x)
+        row = np.floor(y)
+        fx = (x - col)[:, None]
+        fy = (y - row)[:, None]
+
+        # (N, 4) flat lattice indices of the cell corners, 0 where off the lattice
+        cols = col.astype(np.int64)[:, None] + CORNER_X
+        rows = row.astype(np.int64)[:, None] + CORNER_Y
+        inside = (cols >= 0) & (cols < self.cols) & (rows >= 0) & (rows < self.rows)
+        flat = np.where(inside, rows * self.cols + cols, 0)
+        dirs = self.dirs.reshape(-1, 2)
+
+        moves = np.full((len(positions), 2), np.nan)
+        pending = None
+        if interpolate:
+            # 1 - f on the near corners and f on the far ones, as interpolate weighs them
+            weights = (1 - CORNER_X + (2 * CORNER_X - 1) * fx) * (1 - CORNER_Y + (2 * CORNER_Y - 1) * fy)
+            # Free nodes are always reached, other corners (NaN or not) are left out
+            free = inside & self.free.reshape(-1)[flat]
+            weights[~free] = 0
+            corner_x = np.where(free, dirs[flat, 0], 0)
+            corner_y = np.where(free, dirs[flat, 1], 0)
+            total = weights.sum(axis = 1)
+            dx = (corner_x * weights).sum(axis = 1)
+            dy = (corner_y * weights).sum(axis = 1)
+            blended = (total > 0) & ((dx != 0) | (dy != 0))
+            moves[:, 0] = dx / np.where(blended, total, np.nan)
+            moves[:, 1] = dy / np.where(blended, total, np.nan)
+            if blended.all():
+                return moves
+            pending = np.flatnonzero(~blended)
+
+        # Closest reached corner, which is the nearest node whenever that one is reached
+        if pending is not None:
+            flat = flat[pending]
+            inside = inside[pending]
+            fx = fx[pending]
+            fy = fy[pending]
+        dist = (CORNER_X - fx) ** 2 + (CORNER_Y - fy) ** 2
+        dist[~(inside & self.reached.reshape(-1)[flat])] = np.inf
+        best = dist.argmin(axis = 1)
+        pick = np.arange(len(best))
+        found = dist[pick, best] != np.inf
+        nearest = np.where(found[:, None], dirs[flat[pick, best]], np.nan)
+        if pending is None:
+            return nearest
+        moves[pending] = nearest
+        return moves
+
+    def stats(self) -> dict:
+        return {
+            "nodes": int(self.reached.sum()),
+            "cells": self.reached.size,
+            "bytes": self.distance.nbytes + self.dirs.nbytes + self.reached.nbytes + self.free.nbytes + self.blocked.nbytes,
+            "build_time": self.build_time,
+        }
 
     def render(self, surface, offset = (0,0), scale = 1):
         #render every node
-        for key in self.nodes:
-            self.nodes[key].render(surface, offset, scale)
+        for row, col in zip(*np.nonzero(self.reached)):
+            pos = (self.xs[col], self.ys[row])
+            dir = self.dirs[row, col]
+            pygame.draw.line(surface, (0, 255, 0), ((pos[0] - offset[0]) * scale, (pos[1] - offset[1]) * scale), ((pos[0] + dir[0] * 2 - offset[0]) * scale, (pos[1] + dir[1] * 2 - offset[1]) * scale))
+            pygame.draw.circle(surface, (0,200,0), ((pos[0] - offset[0]) * scale, (pos[1] - offset[1]) * scale), 0.25 * scale)
+
+
+def fingerprint(env) -> tuple:
+    """
+    Identifies the current obstacle layout of an environment: the list
+    itself, its length, and which build of its collision index has logged
+    how many moves.
+    """
+    index = spatial.get_index(env)
+    return (id(env), len(env), getattr(index, "serial", None), len(getattr(index, "changes", ())))
+
+
+class FlowFieldPool:
+    """
+    Least recently used cache of flow fields bounded by memory.
+
+    Fields keep their goal and environment alive, so the ids in a key
+    cannot be reused by other objects while the field is cached.
+
+    Attributes:
+        max_bytes (int): Bytes of field arrays held before the least recently used field is evicted.
+        fields (OrderedDict[tuple, FlowField]): Cached fields, least recently used first.
+        sizes (dict[tuple, int]): Bytes of each cached field.
+        bytes (int): Bytes currently held.
+        requests (int): Fields asked for.
+        hits (int): Requests answered from the cache.
+        evictions (int): Fields dropped to stay under max_bytes.
+        build_time (int): Nanoseconds spent fitting fields on misses.
+        store (store.PrecomputeStore | None): On-disk store misses are loaded from
+            and fitted fields are saved to, or None to always fit.
+    """
+
+    def __init__(self, max_bytes = 64 * 1024 * 1024, store = None):
+        self.max_bytes = max_bytes
+        self.store = store
+        self.fields = collections.OrderedDict()
+        self.sizes = {}
+        self.bytes = 0
+        self.reset_stats()
+
+    @staticmethod
+    def key(goal, env, density, region, eikonal) -> tuple:
+        # Equal goal areas share a field even if they are different objects
+        shape = goal.get_bounds()
+        if shape is None:
+            shape = goal.get_center()
+        return (type(goal).__name__, shape, fingerprint(env), density, tuple(region), eikonal)
+
+    def get(self, goal, env, density = 5, region = (0, 0, 200, 125), eikonal = True) -> FlowField:
+        """Returns the cached field for these settings, fitting it on a miss."""
+        self.requests += 1
+        key = FlowFieldPool.key(goal, env, density, region, eikonal)
+        field = self.fields.get(key)
+        if field is not None:
+            self.hits += 1
+            self.fields.move_to_end(key)
+            return field
+
+        if self.store is not None:
+            field = self.store.get_field(goal, env, density, region, eikonal)
+        else:
+            field = FlowField(goal, env, density, region, eikonal)
+        self.build_time += field.build_time
+        self.fields[key] = field
+        self.sizes[key] = field.stats()["bytes"]
+        self.bytes += self.sizes[key]
+        self.evict()
+        return field
+
+    def evict(self):
+        while self.bytes > self.max_bytes and len(self.fields) > 0:
+            key, _ = self.fields.popitem(last = False)
+            self.bytes -= self.sizes.pop(key)
+            self.evictions += 1
+
+    def clear(self):
+        self.fields.clear()
+        self.sizes.clear()
+        self.bytes = 0
+
+    def reset_stats(self):
+        self.requests = 0
+        self.hits = 0
+        self.evictions = 0
+        self.build_time = 0
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.requests if self.requests > 0 else 0,
+            "evictions": self.evictions,
+            "fields": len(self.fields),
+            "bytes": self.bytes,
+            "build_time": self.build_time,
+        }
+
+
+FIELD_POOL = FlowFieldPool()   # Shared pool used by get_field
+
+
+def get_field(goal, env, density = 5, region = (0, 0, 200, 125), eikonal = True) -> FlowField:
+    """Returns the shared flow field for a goal in an environment, fitting it on first use."""
+    return FIELD_POOL.get(goal, env, density, region, eikonal)
+
+
+def clear_cache():
+    FIELD_POOL.clear()
+    FIELD_POOL.reset_stats()
@@ -5,28 +5,83 @@ Implements a Hierarchical A* (HA*) pathfinding algorithm for continuous
 navigation environments.
 
 The planner operates in two stages:
-1. High-level A* search on a coarse grid to generate waypoints.
+1. High-level search for waypoints.
 2. Low-level continuous A* searches between successive waypoints.
 
-Aggressive caching is used to significantly improve performance when
-multiple agents share similar start/goal configurations.
+The high level is HPA* by default. Once per environment, AbstractGraph
+lays a lattice over the map, splits it into square clusters, places
+transition nodes on the free runs along every shared cluster border, and
+stores the cost between the transitions of each cluster (found inside
+the cluster only, so walls within a cluster are respected). The first
+query to a goal runs Dijkstra outward from the goal over that small
+abstract graph and keeps the tree. Every query to that goal then only
+searches its start's cluster to link the start into the tree and reads
+its route off the tree, so its cost is independent of the map size apart
+from the length of the route it returns. Graphs are shared by every
+query in the same environment through get_graph, the MAX_ENVS most
+recently used are kept. The original coarse grid A* (high_level_search)
+is kept as the abstract=False mode.
+
+Waypoint lists and segment paths are cached per environment (HACaches,
+through get_caches) in least recently used caches bounded by entry count,
+so caches never leak between environments and are dropped when obstacles
+change. Segment keys snap the segment start to SEGMENT_QUANTUM cells, no
+bigger than one move, so agents starting close to each other share
+segments. Cached moves are relative, a hit is only reused if replaying
+it from the segment's own start is clear (ContinuousNavigation.path_clear),
+otherwise the segment is searched again. Every cache counts its hits,
+misses and evictions.
+
+With a SegmentPool, the segments of a query that miss the cache are
+refined concurrently in worker processes once the waypoints are known,
+and joined back in waypoint order. stream_hierarchical_astar instead
+refines segments lazily, one per request, for agents that only need
+their next few moves.
+
+Dependencies:
+- numpy (lattice and intra-cluster cost arrays)
+- util (vector math)
+- search (low-level A*)
+- area (segment goal areas)
+- problem (ContinuousNavigation problem definition)
+- spatial, occupancy (obstacle rasterization and change log)
+- pathfinder (worker process setup and solving)
 """
 
 from queue import PriorityQueue
+import collections
+import concurrent.futures
+import heapq
+import math
+import time
+import numpy as np
 import util
 import search
 import area
+import spatial, occupancy, pathfinder
 from problem import ContinuousNavigation
 import copy
 
-GRID_CACHE = {}         # Maps (start_grid, goal_grid, density) → waypoint list
-SEGMENT_CACHE = {}      # Maps (start_pos, waypoint_pos) → low-level A* path
+GRAPH_CACHE = collections.OrderedDict() # Maps (id(env), cluster_nodes, step) → AbstractGraph, least recently used first
+ENV_CACHES = collections.OrderedDict()  # Maps id(env) → HACaches, least recently used first
+
+WAYPOINT_ENTRIES = 1024 # Waypoint lists kept per environment
+SEGMENT_ENTRIES = 2048  # Low-level segment paths kept per environment
+SEGMENT_QUANTUM = ContinuousNavigation.SPEED  # World units per cell segment starts are snapped to in cache keys
+MAX_ENVS = 4            # Environments whose caches and graphs are kept
+
+CLUSTER_NODES = 5       # Lattice steps along a cluster side
+GRAPH_STEP = 5          # World units between lattice nodes of the abstract graph
+SQRT2 = math.sqrt(2)
+MOVES = tuple((dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dx != 0 or dy != 0)
 
 
 class HAGridNode:
     """
     Node representation for the high-level grid-based A* search.
     """
+    __slots__ = ("pos", "cost", "heuristic", "f", "id")
+
     def __init__(self, pos: tuple[float, float], cost: float, heuristic: float, node_id: int):
         self.pos = pos
         self.cost = cost
@@ -46,6 +101,136 @@ class HAGridNode:
         return self.pos == other.pos
 
 
+def env_fingerprint(env) -> tuple:
+    """Obstacle layout of env (see spatial.layout), changes whenever obstacles do."""
+    return spatial.layout(env)
+
+
+class LRUCache:
+    """
+    Least recently used cache bounded by entry count.
+
+    Attributes:
+        max_entries (int): Entries kept before the least recently used is evicted, 0 keeps none.
+        entries (OrderedDict): Cached values, least recently used first.
+        hits (int): Lookups answered.
+        misses (int): Lookups not found.
+        evictions (int): Entries dropped to stay under max_entries.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.reset_stats()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        """Returns the cached value, or None on a miss."""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last = False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups > 0 else 0,
+            "evictions": self.evictions,
+        }
+
+
+class HACaches:
+    """
+    HA* caches of one environment.
+
+    Attributes:
+        env (list[Area]): Environment the cached searches ran in.
+        fingerprint (tuple): env_fingerprint of env when the caches were created.
+        waypoints (LRUCache): High-level waypoint lists, keyed (start cell, goal, density)
+            for the coarse grid and (start node, goal, 0) for the HPA* graph.
+        segments (LRUCache): Low-level moves, keyed (start cell, waypoint).
+        quantum (float): Cell size segment starts are snapped to.
+        unclear (int): Segment hits not reused because their replay from the
+            segment's own start collided.
+    """
+
+    def __init__(self, env, max_waypoints = WAYPOINT_ENTRIES, max_segments = SEGMENT_ENTRIES, quantum = SEGMENT_QUANTUM):
+        self.env = env
+        self.fingerprint = env_fingerprint(env)
+        self.waypoints = LRUCache(max_waypoints)
+        self.segments = LRUCache(max_segments)
+        self.quantum = quantum
+        self.unclear = 0
+
+    def segment_key(self, start, waypoint) -> tuple:
+        return ((math.floor(start[0] / self.quantum), math.floor(start[1] / self.quantum)), waypoint)
+
+    def cached_segment(self, problem, start, key):
+        """Cached moves under key if they are clear when replayed from start, else None."""
+        moves = self.segments.get(key)
+        if moves is not None and not problem.path_clear(start, moves):
+            self.unclear += 1
+            return None
+        return moves
+
+    def reset_stats(self):
+        self.waypoints.reset_stats()
+        self.segments.reset_stats()
+        self.unclear = 0
+
+    def stats(self) -> dict:
+        stats = {"waypoint_" + key: value for key, value in self.waypoints.stats().items()}
+        stats.update({"segment_" + key: value for key, value in self.segments.stats().items()})
+        stats["segment_unclear"] = self.unclear
+        return stats
+
+
+def get_caches(env) -> HACaches:
+    """
+    Returns the HA* caches of an environment, starting empty ones on first
+    use or after obstacles were added, removed or moved. Only the MAX_ENVS
+    most recently used environments keep their caches.
+    """
+    caches = ENV_CACHES.get(id(env))
+    if caches is None or caches.env is not env or caches.fingerprint != env_fingerprint(env):
+        caches = HACaches(env)
+        ENV_CACHES[id(env)] = caches
+    ENV_CACHES.move_to_end(id(env))
+    while len(ENV_CACHES) > MAX_ENVS:
+        ENV_CACHES.popitem(last = False)
+    return caches
+
+
+def clear_caches():
+    ENV_CACHES.clear()
+
+
 def get_grid_center(pos: tuple[float, float], density: float) -> tuple[float, float]:
     grid_x = int(pos[0] // density) * density + density / 2
     grid_y = int(pos[1] // density) * density + density / 2
@@ -66,12 +251,14 @@ def high_level_search(problem: ContinuousNavigation, density: float) -> list[tup
     start_grid = get_grid_center(problem.initial_state, density)
     goal_grid = get_grid_center(goal_center, density)
 
+    cache = get_caches(problem.maze).waypoints
     cache_key = (start_grid, goal_grid, density)
-    if cache_key in GRID_CACHE:
-        return GRID_CACHE[cache_key]
+    waypoints = cache.get(cache_key)
+    if waypoints is not None:
+        return waypoints
 
     if start_grid == goal_grid:
-        GRID_CACHE[cache_key] = [goal_center]
+        cache.put(cache_key, [goal_center])
         return [goal_center]
 
     def h(pos: tuple[float, float]) -> float:
@@ -103,14 +290,14 @@ def high_level_search(problem: ContinuousNavigation, density: float) -> list[tup
             if waypoints and waypoints[-1] == goal_grid:
                 waypoints[-1] = goal_center  # Snap last waypoint to exact goal
 
-            GRID_CACHE[cache_key] = waypoints
+            cache.put(cache_key, waypoints)
             return waypoints
 
         # Expand neighbors
         for neighbor_pos in get_neighbors(current_pos, density):
 
             # OBSTACLE COLLISION ONLY — this is correct
-            if any(obstacle.check_collision(neighbor_pos) for obstacle in problem.maze):
+            if problem.collision_at(neighbor_pos[0], neighbor_pos[1]):
                 continue
 
             cost = util.length(
@@ -129,47 +316,465 @@ def high_level_search(problem: ContinuousNavigation, density: float) -> list[tup
                 frontier.put(neighbor_node)
                 node_id_counter += 1
 
-    GRID_CACHE[cache_key] = []
+    cache.put(cache_key, [])
     return []
 
 
-def hierarchical_astar_search(problem: ContinuousNavigation) -> list[tuple[float, float]]:
+class AbstractGraph:
+    """
+    HPA* abstract graph over one environment.
+
+    Lattice nodes are free when their point lies outside every obstacle
+    (checked on the conservative occupancy grid). Moves are 8-connected
+    without corner cutting, and obstacles thinner than step can fall
+    between nodes, the low-level search still routes around them.
+
+    Attributes:
+        env (list[Area]): Environment the graph was built for.
+        step (float): World units between lattice nodes.
+        cluster_nodes (int): Lattice nodes along a cluster side.
+        origin (tuple[int, int]): Lattice index (x / step, y / step) of node [0, 0].
+        free (np.ndarray): Free lattice nodes, indexed as [row (y), column (x)].
+        transitions (dict[tuple, list[tuple]]): Transition nodes (column, row) of each cluster.
+        edges (dict[tuple, dict[tuple, float]]): Abstract edges between transition nodes with their costs.
+        trees (OrderedDict[tuple, tuple]): (costs, next node) toward each recent goal
+            node, least recently used first, see goal_tree.
+        max_trees (int): Goal trees kept.
+        fingerprint (tuple): env_fingerprint of env when the graph was built.
+        build_time (int): Nanoseconds spent building the graph.
+        queries (int): Waypoint queries answered.
+        expansions (int): Abstract nodes expanded building goal trees.
+        query_time (int): Nanoseconds spent answering queries.
+    """
+
+    def __init__(self, env, cluster_nodes = CLUSTER_NODES, step = GRAPH_STEP, region = None, max_trees = 16):
+        start_time = time.perf_counter_ns()
+        self.env = env
+        self.step = step
+        self.cluster_nodes = cluster_nodes
+        self.fingerprint = env_fingerprint(env)
+        if region is None:
+            region = self.default_region()
+
+        min_x = math.floor(region[0] / step)
+        min_y = math.floor(region[1] / step)
+        self.origin = (min_x, min_y)
+        self.cols = math.ceil(region[2] / step) - min_x + 1
+        self.rows = math.ceil(region[3] / step) - min_y + 1
+        xs = (np.arange(self.cols) + min_x) * step
+        ys = (np.arange(self.rows) + min_y) * step
+        grid = env if isinstance(env, occupancy.OccupancyGrid) else occupancy.get_grid(env)
+        points = np.column_stack((np.tile(xs, self.rows), np.repeat(ys, self.cols)))
+        self.free = ~grid.check_points(points).reshape(self.rows, self.cols)
+
+        self.transitions = {}
+        self.edges = {}
+        self.trees = collections.OrderedDict()
+        self.max_trees = max_trees
+        self.link_clusters()
+        self.link_transitions()
+        self.build_time = time.perf_counter_ns() - start_time
+        self.queries = 0
+        self.expansions = 0
+        self.query_time = 0
+
+    def default_region(self) -> tuple[float, float, float, float]:
+        # Obstacle extent plus one cluster on every side, room for starts and goals past the obstacles
+        bounds = [obstacle.get_bounds() for obstacle in self.env]
+        bounds = [b for b in bounds if b is not None]
+        if len(bounds) == 0:
+            bounds = [(0, 0, 0, 0)]
+        pad = self.step * self.cluster_nodes
+        return (min(b[0] for b in bounds) - pad, min(b[1] for b in bounds) - pad,
+                max(b[2] for b in bounds) + pad, max(b[3] for b in bounds) + pad)
+
+    def cluster_of(self, node) -> tuple[int, int]:
+        return (node[0] // self.cluster_nodes, node[1] // self.cluster_nodes)
+
+    def to_world(self, node) -> tuple[float, float]:
+        return ((node[0] + self.origin[0]) * self.step, (node[1] + self.origin[1]) * self.step)
+
+    def add_edge(self, a, b, cost):
+        self.edges.setdefault(a, {})[b] = cost
+        self.edges.setdefault(b, {})[a] = cost
+
+    def link_clusters(self):
+        """Places transition pairs on the free runs along every border between two clusters."""
+        n = self.cluster_nodes
+        for vertical in (True, False):
+            # Lines are the first column (or row) of each cluster after the first
+            length = self.rows if vertical else self.cols
+            for line in range(n, self.cols if vertical else self.rows, n):
+                if vertical:
+                    open_pairs = self.free[:, line - 1] & self.free[:, line]
+                else:
+                    open_pairs = self.free[line - 1, :] & self.free[line, :]
+                for begin in range(0, length, n):
+                    run_start = None
+                    for i in range(begin, min(begin + n, length) + 1):
+                        if i < min(begin + n, length) and open_pairs[i]:
+                            if run_start is None:
+                                run_start = i
+                            continue
+                        if run_start is not None:
+                            # Short runs get one transition in the middle, long ones one at each end
+                            ends = (run_start, i - 1) if i - run_start >= 6 else ((run_start + i - 1) // 2,)
+                            for at in ends:
+                                a, b = ((line - 1, at), (line, at)) if vertical else ((at, line - 1), (at, line))
+                                self.transitions.setdefault(self.cluster_of(a), []).append(a)
+                                self.transitions.setdefault(self.cluster_of(b), []).append(b)
+                                self.add_edge(a, b, self.step)
+                            run_start = None
+
+    def link_transitions(self):
+        """
+        Finds the in-cluster cost between every two transitions of each
+        cluster. Layer k holds the distances from the k-th transition of
+        every cluster at once, relaxed over the lattice until it settles.
+        """
+        if len(self.transitions) == 0:
+            return
+        layers = max(len(nodes) for nodes in self.transitions.values())
+        distance = np.full((layers, self.rows, self.cols), np.inf)
+        for nodes in self.transitions.values():
+            for k, (col, row) in enumerate(nodes):
+                distance[k, row, col] = 0
+
+        # Moves allowed from [row, col] by each offset: both ends free, same cluster, no corner cutting
+        rows = np.arange(self.rows)[:, None] // self.cluster_nodes
+        cols = np.arange(self.cols)[None, :] // self.cluster_nodes
+        moves = []
+        for dx, dy in MOVES:
+            src = (slice(max(-dy, 0), self.rows - max(dy, 0)), slice(max(-dx, 0), self.cols - max(dx, 0)))
+            dst = (slice(max(dy, 0), self.rows + min(dy, 0)), slice(max(dx, 0), self.cols + min(dx, 0)))
+            allowed = self.free[src] & self.free[dst]
+            allowed &= (np.broadcast_to(rows, self.free.shape)[src] == np.broadcast_to(rows, self.free.shape)[dst])
+            allowed &= (np.broadcast_to(cols, self.free.shape)[src] == np.broadcast_to(cols, self.free.shape)[dst])
+            if dx != 0 and dy != 0:
+                side_x = (src[0], dst[1])
+                side_y = (dst[0], src[1])
+                allowed &= self.free[side_x] & self.free[side_y]
+            cost = np.where(allowed, self.step * (SQRT2 if dx != 0 and dy != 0 else 1), np.inf)
+            moves.append((src, dst, cost))
+
+        changed = True
+        while changed:
+            changed = False
+            for src, dst, cost in moves:
+                relaxed = distance[(slice(None),) + src] + cost
+                target = distance[(slice(None),) + dst]
+                better = relaxed < target
+                if better.any():
+                    target[better] = relaxed[better]
+                    changed = True
+
+        for nodes in self.transitions.values():
+            for k, a in enumerate(nodes):
+                for b in nodes[k + 1:]:
+                    cost = distance[k, b[1], b[0]]
+                    if a != b and cost != np.inf:
+                        self.add_edge(a, b, float(cost))
+
+    def node_near(self, pos):
+        """Free lattice node closest to pos inside the cluster pos falls in (or the nearest cluster), or None."""
+        col = min(max(round(pos[0] / self.step) - self.origin[0], 0), self.cols - 1)
+        row = min(max(round(pos[1] / self.step) - self.origin[1], 0), self.rows - 1)
+        cluster = self.cluster_of((col, row))
+        c0 = cluster[0] * self.cluster_nodes
+        r0 = cluster[1] * self.cluster_nodes
+        window = self.free[r0:r0 + self.cluster_nodes, c0:c0 + self.cluster_nodes]
+        if not window.any():
+            return None
+        r, c = np.nonzero(window)
+        x = (c + c0 + self.origin[0]) * self.step - pos[0]
+        y = (r + r0 + self.origin[1]) * self.step - pos[1]
+        best = int(np.argmin(x * x + y * y))
+        return (int(c[best]) + c0, int(r[best]) + r0)
+
+    def local_costs(self, node) -> dict[tuple, float]:
+        """Dijkstra over the lattice nodes of node's cluster, the same moves as link_transitions."""
+        cluster = self.cluster_of(node)
+        costs = {node: 0}
+        queue = [(0, node)]
+        while queue:
+            cost, current = heapq.heappop(queue)
+            if cost > costs[current]:
+                continue
+            for dx, dy in MOVES:
+                nxt = (current[0] + dx, current[1] + dy)
+                if not (0 <= nxt[0] < self.cols and 0 <= nxt[1] < self.rows) or self.cluster_of(nxt) != cluster:
+                    continue
+                if not self.free[nxt[1], nxt[0]]:
+                    continue
+                if dx != 0 and dy != 0 and not (self.free[current[1], nxt[0]] and self.free[nxt[1], current[0]]):
+                    continue
+                new_cost = cost + self.step * (SQRT2 if dx != 0 and dy != 0 else 1)
+                if new_cost < costs.get(nxt, math.inf):
+                    costs[nxt] = new_cost
+                    heapq.heappush(queue, (new_cost, nxt))
+        return costs
+
+    def find_waypoints(self, start_pos, goal_pos) -> list[tuple[float, float]]:
+        """
+        Waypoints from start_pos to goal_pos: the node where the abstract
+        path enters each cluster, then goal_pos. Empty if no path is known.
+        """
+        start_time = time.perf_counter_ns()
+        self.queries += 1
+        waypoints = self.abstract_path(start_pos, goal_pos)
+        self.query_time += time.perf_counter_ns() - start_time
+        return waypoints
+
+    def goal_tree(self, goal) -> tuple[dict, dict]:
+        """
+        Cost to goal and next node toward it of every abstract node that
+        reaches goal, by Dijkstra outward from goal. Trees are kept for
+        later queries to the same goal node.
+        """
+        tree = self.trees.get(goal)
+        if tree is not None:
+            self.trees.move_to_end(goal)
+            return tree
+
+        # The goal is linked to the transitions of its own cluster, edge costs are symmetric
+        goal_costs = self.local_costs(goal)
+        costs = {goal: 0}
+        next_node = {goal: None}
+        queue = []
+        for node in self.transitions.get(self.cluster_of(goal), []):
+            if node in goal_costs and node != goal:
+                costs[node] = goal_costs[node]
+                next_node[node] = goal
+                queue.append((goal_costs[node], node))
+        heapq.heapify(queue)
+        while queue:
+            cost, current = heapq.heappop(queue)
+            if cost > costs[current]:
+                continue
+            self.expansions += 1
+            for nxt, edge in self.edges.get(current, {}).items():
+                new_cost = cost + edge
+                if new_cost < costs.get(nxt, math.inf):
+                    costs[nxt] = new_cost
+                    next_node[nxt] = current
+                    heapq.heappush(queue, (new_cost, nxt))
+
+        self.trees[goal] = (costs, next_node)
+        if len(self.trees) > self.max_trees:
+            self.trees.popitem(last = False)
+        return costs, next_node
+
+    def abstract_path(self, start_pos, goal_pos) -> list[tuple[float, float]]:
+        start = self.node_near(start_pos)
+        goal = self.node_near(goal_pos)
+        if start is None or goal is None:
+            return []
+        if start == goal:
+            return [goal_pos]
+
+        cache = get_caches(self.env).waypoints
+        cache_key = (self.to_world(start), tuple(goal_pos), 0)
+        waypoints = cache.get(cache_key)
+        if waypoints is not None:
+            return waypoints
+
+        # Insert the start, linked to the transitions of its cluster (or the goal itself)
+        costs, next_node = self.goal_tree(goal)
+        best = None
+        best_cost = math.inf
+        for node, cost in self.local_costs(start).items():
+            if node in costs and cost + costs[node] < best_cost:
+                best = node
+                best_cost = cost + costs[node]
+        if best is None:
+            cache.put(cache_key, [])
+            return []
+
+        nodes = [start]
+        node = best
+        while node is not None:
+            nodes.append(node)
+            node = next_node[node]
+
+        # Keep the node entering each cluster, the exit node of a transition pair is a step before it
+        waypoints = []
+        for i in range(1, len(nodes) - 1):
+            if self.cluster_of(nodes[i]) == self.cluster_of(nodes[i + 1]):
+                waypoints.append(self.to_world(nodes[i]))
+        waypoints.append(goal_pos)
+        cache.put(cache_key, waypoints)
+        return waypoints
+
+    def stats(self) -> dict:
+        return {
+            "nodes": len(self.edges),
+            "edges": sum(len(links) for links in self.edges.values()) // 2,
+            "build_time": self.build_time,
+            "queries": self.queries,
+            "expansions_per_query": self.expansions / self.queries if self.queries > 0 else 0,
+            "query_time": self.query_time,
+        }
+
+
+def get_graph(env, cluster_nodes = CLUSTER_NODES, step = GRAPH_STEP) -> AbstractGraph:
+    """
+    Returns the shared HPA* graph of an environment, building it on first
+    use or after obstacles were added, removed or moved. Only the MAX_ENVS
+    most recently used graphs are kept.
+    """
+    key = (id(env), cluster_nodes, step)
+    graph = GRAPH_CACHE.get(key)
+    if graph is None or graph.env is not env or graph.fingerprint != env_fingerprint(env):
+        graph = AbstractGraph(env, cluster_nodes, step)
+        GRAPH_CACHE[key] = graph
+    GRAPH_CACHE.move_to_end(key)
+    while len(GRAPH_CACHE) > MAX_ENVS:
+        GRAPH_CACHE.popitem(last = False)
+    return graph
+
+
+def clear_graphs():
+    GRAPH_CACHE.clear()
+
+
+class SegmentPool:
+    """
+    Worker processes refining HA* segments concurrently.
+
+    Workers are set up with pathfinder.init_worker, so the environment is
+    shipped to each worker once when the pool starts and each segment only
+    sends its start and waypoint. The pool restarts when queries move to
+    another environment or its obstacles change, since the workers hold a
+    copy taken when they started.
+
+    Parallel refinement is opt in: nothing creates a pool unless given a
+    worker count, as its speedup has not been measured on multiple cores.
+
+    Attributes:
+        workers (int): Number of worker processes.
+        pool (ProcessPoolExecutor | None): Running pool, started on first use.
+        env (list[Area] | None): Environment the running workers hold.
+        fingerprint (tuple | None): env_fingerprint of env when the workers started.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.pool = None
+        self.env = None
+        self.fingerprint = None
+
+    def start(self, env):
+        fingerprint = env_fingerprint(env)
+        if self.pool is not None and self.env is env and self.fingerprint == fingerprint:
+            return
+        self.close()
+        self.env = env
+        self.fingerprint = fingerprint
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers = self.workers, initializer = pathfinder.init_worker,
+                                                           initargs = (env, search.default_search, ContinuousNavigation.QUANTUM))
+
+    def refine(self, env, segments) -> list[list[tuple[float, float]]]:
+        """
+        Solves (start, waypoint) segments in parallel, returning their moves
+        in the same order, an empty list for segments without a path.
+        """
+        self.start(env)
+        futures = [self.pool.submit(pathfinder.solve, start, area.CircleArea(waypoint, 0.5, "temp")) for start, waypoint in segments]
+        results = []
+        for future in futures:
+            moves, stats = future.result()
+            for stat in search.SEARCH_STATS:
+                search.SEARCH_STATS[stat] += stats[stat]
+            results.append(moves)
+        return results
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait = True)
+            self.pool = None
+            self.env = None
+            self.fingerprint = None
+
+
+def plan_waypoints(problem: ContinuousNavigation, abstract = True) -> list[tuple[float, float]]:
+    """High-level plan, over the environment's HPA* graph or a fresh coarse grid search."""
     DENSITY = 25   # <<--- MUCH COARSER GRID = BIG PERFORMANCE BOOST
 
+    if abstract:
+        return get_graph(problem.maze).find_waypoints(problem.initial_state, problem.goal_state.get_center())
+    return high_level_search(problem, DENSITY)
+
+
+def refine_segment(problem: ContinuousNavigation, caches, start, waypoint) -> list[tuple[float, float]]:
+    """Low-level moves from start to within 0.5 of waypoint, from the cache if clear from start, or a new search."""
+    seg_key = caches.segment_key(start, waypoint)
+    segment_path = caches.cached_segment(problem, start, seg_key)
+    if segment_path is not None:
+        return segment_path
+
     seg_problem = copy.copy(problem)
+    seg_problem.goal_state = area.CircleArea(waypoint, 0.5, "temp")
+    seg_problem.initial_state = start
+    segment_path = search.default_search(seg_problem)
+    if segment_path:
+        caches.segments.put(seg_key, segment_path)  # Save for future agents
+    return segment_path
 
-    # High-level coarse plan
-    waypoints = high_level_search(seg_problem, DENSITY)
+
+def hierarchical_astar_search(problem: ContinuousNavigation, abstract = True, pool = None) -> list[tuple[float, float]]:
+    waypoints = plan_waypoints(problem, abstract)
     if not waypoints:
         return []
 
-    final_path_moves = []
-    current_start_pos = seg_problem.initial_state
-    original_goal_state = seg_problem.goal_state
+    caches = get_caches(problem.maze)
+    if pool is not None:
+        return refine_parallel(problem, waypoints, caches, pool)
 
+    final_path_moves = []
+    current_start_pos = problem.initial_state
     for waypoint in waypoints:
+        segment_path = refine_segment(problem, caches, current_start_pos, waypoint)
+        if not segment_path:
+            return []
+        final_path_moves.extend(segment_path)
+        current_start_pos = waypoint
 
-        seg_key = (current_start_pos, waypoint)
-        if seg_key in SEGMENT_CACHE:
-            final_path_moves.extend(SEGMENT_CACHE[seg_key])
-            current_start_pos = waypoint
-            continue
-
-        segment_goal_area = area.CircleArea(waypoint, 0.5, "temp")
-
-        seg_problem.goal_state = segment_goal_area
-        seg_problem.initial_state = current_start_pos
+    return final_path_moves
 
-        segment_path = search.astar_search(seg_problem)
 
+def stream_hierarchical_astar(problem: ContinuousNavigation, abstract = True):
+    """
+    Generator version of hierarchical_astar_search. The waypoints are
+    planned on the first next(), and each later next() refines and yields
+    the moves of one more segment, so segments the caller never asks for
+    are never searched. Stops early if a segment has no path.
+    """
+    waypoints = plan_waypoints(problem, abstract)
+    caches = get_caches(problem.maze)
+    current_start_pos = problem.initial_state
+    for waypoint in waypoints:
+        segment_path = refine_segment(problem, caches, current_start_pos, waypoint)
         if not segment_path:
-            seg_problem.goal_state = original_goal_state
-            return []
+            return
+        yield segment_path
+        current_start_pos = waypoint
 
-        SEGMENT_CACHE[seg_key] = segment_path  # Save for future agents
-        final_path_moves.extend(segment_path)
 
-        current_start_pos = waypoint
+def refine_parallel(problem: ContinuousNavigation, waypoints, caches, pool) -> list[tuple[float, float]]:
+    """Refines every uncached segment of a query at once on pool, then joins them in order."""
+    starts = [problem.initial_state] + waypoints[:-1]
+    keys = [caches.segment_key(start, waypoint) for start, waypoint in zip(starts, waypoints)]
+    segments = [caches.cached_segment(problem, start, key) for start, key in zip(starts, keys)]
+    missing = [i for i, moves in enumerate(segments) if moves is None]
+    if len(missing) > 0:
+        solved = pool.refine(problem.maze, [(starts[i], waypoints[i]) for i in missing])
+        for i, moves in zip(missing, solved):
+            if not moves:
+                return []
+            caches.segments.put(keys[i], moves)
+            segments[i] = moves
 
-    seg_problem.goal_state = original_goal_state
-    return final_path_moves
\ No newline at end of file
+    final_path_moves = []
+    for moves in segments:
+        final_path_moves.extend(moves)
+    return final_path_moves
@@ -0,0 +1,303 @@
+"""
+jps.py
+
+Implements Jump Point Search (JPS) for the 8-connected movement lattice
+of ContinuousNavigation.
+
+JPS runs on a uniform grid whose pitch is the agent's step length,
+anchored at the agent's start position. Straight and diagonal runs are
+"jumped" over without pushing their intermediate cells to the open list,
+so only jump points (cells with forced neighbors or the goal) are
+expanded. Diagonal moves are only taken when both adjacent orthogonal
+cells are free, so paths never cut obstacle corners.
+
+The jump point path is converted back into the same list of movement
+vectors returned by search.astar_search. Because a diagonal agent move
+covers less ground per axis than a diagonal grid step, the conversion
+walks toward each jump point with the agent's own moves, keeping the
+position error below a quarter cell. Cells are only walkable when their
+whole square is free, which leaves room for that error.
+
+Dependencies:
+- problem (ContinuousNavigation problem definition)
+- search (shared search statistics)
+"""
+
+import heapq
+import math
+import time
+import search
+from problem import ContinuousNavigation
+
+SQRT2 = math.sqrt(2)
+
+
+class JumpPointGrid:
+    """
+    Grid view of a ContinuousNavigation problem used by JPS.
+
+    Cell (0, 0) is centered on the problem's initial state and each cell
+    is step wide (problem.SPEED by default). Walkability and goal tests are
+    cached since jumps revisit the same cells when scanning for forced
+    neighbors. Other grid planners (theta) reuse it with their own step.
+    """
+
+    def __init__(self, problem: ContinuousNavigation, margin: float = 2, step: float = None):
+        self.problem = problem
+        self.origin = problem.initial_state
+        self.step = step if step is not None else problem.SPEED
+        self.walkable_cache = {}
+        self.goal_cache = {}
+
+        # Obstacle free space is unbounded, so restrict the grid to the
+        # environment's extent plus a margin
+        points = [self.origin] + list(self.corners(problem.goal_state.get_bounds()))
+        for obstacle in problem.maze:
+            bounds = obstacle.get_bounds()
+            if bounds is not None:
+                points.extend(self.corners(bounds))
+        min_x, max_x = min(p[0] for p in points) - margin, max(p[0] for p in points) + margin
+        min_y, max_y = min(p[1] for p in points) - margin, max(p[1] for p in points) + margin
+        self.min_cell = (math.floor((min_x - self.origin[0]) / self.step), math.floor((min_y - self.origin[1]) / self.step))
+        self.max_cell = (math.ceil((max_x - self.origin[0]) / self.step), math.ceil((max_y - self.origin[1]) / self.step))
+
+        goal_bounds = problem.goal_state.get_bounds()
+        self.goal_min = (math.floor((goal_bounds[0] - self.origin[0]) / self.step), math.floor((goal_bounds[1] - self.origin[1]) / self.step))
+        self.goal_max = (math.ceil((goal_bounds[2] - self.origin[0]) / self.step), math.ceil((goal_bounds[3] - self.origin[1]) / self.step))
+
+    @staticmethod
+    def corners(bounds):
+        return ((bounds[0], bounds[1]), (bounds[2], bounds[3]))
+
+    def to_world(self, cell) -> tuple[float, float]:
+        return (self.origin[0] + cell[0] * self.step, self.origin[1] + cell[1] * self.step)
+
+    def walkable(self, x: int, y: int) -> bool:
+        try:
+            return self.walkable_cache[(x, y)]
+        except KeyError:
+            pass
+        if not (self.min_cell[0] <= x <= self.max_cell[0] and self.min_cell[1] <= y <= self.max_cell[1]):
+            free = False
+        else:
+            cx, cy = self.to_world((x, y))
+            half = self.step / 2
+            free = not self.problem.index.check_box((cx - half, cy - half, cx + half, cy + half))
+        self.walkable_cache[(x, y)] = free
+        return free
+
+    def is_goal(self, x: int, y: int) -> bool:
+        # Cheap reject outside the goal's bounding box before the exact test
+        if not (self.goal_min[0] <= x <= self.goal_max[0] and self.goal_min[1] <= y <= self.goal_max[1]):
+            return False
+        cell = (x, y)
+        if cell not in self.goal_cache:
+            cx, cy = self.to_world(cell)
+            half = self.step / 2
+            self.goal_cache[cell] = all(self.problem.is_goal(p) for p in ((cx, cy), (cx - half, cy - half), (cx + half, cy - half), (cx - half, cy + half), (cx + half, cy + half)))
+        return self.goal_cache[cell]
+
+    def h(self, cell) -> float:
+        """Octile distance in cells to the nearest point of the goal area."""
+        pos = self.to_world(cell)
+        goal = self.problem.goal_state.get_nearest(pos)
+        dx = abs(goal[0] - pos[0]) / self.step
+        dy = abs(goal[1] - pos[1]) / self.step
+        return max(dx, dy) + (SQRT2 - 1) * min(dx, dy)
+
+
+def sign(v: int) -> int:
+    return (v > 0) - (v < 0)
+
+
+def jump(grid: JumpPointGrid, x: int, y: int, dx: int, dy: int):
+    """
+    Moves from (x, y) in direction (dx, dy) until a jump point is found.
+
+    Returns:
+        tuple[int, int] | None: Jump point, or None if the run hits a wall.
+    """
+    walkable = grid.walkable
+    is_goal = grid.is_goal
+    while True:
+        x += dx
+        y += dy
+        if not walkable(x, y):
+            return None
+        if is_goal(x, y):
+            return (x, y)
+
+        if dx != 0 and dy != 0:
+            # A diagonal run stops where either straight run finds a jump point
+            if jump(grid, x, y, dx, 0) is not None or jump(grid, x, y, 0, dy) is not None:
+                return (x, y)
+            # No corner cutting
+            if not (walkable(x + dx, y) and walkable(x, y + dy)):
+                return None
+        elif dx != 0:
+            if (walkable(x, y - 1) and not walkable(x - dx, y - 1)) or \
+               (walkable(x, y + 1) and not walkable(x - dx, y + 1)):
+                return (x, y)
+        else:
+            if (walkable(x - 1, y) and not walkable(x - 1, y - dy)) or \
+               (walkable(x + 1, y) and not walkable(x + 1, y - dy)):
+                return (x, y)
+
+
+def neighbors(grid: JumpPointGrid, cell, parent) -> list[tuple[int, int]]:
+    """
+    Returns the directions worth jumping in from cell, pruned by the
+    direction it was reached from.
+    """
+    x, y = cell
+    ret = []
+    if parent is None:
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                if dx == 0 and dy == 0:
+                    continue
+                if dx != 0 and dy != 0 and not (grid.walkable(x + dx, y) and grid.walkable(x, y + dy)):
+                    continue
+                if grid.walkable(x + dx, y + dy):
+                    ret.append((dx, dy))
+        return ret
+
+    dx = sign(x - parent[0])
+    dy = sign(y - parent[1])
+
+    if dx != 0 and dy != 0:
+        walk_x = grid.walkable(x + dx, y)
+        walk_y = grid.walkable(x, y + dy)
+        if walk_x:
+            ret.append((dx, 0))
+        if walk_y:
+            ret.append((0, dy))
+        if walk_x and walk_y and grid.walkable(x + dx, y + dy):
+            ret.append((dx, dy))
+    elif dx != 0:
+        walk_next = grid.walkable(x + dx, y)
+        walk_up = grid.walkable(x, y - 1)
+        walk_down = grid.walkable(x, y + 1)
+        if walk_next:
+            ret.append((dx, 0))
+            if walk_up and grid.walkable(x + dx, y - 1):
+                ret.append((dx, -1))
+            if walk_down and grid.walkable(x + dx, y + 1):
+                ret.append((dx, 1))
+        if walk_up:
+            ret.append((0, -1))
+        if walk_down:
+            ret.append((0, 1))
+    else:
+        walk_next = grid.walkable(x, y + dy)
+        walk_left = grid.walkable(x - 1, y)
+        walk_right = grid.walkable(x + 1, y)
+        if walk_next:
+            ret.append((0, dy))
+            if walk_left and grid.walkable(x - 1, y + dy):
+                ret.append((-1, dy))
+            if walk_right and grid.walkable(x + 1, y + dy):
+                ret.append((1, dy))
+        if walk_left:
+            ret.append((-1, 0))
+        if walk_right:
+            ret.append((1, 0))
+    return ret
+
+
+def jump_points_to_moves(grid: JumpPointGrid, jump_points: list[tuple[int, int]], pos = None) -> list[tuple[float, float]]:
+    """
+    Converts a chain of jump points into agent movement vectors.
+
+    Each leg is walked with the agent's diagonal moves for the shared part
+    of the offset and axis moves for the rest, always measured from the
+    agent's actual position so rounding error never accumulates. The walk
+    starts at pos, or at the grid origin if None.
+    """
+    speed = grid.problem.SPEED
+    diag = speed / SQRT2
+    pos = pos if pos is not None else grid.origin
+    moves = []
+
+    for cell in jump_points:
+        target = grid.to_world(cell)
+        dx = target[0] - pos[0]
+        dy = target[1] - pos[1]
+        sx = 1 if dx >= 0 else -1
+        sy = 1 if dy >= 0 else -1
+
+        n_diag = round(min(abs(dx), abs(dy)) / diag)
+        moves.extend([(sx * diag, sy * diag)] * n_diag)
+        pos = (pos[0] + sx * diag * n_diag, pos[1] + sy * diag * n_diag)
+
+        dx = target[0] - pos[0]
+        dy = target[1] - pos[1]
+        if abs(dx) >= abs(dy):
+            n_axis = round(abs(dx) / speed)
+            step = ((1 if dx >= 0 else -1) * speed, 0.0)
+        else:
+            n_axis = round(abs(dy) / speed)
+            step = (0.0, (1 if dy >= 0 else -1) * speed)
+        moves.extend([step] * n_axis)
+        pos = (pos[0] + step[0] * n_axis, pos[1] + step[1] * n_axis)
+
+    return moves
+
+
+def jps_search(problem: ContinuousNavigation) -> list[tuple[float, float]]:
+    """Implements Jump Point Search, returning movement vectors like astar_search."""
+    start_time = time.perf_counter_ns()
+    search.SEARCH_STATS["searches"] += 1
+
+    if problem.is_goal(problem.initial_state):
+        return []
+
+    grid = JumpPointGrid(problem)
+    start = (0, 0)
+
+    frontier = [(grid.h(start), 0, start)]
+    g_score = {start: 0}
+    came_from = {start: None}
+    closed = set()
+    counter = 1
+    expansions = 0
+    goal = None
+
+    while frontier:
+        _, _, cell = heapq.heappop(frontier)
+        if cell in closed:
+            continue
+        if grid.is_goal(cell[0], cell[1]):
+            goal = cell
+            break
+        closed.add(cell)
+        expansions += 1
+
+        for dx, dy in neighbors(grid, cell, came_from[cell]):
+            jump_point = jump(grid, cell[0], cell[1], dx, dy)
+            if jump_point is None or jump_point in closed:
+                continue
+            # Runs are straight or 45 degree, so octile distance is the run length
+            run_x = abs(jump_point[0] - cell[0])
+            run_y = abs(jump_point[1] - cell[1])
+            new_g = g_score[cell] + max(run_x, run_y) + (SQRT2 - 1) * min(run_x, run_y)
+            if jump_point not in g_score or new_g < g_score[jump_point]:
+                g_score[jump_point] = new_g
+                came_from[jump_point] = cell
+                heapq.heappush(frontier, (new_g + grid.h(jump_point), counter, jump_point))
+                counter += 1
+
+    path = []
+    if goal is not None:
+        jump_points = []
+        cell = goal
+        while cell != start:
+            jump_points.append(cell)
+            cell = came_from[cell]
+        jump_points.reverse()
+        path = jump_points_to_moves(grid, jump_points)
+
+    search.SEARCH_STATS["expansions"] += expansions
+    search.SEARCH_STATS["moves"] += len(path)
+    search.SEARCH_STATS["time"] += time.perf_counter_ns() - start_time
+    return path
@@ -6,15 +6,18 @@ experiments using pygame.
 
 This file supports:
 - Density-based obstacle environments
-- Multiple agent types (Flow, HA*, Group / WHCA*)
-- Command-line configuration for agent count, scale, and density
-- Real-time rendering and simulation updates
+- Multiple agent types (Deffered, Planning, Flow, HA*, Group / WHCA*)
+- Command-line configuration for agent count, scale, density,
+  deferred pathfinding worker processes or per-frame search budget, and
+  a precompute store directory flow fields and HA* caches persist in
+- Real-time rendering and simulation updates, run as an asyncio coroutine
+  so path planning can fill the idle part of each frame
 
 Intended for qualitative evaluation and debugging rather than benchmarking.
 """
 import pygame
-import agent, area, search, problem, pathfinder, flowField
-import random
+import agent, area, search, problem, pathfinder, flowField, store
+import random, time, asyncio
 import getopt, sys
 
 
@@ -62,26 +65,28 @@ def demo_env(dist=200):
 
     return env_state, false_goal, goal, render_scale, render_offset
 
-def gameloop(screen):
+FRAME_TIME = 1 / 60     # Seconds per frame at the 60 fps cap
+
+async def gameloop(screen):
     run = True
-    clock = pygame.time.Clock()
 
-    pather = pathfinder.Pathfinder(search.astar_search)
-    
     args = sys.argv[1:]
-    options = "t:c:s:d:"
-    long_options = ["Type=", "Count=", "Scale=", "Density="]
+    options = "t:c:s:d:w:b:p:"
+    long_options = ["Type=", "Count=", "Scale=", "Density=", "Workers=", "Budget=", "Store="]
 
     agent_type = "Flow"
     agent_count = 100
     dist = 500
     density = 100
+    workers = None
+    budget = None
+    store_dir = None
 
     try:
         arguments, values = getopt.getopt(args, options, long_options)
         for currentArg, currentVal in arguments:
             if currentArg in ("-t", "--Type"):
-                if not currentVal in ("Deffered", "Flow", "HAstar", "Group"):
+                if not currentVal in ("Deffered", "Planning", "Flow", "HAstar", "Group"):
                     raise ValueError
                 agent_type = currentVal
             elif currentArg in ("-c", "--Count"):
@@ -96,9 +101,21 @@ def gameloop(screen):
                 if int(currentVal) < 30:
                     raise ValueError
                 density = int(currentVal)
+            elif currentArg in ("-w", "--Workers"):
+                if int(currentVal) < 1:
+                    raise ValueError
+                workers = int(currentVal)
+            elif currentArg in ("-b", "--Budget"):
+                if float(currentVal) <= 0:
+                    raise ValueError
+                budget = int(float(currentVal) * 1_000_000)
+            elif currentArg in ("-p", "--Store"):
+                store_dir = currentVal
     except getopt.error as err:
         print(str(err))
 
+    pather = pathfinder.Pathfinder(search.default_search, workers = workers, frame_budget = budget)
+
     env = "Density"
     
     if env == "Demo":
@@ -110,6 +127,12 @@ def gameloop(screen):
         case "Density":
             env_state, false_goal, goal, render_scale, render_offset = density_env(dist = dist, density=density)
 
+    # Fields and HA* caches from earlier runs in the same layout are loaded instead of recomputed
+    disk = None
+    if store_dir is not None:
+        disk = store.PrecomputeStore(store_dir)
+        flowField.FIELD_POOL.store = disk
+        disk.load_hastar(env_state)
 
     
     
@@ -117,9 +140,12 @@ def gameloop(screen):
     match agent_type:
         case "Deffered":
             for i in range(agent_count):
-                agents.append(agent.DefferedAgent((random.random() * 50,random.random() * dist/2), env_state, goal))
+                agents.append(agent.DefferedAgent((random.random() * 50,random.random() * dist/2), env_state, goal, pather))
+        case "Planning":
+            for i in range(agent_count):
+                agents.append(agent.PlanningAgent((random.random() * 50,random.random() * dist/2), env_state, goal, pather))
         case "Flow":
-            flow = flowField.FlowField(goal, env_state, density = 2, region = (0,0, dist, dist/2))
+            flow = flowField.get_field(goal, env_state, density = 2, region = (0,0, dist, dist/2))
             for i in range(agent_count):
                 agents.append(agent.FlowAgent((random.random() * 50,random.random() * dist/2), env_state, goal, flow))
         case "HAstar":
@@ -133,15 +159,21 @@ def gameloop(screen):
 
     render = False
 
+    # Planning agents await paths from the pather's serve coroutine, which
+    # runs in the idle part of each frame, in slices of the -b budget or
+    # pathfinder.SERVE_SLICE so a long search never holds up a frame
+    server = asyncio.create_task(pather.serve()) if agent_type == "Planning" else None
+
     while run:
+        frame_start = time.perf_counter()
         for i in pygame.event.get():
             if i.type == pygame.QUIT:
                 run = False
 
-        if len(pather.queue) != 0:
-            for i in range(1):
-                pather.pop_queue()
-            print("test")
+        # Solves one request per frame, slices searches within the frame budget,
+        # or hands the queue to the worker pool
+        if server is None and pather.busy():
+            pather.pop_queue()
 
         for i in agents:
             if i.update():
@@ -161,17 +193,23 @@ def gameloop(screen):
         
         #flow.render(screen, scale = 5)
         
-        clock.tick(60)
+        await asyncio.sleep(max(0, FRAME_TIME - (time.perf_counter() - frame_start)))
         pygame.display.update()
         #pygame.event.wait()
 
+    if server is not None:
+        server.cancel()
+    pather.close()
+    if disk is not None and agent_type == "HAstar":
+        disk.save_hastar(env_state)
+
 
 def main():
     pygame.init()
 
     screen = pygame.display.set_mode((1000,500))
     pygame.display.set_caption("Testing")
-    gameloop(screen)
+    asyncio.run(gameloop(screen))
 
     
 
@@ -0,0 +1,219 @@
+"""
+occupancy.py
+
+Rasterized occupancy grid backend for collision queries.
+
+The obstacle list of an environment is rasterized once into a NumPy
+boolean array at a configurable resolution (cells per unit). A point
+collision check is then a single array lookup instead of a geometry
+test against nearby Areas.
+
+Rasterization is conservative: a cell is marked occupied if any part of
+it overlaps an obstacle, so agents never pass through geometry the
+exact checks would reject. The exact spatial index is kept alongside
+the grid for correctness comparisons and for queries that need the
+colliding Area itself, which only reach it when the grid cell is occupied.
+
+An OccupancyGrid can be passed anywhere an environment list is accepted
+(ContinuousNavigation, FlowField, agents), since it iterates over and
+reports the length of its source obstacles.
+
+Dependencies:
+- numpy (array storage)
+- area (defines Area objects with bounds and collision checks)
+- spatial (exact fallback index)
+"""
+
+import collections
+import time
+import math
+import numpy as np
+import area, spatial
+
+GRID_CACHE = collections.OrderedDict()  # Maps (id(env), resolution) → OccupancyGrid, least recently used first
+MAX_GRIDS = 8           # Grids kept, each holds its environment and raster alive
+
+
+class OccupancyGrid:
+    """
+    Boolean occupancy raster over the bounding box of an environment.
+
+    Attributes:
+        areas (list[Area]): Environment the grid was built from.
+        resolution (float): Cells per world unit.
+        origin (tuple[float, float]): World position of cell (0, 0).
+        cells (np.ndarray): Occupancy array indexed as [row (y), column (x)].
+        exact (spatial.SpatialIndex): Exact geometry index over the same areas.
+        layout (tuple): spatial.layout of areas when the grid was rasterized.
+        build_time (int): Nanoseconds spent rasterizing.
+        queries (int): Number of point queries answered.
+    """
+
+    def __init__(self, areas, resolution = 2):
+        self.areas = areas
+        self.size = len(areas)
+        self.resolution = resolution
+        self.exact = spatial.get_index(areas)
+        self.layout = spatial.layout(areas)
+        self.queries = 0
+
+        start = time.time_ns()
+        self.rasterize()
+        self.build_time = time.time_ns() - start
+
+    def __iter__(self):
+        return iter(self.areas)
+
+    def __len__(self):
+        return len(self.areas)
+
+    def rasterize(self):
+        bounds = [obstacle.get_bounds() for obstacle in self.areas]
+        bounds = [b for b in bounds if b is not None]
+        if len(bounds) == 0:
+            self.origin = (0, 0)
+            self.cells = np.zeros((0, 0), dtype=bool)
+            return
+
+        min_x = min(b[0] for b in bounds)
+        min_y = min(b[1] for b in bounds)
+        max_x = max(b[2] for b in bounds)
+        max_y = max(b[3] for b in bounds)
+        self.origin = (min_x, min_y)
+
+        width = math.floor((max_x - min_x) * self.resolution) + 1
+        height = math.floor((max_y - min_y) * self.resolution) + 1
+        self.cells = np.zeros((height, width), dtype=bool)
+
+        for obstacle in self.areas:
+            self.fill(obstacle)
+
+    def fill(self, obstacle : area.Area):
+        bounds = obstacle.get_bounds()
+        if bounds is None:
+            return
+        min_x, min_y = self.to_cell((bounds[0], bounds[1]))
+        max_x, max_y = self.to_cell((bounds[2], bounds[3]))
+
+        if isinstance(obstacle, area.RectArea):
+            self.cells[min_y:max_y + 1, min_x:max_x + 1] = True
+            return
+
+        # Cell edges covering the obstacle's bounding box
+        cell = 1 / self.resolution
+        xs = self.origin[0] + np.arange(min_x, max_x + 1) * cell
+        ys = self.origin[1] + np.arange(min_y, max_y + 1) * cell
+        cell_x, cell_y = np.meshgrid(xs, ys)
+
+        if isinstance(obstacle, area.CircleArea):
+            # Distance from the center to the closest point of each cell
+            near_x = np.clip(obstacle.center[0], cell_x, cell_x + cell)
+            near_y = np.clip(obstacle.center[1], cell_y, cell_y + cell)
+            hit = (near_x - obstacle.center[0]) ** 2 + (near_y - obstacle.center[1]) ** 2 <= obstacle.radius ** 2
+        else:
+            # Unknown shape, sample cell centers with the exact check
+            hit = np.array([[obstacle.check_collision((x + cell / 2, y + cell / 2)) for x in xs] for y in ys], dtype=bool)
+
+        self.cells[min_y:max_y + 1, min_x:max_x + 1] |= hit
+
+    def to_cell(self, pos) -> tuple[int, int]:
+        return (math.floor((pos[0] - self.origin[0]) * self.resolution),
+                math.floor((pos[1] - self.origin[1]) * self.resolution))
+
+    def check_collision(self, pos) -> bool:
+        self.queries += 1
+        x = math.floor((pos[0] - self.origin[0]) * self.resolution)
+        y = math.floor((pos[1] - self.origin[1]) * self.resolution)
+        if x < 0 or y < 0 or y >= self.cells.shape[0] or x >= self.cells.shape[1]:
+            return False
+        return bool(self.cells[y, x])
+
+    def check_points(self, points) -> np.ndarray:
+        """Vectorized check_collision, one bool per row of an (N, 2) array of points."""
+        self.queries += len(points)
+        x = np.floor((points[:, 0] - self.origin[0]) * self.resolution).astype(np.int64)
+        y = np.floor((points[:, 1] - self.origin[1]) * self.resolution).astype(np.int64)
+        inside = (x >= 0) & (y >= 0) & (y < self.cells.shape[0]) & (x < self.cells.shape[1])
+        hit = np.zeros(len(points), dtype=bool)
+        hit[inside] = self.cells[y[inside], x[inside]]
+        return hit
+
+    def check_box(self, bounds) -> bool:
+        """
+        Returns True if any occupied cell overlaps the box (min_x, min_y, max_x, max_y).
+        """
+        self.queries += 1
+        min_x, min_y = self.to_cell((bounds[0], bounds[1]))
+        max_x, max_y = self.to_cell((bounds[2], bounds[3]))
+        min_x, min_y = max(min_x, 0), max(min_y, 0)
+        if max_x < min_x or max_y < min_y:
+            return False
+        return bool(self.cells[min_y:max_y + 1, min_x:max_x + 1].any())
+
+    def first_collision(self, pos) -> area.Area:
+        """
+        Returns the Area colliding with pos, or None if the point is free.
+
+        The grid rejects free space with one lookup, occupied cells are
+        confirmed against the exact geometry.
+        """
+        if not self.check_collision(pos):
+            return None
+        return self.exact.first_collision(pos)
+
+    def check_exact(self, pos) -> bool:
+        return self.exact.check_collision(pos)
+
+    def mismatches(self, points) -> tuple[int, int]:
+        """
+        Compares grid and exact answers for a set of points.
+
+        Returns:
+            tuple[int, int]: (false positives, false negatives) of the grid.
+        """
+        false_pos = 0
+        false_neg = 0
+        for pos in points:
+            grid = self.check_collision(pos)
+            exact = self.check_exact(pos)
+            if grid and not exact:
+                false_pos += 1
+            elif exact and not grid:
+                false_neg += 1
+        return false_pos, false_neg
+
+    def reset_stats(self):
+        self.queries = 0
+        self.exact.reset_stats()
+
+    def stats(self) -> dict:
+        return {
+            "obstacles": self.size,
+            "cells": self.cells.size,
+            "bytes": self.cells.nbytes,
+            "build_time": self.build_time,
+            "queries": self.queries,
+            "checks": self.exact.checks,
+            "checks_per_query": self.exact.checks / self.queries if self.queries > 0 else 0,
+        }
+
+
+def get_grid(env, resolution = 2) -> OccupancyGrid:
+    """
+    Returns the shared occupancy grid for an environment at a resolution,
+    rasterizing it on first use or when obstacles were added, removed or
+    moved. Only the MAX_GRIDS most recently used grids are kept.
+    """
+    key = (id(env), resolution)
+    grid = GRID_CACHE.get(key)
+    if grid is None or grid.areas is not env or grid.layout != spatial.layout(env):
+        grid = OccupancyGrid(env, resolution)
+        GRID_CACHE[key] = grid
+    GRID_CACHE.move_to_end(key)
+    while len(GRID_CACHE) > MAX_GRIDS:
+        GRID_CACHE.popitem(last = False)
+    return grid
+
+
+def clear_cache():
+    GRID_CACHE.clear()
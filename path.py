@@ -0,0 +1,87 @@
+"""
+path.py
+
+Compact storage for planned agent paths.
+
+Planners return a list of movement vectors, one per step, and most
+consecutive steps repeat the same move. A Path stores those moves as
+runs of (move, count) and walks them with a cursor, so consuming the
+next move is O(1) and a long straight path costs a single entry.
+
+A Path behaves like the old list where agents relied on it: len() is
+the number of moves left, iterating yields the remaining moves lazily,
+and peek() / pop() replace path_cache[0] / path_cache.pop(0).
+"""
+
+
+class Path:
+    """
+    Run-length encoded sequence of moves consumed from the front.
+
+    Attributes:
+        runs (list[list]): [move, count] runs in path order.
+        run (int): Index of the run after the current one.
+        move (tuple): Move of the current run.
+        left (int): Moves left in the current run.
+        remaining (int): Number of moves left in the whole path.
+    """
+
+    __slots__ = ("runs", "run", "move", "left", "remaining")
+
+    def __init__(self, moves = ()):
+        self.runs = []
+        self.run = 0
+        self.move = None
+        self.left = 0
+        self.remaining = 0
+        self.extend(moves)
+
+    def __len__(self):
+        return self.remaining
+
+    def __iter__(self):
+        for _ in range(self.left):
+            yield self.move
+        for i in range(self.run, len(self.runs)):
+            move, count = self.runs[i]
+            for _ in range(count):
+                yield move
+
+    def append(self, move):
+        if self.runs and self.run < len(self.runs) and self.runs[-1][0] == move:
+            self.runs[-1][1] += 1
+        elif self.run == len(self.runs) and self.left > 0 and self.move == move:
+            # The current run is the last one, it has already been taken out of runs
+            self.left += 1
+        else:
+            self.runs.append([move, 1])
+        self.remaining += 1
+
+    def extend(self, moves):
+        for move in moves:
+            self.append(move)
+
+    def next_run(self):
+        if self.remaining == 0:
+            raise IndexError("pop from empty path")
+        self.move, self.left = self.runs[self.run]
+        # Drop taken runs so a walked path releases its storage
+        self.runs[self.run] = None
+        self.run += 1
+
+    def peek(self):
+        """Returns the next move without consuming it."""
+        if self.left == 0:
+            self.next_run()
+        return self.move
+
+    def pop(self):
+        """Consumes and returns the next move."""
+        if self.left == 0:
+            self.next_run()
+        self.left -= 1
+        self.remaining -= 1
+        return self.move
+
+    def to_list(self) -> list:
+        return list(self)
@@ -7,8 +7,88 @@ This module provides a lightweight queue-based wrapper around a
 pathfinding function (e.g., A*). It allows agents to request paths
 without blocking the main simulation loop, enabling staggered or
 batched path computation.
+
+With workers set, queued ContinuousNavigation problems are solved in a
+ProcessPoolExecutor instead of on the calling thread. The environment is
+shipped to each worker process once, when the pool starts, and only the
+start position and goal area are sent per request. Completed paths are
+returned through the same complete dict.
+
+With frame_budget set, requests are instead solved by resumable searches
+(search.resumable(method) by default) on the calling thread. Each
+pop_queue call spends at most frame_budget nanoseconds, split evenly
+across every waiting request, so one large search is spread over
+several frames instead of stalling one. Freeing the trees of finished
+searches is spread over frames the same way.
+
+Requests are scheduled on a priority heap (closest to the goal first by
+default). Requests from the same quantized start state to the same goal
+area in the same obstacle layout are coalesced into one search whose
+result is fanned out to every requester. Finished results are kept in a
+bounded LRU cache and answer later identical requests without searching.
+Cached results hold their problem, so the environment and goal whose ids
+are in the key stay alive. A result reused from another start within the
+same quantized cell is only handed out if replaying it from the
+requester's own start is clear (ContinuousNavigation.path_clear),
+otherwise the requester gets a search from its exact start.
+
+Besides the polled waiting / complete interface, plan() returns an
+asyncio future resolving to the path. serve() is the matching driver
+coroutine: it processes the queue while requests are open, yields to the
+event loop between slices, and sleeps on an event while the queue is
+empty, so simulations awaiting paths never busy-poll. Without workers,
+serve() always time slices (frame_budget, or SERVE_SLICE if unset), so
+no search ever blocks the event loop for longer than one slice. Several
+simulations can share one Pathfinder (and its cache) on one event loop.
+
+Dependencies:
+- path (run-length encoded path storage)
+- problem (ContinuousNavigation rebuilt inside workers)
+- search (search statistics merged back from workers)
+- spatial (obstacle layout the workers were started with)
 """
 
+import asyncio
+import collections
+import concurrent.futures
+import heapq
+import time
+import path, problem, search, spatial
+
+WORKER_STATE = {}       # Environment, method and quantum of a worker process
+SERVE_SLICE = 2_000_000 # Nanoseconds of search serve() runs between yields without a frame_budget
+
+
+def init_worker(env, method, quantum):
+    """Runs once in each worker process to receive the shared environment."""
+    WORKER_STATE["env"] = env
+    WORKER_STATE["method"] = method
+    problem.ContinuousNavigation.QUANTUM = quantum
+
+
+def solve(start, goal) -> tuple[list, dict]:
+    """
+    Solves one request inside a worker.
+
+    Returns:
+        tuple[list, dict]: Movement vectors and the search statistics of this request.
+    """
+    search.reset_stats()
+    prob = problem.ContinuousNavigation(start, WORKER_STATE["env"], goal)
+    moves = WORKER_STATE["method"](prob)
+    return moves, dict(search.SEARCH_STATS)
+
+
+def by_distance(problem) -> float:
+    """Schedules requests by heuristic distance to the goal, shortest first."""
+    return problem.h(problem.initial_state)
+
+
+def by_arrival(problem) -> float:
+    """Schedules requests in arrival order."""
+    return 0
+
+
 class Pathfinder:
     """
     Deferred pathfinding queue manager.
@@ -19,29 +99,312 @@ class Pathfinder:
     Attributes:
         method (callable):
             Pathfinding function that accepts a problem instance and
-            returns a list of movement vectors.
+            returns a list of movement vectors. Must be picklable
+            (a module-level function or functools.partial) when workers is set.
+        workers (int | None):
+            Number of worker processes, or None to search on the calling thread.
+        frame_budget (int | None):
+            Nanoseconds of search per pop_queue call when time slicing, or None.
+        incremental (callable | None):
+            Builds a resumable search (with step() and path) from a problem
+            when time slicing (frame_budget or serve()), search.resumable(method)
+            if not given, which raises ValueError for planners without one.
+        priority (callable):
+            Priority of a problem, lower is solved first, ties go to the
+            earlier request (see by_distance and by_arrival).
+        cache_size (int):
+            Number of finished results kept for reuse, 0 disables the cache.
         waiting (set[int]):
             Agent indices currently waiting for a path.
-        queue (list[tuple[int, object]]):
-            FIFO queue of (agent_index, problem) requests.
-        complete (dict[int, list]):
-            Completed paths indexed by agent id.
+        queue (list[tuple[float, int, tuple]]):
+            Heap of (priority, sequence, request key) not yet started.
+        requests (dict[tuple, dict]):
+            Open requests by key, holding the problem searched and the
+            (requester, queue time, problem) entries waiting on it. A
+            requester is an agent index or an asyncio future from plan().
+        complete (dict[int, path.Path]):
+            Completed paths indexed by agent id, taken by the agent.
+        cache (OrderedDict[tuple, tuple]):
+            (problem, movement vectors) of finished requests, least recently used first.
+        running (dict[Future, tuple]):
+            Requests submitted to the pool, mapped to their request key.
+        slicing (dict[tuple, object]):
+            Paused searches of time sliced requests by request key.
+        releasing (list):
+            Finished time sliced searches whose trees are still being freed.
+        layout (tuple):
+            Obstacle layout (see spatial.layout) the worker pool was started with.
     """
 
 
-    def __init__(self, method):
+    def __init__(self, method, workers = None, frame_budget = None, incremental = None,
+                 priority = by_distance, cache_size = 256):
         self.method = method
+        self.workers = workers
+        self.frame_budget = frame_budget
+        if frame_budget is not None and incremental is None:
+            incremental = search.resumable(method)
+        self.incremental = incremental
+        self.priority = priority
+        self.cache_size = cache_size
+        self.slicing = {}
+        self.releasing = []
         self.waiting = set()
         self.queue = []
+        self.requests = {}
         self.complete = {}
-        
+        self.cache = collections.OrderedDict()
+        self.running = {}
+        self.pool = None
+        self.env = None
+        self.layout = None
+        self.sequence = 0
+        self.wakeup = None
+        self.reset_stats()
+
+    @staticmethod
+    def request_key(problem, exact = False) -> tuple:
+        # Same environment and obstacle layout (count, index build and logged moves),
+        # same quantized start (or exact start), same goal area
+        index = problem.index
+        start = problem.initial_state if exact else problem.key(problem.initial_state)
+        return (id(problem.maze), len(problem.maze), getattr(index, "serial", None), len(getattr(index, "changes", ())),
+                start, id(problem.goal_state), exact)
 
     def queue_path(self, index, problem):
-        self.queue.append((index, problem))
         self.waiting.add(index)
-    
+        self.request(index, problem)
+
+    def plan(self, problem) -> asyncio.Future:
+        """
+        Requests a path without polling, the returned future resolves to a
+        path.Path once a running serve() coroutine has solved the problem.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.request(future, problem)
+        if self.wakeup is not None:
+            self.wakeup.set()
+        return future
+
+    def request(self, requester, problem, queued_at = None, exact = False):
+        """
+        Queues a request, joins an identical open one, or answers it from
+        the cache. exact keys on the exact start, for requesters a shared
+        path was not clear for.
+        """
+        now = time.perf_counter_ns()
+        if queued_at is None:
+            self.total_requests += 1
+            queued_at = now
+        key = Pathfinder.request_key(problem, exact)
+
+        if key in self.cache:
+            searched, moves = self.cache[key]
+            if self.reusable(searched, problem, moves):
+                self.cache_hits += 1
+                self.cache.move_to_end(key)
+                self.deliver(requester, moves, queued_at, now)
+                return
+            key = Pathfinder.request_key(problem, exact = True)
+            if key in self.cache:
+                self.cache_hits += 1
+                self.cache.move_to_end(key)
+                self.deliver(requester, self.cache[key][1], queued_at, now)
+                return
+
+        if key in self.requests:
+            self.dedupe_hits += 1
+            self.requests[key]["requesters"].append((requester, queued_at, problem))
+        else:
+            self.requests[key] = {"problem": problem, "requesters": [(requester, queued_at, problem)]}
+            heapq.heappush(self.queue, (self.priority(problem), self.sequence, key))
+            self.sequence += 1
+            self.max_queue_depth = max(self.max_queue_depth, len(self.queue))
+
+    def reusable(self, searched, problem, moves) -> bool:
+        """True if moves planned for searched can be walked from problem's start."""
+        if problem.initial_state == searched.initial_state:
+            return True
+        if problem.path_clear(problem.initial_state, moves):
+            return True
+        self.unclear += 1
+        return False
+
+    def finish(self, key, moves):
+        """
+        Caches a finished request and hands its path to every requester it
+        is clear for, the others are queued again from their exact start.
+        """
+        self.searches += 1
+        request = self.requests.pop(key)
+        if self.cache_size > 0:
+            self.cache[key] = (request["problem"], moves)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last = False)
+        now = time.perf_counter_ns()
+        for requester, queued_at, problem in request["requesters"]:
+            if self.reusable(request["problem"], problem, moves):
+                self.deliver(requester, moves, queued_at, now)
+            else:
+                self.request(requester, problem, queued_at, exact = True)
+
+    def deliver(self, requester, moves, queued_at, now = None):
+        wait = (now if now is not None else queued_at) - queued_at
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.delivered += 1
+        # Every requester gets its own cursor over the shared moves
+        if isinstance(requester, asyncio.Future):
+            if not requester.done():
+                requester.set_result(path.Path(moves))
+        else:
+            self.complete[requester] = path.Path(moves)
+            self.waiting.discard(requester)
+
+    def busy(self) -> bool:
+        return len(self.queue) != 0 or len(self.running) != 0 or len(self.slicing) != 0 or len(self.releasing) != 0
+
     def pop_queue(self):
-        unit = self.queue.pop(0)
-        path = self.method(unit[1])
-        self.complete[unit[0]] = path
+        """
+        Processes queued requests.
+
+        Without workers, solves the highest priority request. With workers, submits
+        every queued request to the pool and collects any finished paths
+        without blocking. With frame_budget, advances every waiting search
+        for at most frame_budget nanoseconds in total.
+        """
+        if self.frame_budget is not None:
+            self.slice_queue(self.frame_budget)
+            return
+
+        if self.workers is None:
+            key = heapq.heappop(self.queue)[2]
+            self.finish(key, self.method(self.requests[key]["problem"]))
+            return
+
+        while self.queue:
+            key = heapq.heappop(self.queue)[2]
+            prob = self.requests[key]["problem"]
+            self.start_pool(prob.maze)
+            future = self.pool.submit(solve, prob.initial_state, prob.goal_state)
+            self.running[future] = key
+
+        for future in [f for f in self.running if f.done()]:
+            self.collect(future)
+
+    def slice_queue(self, budget):
+        """Advances every waiting search for at most budget nanoseconds in total."""
+        if self.incremental is None:
+            self.incremental = search.resumable(self.method)
+        while self.queue:
+            key = heapq.heappop(self.queue)[2]
+            self.slicing[key] = self.incremental(self.requests[key]["problem"])
+
+        # Even split of what is left, so work finishing early hands its time on
+        deadline = time.perf_counter_ns() + budget
+        while len(self.slicing) != 0 or len(self.releasing) != 0:
+            remaining = deadline - time.perf_counter_ns()
+            if remaining <= 0:
+                break
+            share = remaining // (len(self.slicing) + len(self.releasing))
+            for key, sliced in list(self.slicing.items()):
+                if sliced.step(max_ns = share):
+                    del self.slicing[key]
+                    self.finish(key, sliced.path)
+                    self.releasing.append(sliced)
+            for sliced in list(self.releasing):
+                if sliced.release(max_ns = share):
+                    self.releasing.remove(sliced)
+
+    def wait(self):
+        """Blocks until every queued and running request is complete."""
+        while self.busy():
+            self.pop_queue()
+            if len(self.running) != 0:
+                done, _ = concurrent.futures.wait(self.running, return_when = concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    self.collect(future)
+
+    async def serve(self, slice_ns = SERVE_SLICE):
+        """
+        Drives the queue for plan() requests until cancelled.
+
+        Each pass runs one pool submission, or without workers one time
+        slice (frame_budget, or slice_ns when it is None), and then yields,
+        waiting on pool results instead of polling them, and on the wakeup
+        event while there is nothing to do.
+
+        Raises:
+            ValueError: Without workers, if method has no resumable counterpart
+                (see search.resumable) and no incremental was given.
+        """
+        budget = self.frame_budget if self.frame_budget is not None else slice_ns
+        if self.workers is None and self.incremental is None:
+            self.incremental = search.resumable(self.method)
+        self.wakeup = asyncio.Event()
+        try:
+            while True:
+                if not self.busy():
+                    self.wakeup.clear()
+                    await self.wakeup.wait()
+                    continue
+                if self.workers is None:
+                    self.slice_queue(budget)
+                else:
+                    self.pop_queue()
+                if len(self.running) != 0 and len(self.queue) == 0 and len(self.slicing) == 0 and len(self.releasing) == 0:
+                    await asyncio.wait([asyncio.wrap_future(future) for future in self.running], return_when = asyncio.FIRST_COMPLETED)
+                else:
+                    await asyncio.sleep(0)
+        finally:
+            self.wakeup = None
+
+    def collect(self, future):
+        key = self.running.pop(future)
+        moves, stats = future.result()
+        for stat in search.SEARCH_STATS:
+            search.SEARCH_STATS[stat] += stats[stat]
+        self.finish(key, moves)
+
+    def start_pool(self, env):
+        # Workers hold a copy of one environment, restart them if requests move to another or its obstacles change
+        layout = spatial.layout(env)
+        if self.pool is not None and self.env is env and self.layout == layout:
+            return
+        self.close()
+        self.env = env
+        self.layout = layout
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers = self.workers, initializer = init_worker,
+                                                           initargs = (env, self.method, problem.ContinuousNavigation.QUANTUM))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait = True)
+            self.pool = None
+            self.env = None
+            self.layout = None
+
+    def reset_stats(self):
+        self.total_requests = 0
+        self.searches = 0
+        self.dedupe_hits = 0
+        self.cache_hits = 0
+        self.delivered = 0
+        self.total_wait = 0
+        self.max_wait = 0
+        self.max_queue_depth = 0
+        self.unclear = 0
 
+    def stats(self) -> dict:
+        return {
+            "requests": self.total_requests,
+            "searches": self.searches,
+            "queue_depth": len(self.queue),
+            "max_queue_depth": self.max_queue_depth,
+            "dedupe_hits": self.dedupe_hits,
+            "cache_hits": self.cache_hits,
+            "dedupe_rate": (self.dedupe_hits + self.cache_hits) / self.total_requests if self.total_requests > 0 else 0,
+            "avg_wait": self.total_wait / self.delivered if self.delivered > 0 else 0,
+            "max_wait": self.max_wait,
+            "unclear": self.unclear,
+        }
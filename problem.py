@@ -4,6 +4,7 @@ from typing import Any, Generic, TypeVar
 from abc import ABC, abstractmethod
 from area import Area
 import math
+import spatial
 
 # makes the state both immutable and hashable
 T = TypeVar("T", bound=tuple)
@@ -20,7 +21,12 @@ class Node:
         path_cost (float): Cumulative cost of reaching this node.
         id (int): Unique identifier for the node instance.
         depth (int): Depth of the node in the search tree.
+
+    Nodes use __slots__ instead of a per-instance __dict__, since long
+    searches allocate one per generated state.
     """
+    __slots__ = ("state", "parent", "action", "path_cost", "id", "depth")
+
     count: int = 0
     """Class-level counter tracking created nodes."""
 
@@ -209,6 +215,18 @@ class Problem(ABC, Generic[T]):
         """
         pass
 
+    def key(self, curr_state: T) -> Any:
+        """
+        Canonical key used by search to detect duplicate states.
+
+        Args:
+            curr_state (T): Current state.
+
+        Returns:
+            Any: Hashable key, the state itself unless overridden.
+        """
+        return curr_state
+
     def h(self, curr_state: T) -> float:
         """
         Heuristic estimate of the cost to reach a goal from the current state.
@@ -257,14 +275,21 @@ class ContinuousNavigation(Problem[tuple[Area]]):
     with the first tuple being the agent location.
 
     Attributes:
-        DIRECTIONS (list[str]): List of possible movement directions.
+        DIRECTIONS (dict[float, tuple]): Movement vectors for each speed, see directions().
         goal_state (tuple[int, int]): Target goal location.
         width (int): Maze width.
         height (int): Maze height.
         maze (list[Thing]): Flat list representation of the maze layout.
+        SPEED (float): Distance covered by a single move.
+        QUANTUM (float | None): Lattice spacing used to snap states to integer keys,
+            None compares raw float positions.
+        index (spatial.SpatialIndex | occupancy.OccupancyGrid): Shared collision backend for the maze.
+        margin (float): Clearance kept from obstacles, 0 checks the point only.
     """
 
- 
+    DIRECTIONS = {}
+    SPEED = 0.5
+    QUANTUM = 0.25
 
     def __init__(self, starting_pos, collision_areas: tuple[Area, ...], goal_area: Area):
         """
@@ -277,10 +302,14 @@ class ContinuousNavigation(Problem[tuple[Area]]):
             maze (list[Thing]): Flat list representation of the maze.
             width (int): Maze width.
             height (int): Maze height.
+            collision_areas may also be an occupancy.OccupancyGrid, in which
+            case collision checks use the rasterized grid.
         """
         super().__init__(starting_pos)
         self.goal_state = goal_area
         self.maze = collision_areas
+        self.index = spatial.get_index(collision_areas)
+        self.margin = 0
 
     def is_goal(self, curr_pos: tuple[int, int]) -> bool:
         """
@@ -308,12 +337,53 @@ class ContinuousNavigation(Problem[tuple[Area]]):
         Returns:
             bool: True if a Thing of the specified type is present, False otherwise.
         """
-        for i in self.maze:
-            if i.check_collision((x,y)):
-                return True
-        return False
+        if self.margin > 0:
+            return self.index.check_box((x - self.margin, y - self.margin, x + self.margin, y + self.margin))
+        return self.index.check_collision((x, y))
 
 
+    def path_clear(self, start: tuple[float, float], moves) -> bool:
+        """
+        Replays movement vectors from start, checking every position reached
+        the way actions() checks a move. Used before reusing a path that was
+        planned from a nearby start.
+
+        Args:
+            start (tuple[float, float]): Position the moves are replayed from.
+            moves (Iterable[tuple[float, float]]): Movement vectors.
+        Returns:
+            bool: True if no position along the moves collides.
+        """
+        x, y = start
+        for move in moves:
+            x += move[0]
+            y += move[1]
+            if self.collision_at(x, y):
+                return False
+        return True
+
+    @staticmethod
+    def directions(speed: float) -> tuple[tuple[float, float], ...]:
+        """
+        Returns the 8 movement vectors of length speed, built once per speed.
+
+        Args:
+            speed (float): Distance covered by a move.
+        Returns:
+            tuple[tuple[float, float], ...]: Axis and diagonal moves.
+        """
+        if speed not in ContinuousNavigation.DIRECTIONS:
+            offsets = (-1, 0, 1)
+            moves = []
+            for y_i in offsets:
+                for x_i in offsets:
+                    offset_length = math.sqrt(x_i ** 2 + y_i ** 2)
+                    if offset_length == 0:
+                        continue
+                    moves.append((x_i / offset_length * speed, y_i / offset_length * speed))
+            ContinuousNavigation.DIRECTIONS[speed] = tuple(moves)
+        return ContinuousNavigation.DIRECTIONS[speed]
+
     def actions(self, curr_pos: tuple[int, int]) -> list[str]:
         """
         Returns available actions from the current state.
@@ -327,21 +397,10 @@ class ContinuousNavigation(Problem[tuple[Area]]):
         x, y = curr_pos
         ret = []
 
-        speed = 0.5
-
-        offsets = (-1, 0, 1)
-
-        for y_i in offsets:
-            for x_i in offsets:
-                
-                offset_length = math.sqrt(x_i ** 2 + y_i ** 2)
-                if offset_length == 0:
-                    continue
-
-                offset_scaled = (x_i / offset_length * speed, y_i / offset_length * speed)
-
-                if not self.collision_at(x + offset_scaled[0], y + offset_scaled[1]):
-                    ret.append(offset_scaled)
+        # Shared move tuples, so nodes don't each allocate their own action
+        for offset_scaled in ContinuousNavigation.directions(self.SPEED):
+            if not self.collision_at(x + offset_scaled[0], y + offset_scaled[1]):
+                ret.append(offset_scaled)
 
 
         #ret.sort(key=lambda d: self.DIRECTIONS.index(d))
@@ -387,24 +446,42 @@ class ContinuousNavigation(Problem[tuple[Area]]):
         """
         return 1 #self.maze[self.to_index(next_state[0][0], next_state[0][1])].cost
 
-    def h(self, curr_pos: tuple[int, int]) -> float:
+    def key(self, curr_pos: tuple[float, float]) -> tuple:
         """
-        Estimates the cost to reach the goal using Manhattan distance.
+        Snaps a position to the integer lattice of spacing QUANTUM.
+
+        Positions are built by repeatedly adding axis and diagonal offsets, so
+        positions that should match drift apart by float error. Keying on the
+        lattice cell makes those duplicates compare equal, while the node keeps
+        the float position for the returned moves.
 
         Args:
-            curr_state (tuple[tuple[int, int], ...]): Locations of things.
-            First tuple corresponds to the agent.
+            curr_pos (tuple[float, float]): Agent position.
         Returns:
-            float: Manhattan distance from agent to goal.
+            tuple: Lattice key, or the position itself when QUANTUM is None.
         """
+        if self.QUANTUM is None:
+            return curr_pos
+        return (round(curr_pos[0] / self.QUANTUM), round(curr_pos[1] / self.QUANTUM))
 
-        goal = self.goal_state.get_center()
-
-        return float(abs(goal[0] - curr_pos[0]) ** 2 +
-                     abs(goal[1] - curr_pos[1]) ** 2)
-
-
+    def h(self, curr_pos: tuple[int, int]) -> float:
+        """
+        Estimates the cost to reach the goal using octile distance.
 
+        Every move covers SPEED units along one of the 8 directions at a cost
+        of 1, so the fewest moves to cover an offset is the octile distance
+        divided by SPEED. The offset is taken to the nearest point of the goal
+        area, which keeps the estimate admissible and consistent.
 
+        Args:
+            curr_state (tuple[tuple[int, int], ...]): Locations of things.
+            First tuple corresponds to the agent.
+        Returns:
+            float: Octile distance from agent to goal in moves.
+        """
 
+        goal = self.goal_state.get_nearest(curr_pos)
 
+        dx = abs(goal[0] - curr_pos[0])
+        dy = abs(goal[1] - curr_pos[1])
+        return (max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy)) / self.SPEED
@@ -1,12 +1,20 @@
 import collections
+import copy
+import functools
+import heapq
 import random
 import sys
-from queue import PriorityQueue
-
+import time
 
+import area
 from problem import ContinuousNavigation, Problem
 from problem import Node
 
+# Totals across best-first searches, used by the benchmarker
+SEARCH_STATS = {"searches": 0, "expansions": 0, "moves": 0, "time": 0}
+
+DEFAULT_WEIGHT = 4      # w of default_search, at dist 400 plain A* expands ~60x more for ~8% shorter paths
+
 def random_search(problem: Problem) -> list[str]:
     initial_state = problem.initial_state
     num_steps = 10
@@ -84,74 +92,303 @@ def iterative_deepening(problem: Problem) -> list[str]:
             return result
     return random_search(problem)
 
+class BestFirstSearch:
+    """
+    Best-first search whose state can be paused and resumed.
+
+    The frontier, reached map and closed set live on the object, so step()
+    can stop after a budget of expansions or nanoseconds and pick up where
+    it left off on the next call. best_first_search runs one to completion.
+
+    Attributes:
+        problem (Problem): Problem being searched.
+        f (callable): Priority of a node, lower is expanded first.
+        goal_on_expand (bool): Goal test on pop instead of on generation.
+        done (bool): True once a path was found or the frontier ran out.
+        path (list): Actions to the goal, empty until done (or if unreachable).
+        expansions (int): Nodes expanded so far.
+    """
+
+    def __init__(self, problem: Problem, f, goal_on_expand: bool = False):
+        SEARCH_STATS["searches"] += 1
+        self.problem = problem
+        self.f = f
+        self.goal_on_expand = goal_on_expand
+        self.path = []
+        self.expansions = 0
+
+        node = Node(problem.initial_state)
+        self.done = problem.is_goal(node.state)
+        self.frontier = [(f(node), node.id, node)]
+        self.reached = {problem.key(problem.initial_state): node}
+        self.closed = set()
+
+    def step(self, max_expansions: int = None, max_ns: int = None) -> bool:
+        """
+        Expands nodes until the search finishes or a budget runs out.
+
+        Args:
+            max_expansions (int | None): Expansion budget for this call.
+            max_ns (int | None): Time budget for this call in nanoseconds.
+
+        Returns:
+            bool: True if the search is done.
+        """
+        if self.done:
+            return True
+        start = time.perf_counter_ns()
+        deadline = start + max_ns if max_ns is not None else None
+        limit = self.expansions + max_expansions if max_expansions is not None else None
+
+        problem = self.problem
+        f = self.f
+        goal_on_expand = self.goal_on_expand
+        frontier = self.frontier
+        reached = self.reached
+        closed = self.closed
+        expansions = self.expansions
+
+        while frontier and not self.done:
+            if limit is not None and expansions >= limit:
+                break
+            if deadline is not None and time.perf_counter_ns() >= deadline:
+                break
+            node : Node = heapq.heappop(frontier)[2]
+            s = problem.key(node.state)
+            if s in closed or reached[s] is not node:
+                continue
+            if goal_on_expand and problem.is_goal(node.state):
+                self.path = Node.path_actions(node)
+                self.done = True
+                break
+            closed.add(s)
+            expansions += 1
+            for child in Node.expand(node, problem):
+                if not goal_on_expand and problem.is_goal(child.state):
+                    self.path = Node.path_actions(child)
+                    self.done = True
+                    break
+                s = problem.key(child.state)
+                if s in closed:
+                    continue
+                if not (s in reached) or child.path_cost < reached[s].path_cost:
+                    reached[s] = child
+                    heapq.heappush(frontier, (f(child), child.id, child))
+
+        if not frontier:
+            self.done = True
+        if self.done:
+            SEARCH_STATS["moves"] += len(self.path)
+
+        SEARCH_STATS["expansions"] += expansions - self.expansions
+        SEARCH_STATS["time"] += time.perf_counter_ns() - start
+        self.expansions = expansions
+        return self.done
+
+    def release(self, max_ns: int = None) -> bool:
+        """
+        Frees the search tree of a finished search, within a time budget.
+
+        Dropping a large tree at once can take longer than a frame, so this
+        empties the frontier, reached map and closed set in batches, newest
+        entries first so children go before their parents.
+
+        Returns:
+            bool: True once everything is freed.
+        """
+        deadline = time.perf_counter_ns() + max_ns if max_ns is not None else None
+        while self.frontier or self.reached or self.closed:
+            if deadline is not None and time.perf_counter_ns() >= deadline:
+                return False
+            for _ in range(256):
+                if self.frontier:
+                    self.frontier.pop()
+                elif self.reached:
+                    self.reached.popitem()
+                elif self.closed:
+                    self.closed.pop()
+                else:
+                    break
+        return True
+
+def best_first_search(problem: Problem, f, goal_on_expand: bool = False) -> list[str]:
+    """Implements best-first search on a binary heap ordered by f(node).
+
+    Entries made stale by a cheaper path to the same state are skipped when
+    popped, and each state is expanded at most once thanks to the closed set.
+    States are compared through problem.key so near-identical states merge.
+    Goal testing happens when a child is generated, or when a node is popped
+    if goal_on_expand is set (needed for cost guarantees).
+    """
+    search = BestFirstSearch(problem, f, goal_on_expand)
+    search.step()
+    return search.path
+
 def uniform_search(problem: Problem) -> list[str]:
-    """Implements Uniform Search by hardcoding the frontier behavior of best-first search as
-    a priority queue that uses the path_cost of a node as its priority.
+    """Implements Uniform Search as best-first search that uses the path_cost
+    of a node as its priority.
     """
-    #TODO Implement this method. Look at pq_example.py for how to use a priority queue.
-    node : Node
-    node = Node(problem.initial_state)
-    if problem.is_goal(node.state):
-        return Node.path_actions(node)
-    frontier = PriorityQueue()
-    frontier.put((node.path_cost, node.id, node))
-    reached  = {problem.initial_state:node}
-    while frontier.qsize() > 0:
-        node : Node = frontier.get()[2]
-        for child in Node.expand(node, problem):
-            s = child.state
-            if problem.is_goal(s):
-                return Node.path_actions(child)
-            if not (s in reached) or child.path_cost < reached[s].path_cost:
-                reached[s] = child
-                frontier.put((child.path_cost, child.id, child))
-    return []
-    return random_search(problem)
+    return best_first_search(problem, lambda node: node.path_cost)
 
 
 def astar_search(problem: Problem) -> list[str]:
-    """Implements A* Search."""
+    """Implements A* Search.
 
-    node : Node
-    node = Node(problem.initial_state)
-    #print(node)
-    if problem.is_goal(node.state):
-        return Node.path_actions(node)
-    frontier = PriorityQueue()
-    frontier.put((node.path_cost + problem.h(node.state), node.id, node))
-    reached  = {problem.initial_state:node}
-    while frontier.qsize() > 0:
-        node : Node = frontier.get()[2]
-        for child in Node.expand(node, problem):
-            s = child.state
-            if problem.is_goal(s):
-                return Node.path_actions(child)
-            if not (s in reached) or child.path_cost < reached[s].path_cost:
-                reached[s] = child
-                frontier.put((child.path_cost + problem.h(child.state), child.id, child))
-    return []
-    return random_search(problem)
+    Goals are tested when generated, so the path found can be slightly
+    longer than optimal. weighted_astar_search with w = 1 tests on
+    expansion and is optimal. With the octile heuristic this expands a
+    lot behind obstacles, default_search is the faster bounded alternative.
+    """
+    return best_first_search(problem, lambda node: node.path_cost + problem.h(node.state))
+
+def incremental_astar_search(problem: ContinuousNavigation) -> BestFirstSearch:
+    """Returns a paused A* search, driven with step() and read from path once done."""
+    return BestFirstSearch(problem, lambda node: node.path_cost + problem.h(node.state))
+
+def incremental_weighted_astar_search(problem: Problem, w: float = 1.0) -> BestFirstSearch:
+    """Returns a paused weighted A* search, see weighted_astar_search."""
+    if w < 1:
+        raise ValueError("Weighted A* requires w >= 1")
+    return BestFirstSearch(problem, lambda node: node.path_cost + w * problem.h(node.state), goal_on_expand=True)
+
+def weighted_astar_search(problem: Problem, w: float = 1.0) -> list[str]:
+    """Implements Weighted A* Search with f = g + w * h.
+
+    With an admissible, consistent heuristic the returned path costs at most
+    w times the optimal cost, so w = 1 is optimal A* and larger w trades
+    path quality for fewer expansions.
+    """
+    search = incremental_weighted_astar_search(problem, w)
+    search.step()
+    return search.path
+
+def default_search(problem: Problem) -> list[str]:
+    """
+    Weighted A* with w = DEFAULT_WEIGHT, paths at most DEFAULT_WEIGHT times
+    optimal for far fewer expansions. Passed explicitly where latency
+    matters more than path length (HA* segments, the interactive Pathfinder).
+    """
+    return weighted_astar_search(problem, DEFAULT_WEIGHT)
+
+def incremental_default_search(problem: Problem) -> BestFirstSearch:
+    """Returns a paused default_search."""
+    return incremental_weighted_astar_search(problem, DEFAULT_WEIGHT)
+
+RESUMABLE = {
+    astar_search: incremental_astar_search,
+    weighted_astar_search: incremental_weighted_astar_search,
+    default_search: incremental_default_search,
+}
+
+def resumable(method):
+    """
+    Returns the paused counterpart of a best-first planner, a function
+    taking a problem and returning a BestFirstSearch to drive with step().
+    functools.partial objects of the planners in RESUMABLE keep their arguments.
+
+    Raises:
+        ValueError: If method has no paused counterpart.
+    """
+    if isinstance(method, functools.partial) and method.func in RESUMABLE:
+        return functools.partial(RESUMABLE[method.func], *method.args, **method.keywords)
+    if method in RESUMABLE:
+        return RESUMABLE[method]
+    raise ValueError(f"{getattr(method, '__name__', method)} cannot be time sliced, it has no resumable counterpart")
+
+def bidirectional_astar_search(problem: ContinuousNavigation, w: float = 1.0) -> list[tuple[float, float]]:
+    """Implements Bidirectional A* Search.
+
+    A forward search from the initial state and a backward search from the
+    goal area's center run in alternation, always expanding the side with
+    the smaller frontier. The sides meet when a generated state's
+    problem.key was reached by the other side. With w = 1 the search stops
+    once neither frontier can beat the best meeting cost. With w > 1 both
+    sides use f = g + w * h and stop at the first meeting.
+
+    The backward half is reversed and negated onto the forward half. Meeting
+    states share a key but not an exact position, so the backward search
+    keeps a QUANTUM margin from obstacles to keep the stitched half clear.
+    """
+    if w < 1:
+        raise ValueError("Bidirectional A* requires w >= 1")
+    start = time.perf_counter_ns()
+    SEARCH_STATS["searches"] += 1
+
+    if problem.is_goal(problem.initial_state):
+        return []
+
+    # Backward problem searches from the goal center toward the start
+    backward = copy.copy(problem)
+    backward.initial_state = problem.goal_state.get_center()
+    backward.goal_state = area.CircleArea(problem.initial_state, problem.SPEED, "temp")
+    backward.margin = problem.QUANTUM or 0
+
+    sides = []
+    for prob in (problem, backward):
+        node = Node(prob.initial_state)
+        sides.append({
+            "problem": prob,
+            "frontier": [(w * prob.h(node.state), node.id, node)],
+            "reached": {prob.key(node.state): node},
+            "closed": set(),
+        })
+
+    best_cost = float("inf")
+    best_pair = None        # (forward node, backward node or None if forward reached the goal area)
+    expansions = 0
+
+    while sides[0]["frontier"] and sides[1]["frontier"]:
+        if max(sides[0]["frontier"][0][0], sides[1]["frontier"][0][0]) >= best_cost:
+            break
+        if w > 1 and best_pair is not None:
+            break
+
+        index = 0 if len(sides[0]["frontier"]) <= len(sides[1]["frontier"]) else 1
+        side = sides[index]
+        other = sides[1 - index]
+        prob = side["problem"]
+
+        node : Node = heapq.heappop(side["frontier"])[2]
+        s = prob.key(node.state)
+        if s in side["closed"] or side["reached"][s] is not node:
+            continue
+        side["closed"].add(s)
+        expansions += 1
+
+        for child in Node.expand(node, prob):
+            if index == 0 and problem.is_goal(child.state) and child.path_cost < best_cost:
+                best_cost = child.path_cost
+                best_pair = (child, None)
+            s = prob.key(child.state)
+            if s in other["reached"]:
+                meet = other["reached"][s]
+                if child.path_cost + meet.path_cost < best_cost:
+                    best_cost = child.path_cost + meet.path_cost
+                    best_pair = (child, meet) if index == 0 else (meet, child)
+            if s in side["closed"]:
+                continue
+            if not (s in side["reached"]) or child.path_cost < side["reached"][s].path_cost:
+                side["reached"][s] = child
+                heapq.heappush(side["frontier"], (child.path_cost + w * prob.h(child.state), child.id, child))
+
+    path = []
+    if best_pair is not None:
+        forward_node, backward_node = best_pair
+        path = Node.path_actions(forward_node)
+        if backward_node is not None:
+            path += [(-move[0], -move[1]) for move in reversed(Node.path_actions(backward_node))]
+
+    SEARCH_STATS["expansions"] += expansions
+    SEARCH_STATS["moves"] += len(path)
+    SEARCH_STATS["time"] += time.perf_counter_ns() - start
+    return path
 
 def greedy_search(problem: Problem) -> list[str]:
     """Implements Greedy Search."""
-    #TODO Implement this method. Make sure you implement the heuristic methods h() in
-    # DustMaze before running the dust maze tests.
-    node : Node
-    node = Node(problem.initial_state)
-    if problem.is_goal(node.state):
-        return Node.path_actions(node)
-    frontier = PriorityQueue()
-    frontier.put((problem.h(node.state), node.id, node))
-    reached  = {problem.initial_state:node}
-    while frontier.qsize() > 0:
-        node : Node = frontier.get()[2]
-        for child in Node.expand(node, problem):
-            s = child.state
-            if problem.is_goal(s):
-                return Node.path_actions(child)
-            if not (s in reached) or child.path_cost < reached[s].path_cost:
-                reached[s] = child
-                frontier.put((problem.h(child.state), child.id, child))
-    return []
-    return random_search(problem)
+    return best_first_search(problem, lambda node: problem.h(node.state))
 
+def reset_stats():
+    SEARCH_STATS["searches"] = 0
+    SEARCH_STATS["expansions"] = 0
+    SEARCH_STATS["moves"] = 0
+    SEARCH_STATS["time"] = 0
@@ -0,0 +1,366 @@
+"""
+sectorFlow.py
+
+Hierarchical flow fields for large regions, fit lazily one sector at a time.
+
+The region is split into square sectors of sector_nodes lattice steps,
+neighboring sectors sharing their border nodes. A coarse graph links
+sectors whose shared border has a free node, and a Dijkstra search from
+the sectors touching the goal gives every sector its cost to the goal
+and the next sector on its route.
+
+A sector's fine flowField.FlowField (over the sector's region, at the
+field density) is only fit when an agent samples a position inside it.
+Its sources are the border nodes it shares with its next sector, seeded
+with that sector's arrival times and directions, so the fields along a
+route join into one continuous integration field. The next sector is fit
+first when it is not held. If the sampled node is cut off from that
+border, the sector is refit seeded from every neighbor closer to the
+goal. Only sectors agents pass through are ever fit, and once more than
+max_sectors are held the least recently sampled one is evicted.
+
+Dependencies:
+- numpy (border and seed arrays)
+- area (defines Area objects with bounds and collision checks)
+- flowField (per sector fields)
+"""
+
+import collections
+import heapq
+import math
+import time
+import numpy as np
+import area, flowField
+
+BATCH_MIN = 16      # Sector groups smaller than this are sampled one position at a time, under the array path's fixed cost
+
+
+class SectorFlowField:
+    """
+    Flow field over a large region, built from lazily fit sector fields.
+
+    Exposes get_move_at and get_moves_at like flowField.FlowField, so
+    FlowAgent and agent.FlowCrowd can follow it.
+
+    Attributes:
+        goal (area.Area): Area the field leads to.
+        env (list[Area]): Obstacles avoided by the field.
+        density (float): Spacing between nodes of the sector fields.
+        region (tuple): (min_x, min_y, max_x, max_y) covered by sectors.
+        sector_nodes (int): Lattice steps along a sector side.
+        max_sectors (int): Sector fields held before the least recently sampled is evicted.
+        base (tuple[int, int]): Lattice index of the region's first node.
+        last (tuple[int, int]): Lattice index of the region's last node.
+        shape (tuple[int, int]): Number of sectors along x and y.
+        costs (dict[tuple, float]): Coarse cost to the goal of each reachable sector.
+        next_sector (dict[tuple, tuple | None]): Next sector on each sector's route, None in goal sectors.
+        fields (OrderedDict[tuple, FlowField]): Held sector fields, least recently sampled first.
+        rings (dict[tuple, tuple]): (index_x, index_y, times, dirs) of the reached border
+            nodes of every sector fit so far, the seeds of the sectors before it.
+        widened (set[tuple]): Sectors seeded from every closer neighbor.
+    """
+
+    def __init__(self, goal : area.Area, env, density = 5, region = (0, 0, 200, 125), sector_nodes = 25, max_sectors = 64):
+        self.goal = goal
+        self.env = env
+        self.density = density
+        self.region = region
+        self.sector_nodes = sector_nodes
+        self.max_sectors = max_sectors
+        self.fields = collections.OrderedDict()
+        self.rings = {}
+        self.widened = set()
+        self.fit()
+
+    def fit(self):
+        """Rebuilds the coarse sector graph and drops every sector field."""
+        start_time = time.perf_counter_ns()
+        self.fields.clear()
+        self.rings.clear()
+        self.widened.clear()
+        self.reset_stats()
+
+        self.base = (math.ceil(self.region[0] / self.density), math.ceil(self.region[1] / self.density))
+        self.last = (math.floor(self.region[2] / self.density), math.floor(self.region[3] / self.density))
+        self.shape = (max(1, math.ceil((self.last[0] - self.base[0]) / self.sector_nodes)),
+                      max(1, math.ceil((self.last[1] - self.base[1]) / self.sector_nodes)))
+
+        # Bucket obstacles by the sectors whose nodes they may cover, borders belong to both sides
+        self.buckets = {}
+        self.unbounded = []
+        for obstacle in self.env:
+            b = obstacle.get_bounds()
+            if b is None:
+                self.unbounded.append(obstacle)
+                continue
+            low_x = max(math.ceil((math.ceil(b[0] / self.density) - self.base[0]) / self.sector_nodes) - 1, 0)
+            low_y = max(math.ceil((math.ceil(b[1] / self.density) - self.base[1]) / self.sector_nodes) - 1, 0)
+            high_x = min((math.floor(b[2] / self.density) - self.base[0]) // self.sector_nodes, self.shape[0] - 1)
+            high_y = min((math.floor(b[3] / self.density) - self.base[1]) // self.sector_nodes, self.shape[1] - 1)
+            for x in range(low_x, high_x + 1):
+                for y in range(low_y, high_y + 1):
+                    self.buckets.setdefault((x, y), []).append(obstacle)
+
+        self.route()
+        self.graph_time = time.perf_counter_ns() - start_time
+
+    def nodes(self, sector) -> tuple[int, int, int, int]:
+        """Lattice index range (min_x, min_y, max_x, max_y) of a sector, borders included."""
+        min_x = self.base[0] + sector[0] * self.sector_nodes
+        min_y = self.base[1] + sector[1] * self.sector_nodes
+        return (min_x, min_y, min(min_x + self.sector_nodes, self.last[0]), min(min_y + self.sector_nodes, self.last[1]))
+
+    def sector_of(self, pos) -> tuple[int, int]:
+        x = math.floor(pos[0] / self.density) - self.base[0]
+        y = math.floor(pos[1] / self.density) - self.base[1]
+        return (min(max(x // self.sector_nodes, 0), self.shape[0] - 1), min(max(y // self.sector_nodes, 0), self.shape[1] - 1))
+
+    def obstacles_in(self, sector) -> list:
+        """Obstacles that may cover nodes of a sector."""
+        return self.buckets.get(sector, []) + self.unbounded
+
+    def border(self, a, b) -> tuple[np.ndarray, np.ndarray]:
+        """Lattice indices (x, y) of the nodes shared by two neighboring sectors."""
+        na = self.nodes(a)
+        nb = self.nodes(b)
+        min_x, min_y = max(na[0], nb[0]), max(na[1], nb[1])
+        max_x, max_y = min(na[2], nb[2]), min(na[3], nb[3])
+        # Neighbors share a column or a row
+        if min_x == max_x:
+            ys = np.arange(min_y, max_y + 1)
+            return np.full(ys.size, min_x), ys
+        xs = np.arange(min_x, max_x + 1)
+        return xs, np.full(xs.size, min_y)
+
+    def border_free(self, a, b) -> bool:
+        xs, ys = self.border(a, b)
+        px = xs * self.density
+        py = ys * self.density
+        free = np.ones(px.size, dtype=bool)
+        for obstacle in self.obstacles_in(a):
+            if isinstance(obstacle, area.RectArea):
+                b = obstacle.get_bounds()
+                free &= ~((px >= b[0]) & (px <= b[2]) & (py >= b[1]) & (py <= b[3]))
+            elif isinstance(obstacle, area.CircleArea):
+                free &= np.sqrt((px - obstacle.center[0]) ** 2 + (py - obstacle.center[1]) ** 2) > obstacle.radius
+            else:
+                free &= np.array([not obstacle.check_collision((x, y)) for x, y in zip(px.tolist(), py.tolist())], dtype=bool)
+        return bool(free.any())
+
+    def neighbors(self, sector):
+        for dx, dy in flowField.OFFSETS:
+            other = (sector[0] + dx, sector[1] + dy)
+            if 0 <= other[0] < self.shape[0] and 0 <= other[1] < self.shape[1]:
+                yield other
+
+    def center(self, sector) -> tuple[float, float]:
+        n = self.nodes(sector)
+        return ((n[0] + n[2]) / 2 * self.density, (n[1] + n[3]) / 2 * self.density)
+
+    def route(self):
+        """Dijkstra over the sector graph from every sector touching the goal."""
+        goal_bounds = self.goal.get_bounds()
+        if goal_bounds is None:
+            center = self.goal.get_center()
+            goal_bounds = (center[0], center[1], center[0], center[1])
+        low = self.sector_of((goal_bounds[0], goal_bounds[1]))
+        high = self.sector_of((goal_bounds[2], goal_bounds[3]))
+        self.goal_sectors = {(x, y) for x in range(low[0], high[0] + 1) for y in range(low[1], high[1] + 1)}
+
+        goal_center = self.goal.get_center()
+        self.costs = {}
+        self.next_sector = {}
+        self.links = {}
+        frontier = []
+        for sector in self.goal_sectors:
+            self.costs[sector] = 0
+            self.next_sector[sector] = None
+            frontier.append((0, 0, sector))
+        heapq.heapify(frontier)
+
+        closed = set()
+        while frontier:
+            cost, _, sector = heapq.heappop(frontier)
+            if sector in closed:
+                continue
+            closed.add(sector)
+            here = self.center(sector)
+            for other in self.neighbors(sector):
+                if other in closed:
+                    continue
+                key = (min(sector, other), max(sector, other))
+                if key not in self.links:
+                    self.links[key] = self.border_free(sector, other)
+                if not self.links[key]:
+                    continue
+                there = self.center(other)
+                new_cost = cost + math.sqrt((here[0] - there[0]) ** 2 + (here[1] - there[1]) ** 2)
+                if new_cost < self.costs.get(other, math.inf):
+                    self.costs[other] = new_cost
+                    self.next_sector[other] = sector
+                    # Among equal costs, sectors nearer the goal are settled first
+                    heapq.heappush(frontier, (new_cost, math.sqrt((there[0] - goal_center[0]) ** 2 + (there[1] - goal_center[1]) ** 2), other))
+
+    def field(self, sector) -> flowField.FlowField:
+        """Returns a sector's field, fitting it if it is not held."""
+        self.lookups += 1
+        field = self.fields.get(sector)
+        if field is not None:
+            self.hits += 1
+            self.fields.move_to_end(sector)
+            return field
+
+        for other in self.downstream(sector):
+            self.ring(other)
+        field = self.fit_sector(sector)
+        self.fields[sector] = field
+        while len(self.fields) > self.max_sectors:
+            self.fields.popitem(last = False)
+            self.evictions += 1
+        self.max_bytes = max(self.max_bytes, self.held_bytes())
+        return field
+
+    def downstream(self, sector) -> list[tuple[int, int]]:
+        """Sectors whose borders seed this sector's field."""
+        if sector in self.goal_sectors:
+            return []
+        if sector in self.widened:
+            return [other for other in self.neighbors(sector) if self.costs.get(other, math.inf) < self.costs.get(sector, math.inf)]
+        if self.next_sector.get(sector) is None:
+            return []
+        return [self.next_sector[sector]]
+
+    def ring(self, sector) -> tuple:
+        """
+        Returns the border seeds of a sector, fitting the sectors along its
+        route that have none yet.
+        """
+        chain = [sector]
+        while chain[-1] not in self.rings:
+            after = self.downstream(chain[-1])
+            if len(after) == 0 or after[0] in self.rings:
+                break
+            chain.append(after[0])
+        for s in reversed(chain):
+            if s not in self.rings:
+                # Widened sectors may need more than the first downstream sector
+                for other in self.downstream(s)[1:]:
+                    self.ring(other)
+                field = self.fit_sector(s)
+                if s not in self.fields and len(self.fields) < self.max_sectors:
+                    # Held as least recently sampled, reused if an agent arrives before it is evicted
+                    self.fields[s] = field
+                    self.fields.move_to_end(s, last = False)
+        return self.rings[sector]
+
+    def fit_sector(self, sector) -> flowField.FlowField:
+        """Fits a sector's field from the border seeds downstream and records its own."""
+        n = self.nodes(sector)
+        region = (n[0] * self.density, n[1] * self.density, n[2] * self.density, n[3] * self.density)
+        obstacles = self.obstacles_in(sector)
+
+        if sector in self.goal_sectors:
+            field = flowField.FlowField(self.goal, obstacles, self.density, region)
+        else:
+            seed_x, seed_y, seed_times, seed_dirs = [np.zeros(0, dtype=int)], [np.zeros(0, dtype=int)], [np.zeros(0)], [np.zeros((0, 2))]
+            for other in self.downstream(sector):
+                ring_x, ring_y, ring_times, ring_dirs = self.rings[other]
+                xs, ys = self.border(sector, other)
+                keep = (ring_x >= xs.min()) & (ring_x <= xs.max()) & (ring_y >= ys.min()) & (ring_y <= ys.max())
+                seed_x.append(ring_x[keep])
+                seed_y.append(ring_y[keep])
+                seed_times.append(ring_times[keep])
+                seed_dirs.append(ring_dirs[keep])
+            seeds = (np.concatenate(seed_x), np.concatenate(seed_y), np.concatenate(seed_times), np.concatenate(seed_dirs))
+            field = flowField.FlowField(self.goal, obstacles, self.density, region, seeds = seeds)
+
+        # Reached nodes on the sector's outer border, kept after the field is evicted
+        on_ring = np.zeros(field.distance.shape, dtype=bool)
+        rows = np.arange(field.rows)[:, None] + field.origin[1]
+        cols = np.arange(field.cols)[None, :] + field.origin[0]
+        on_ring |= (rows == n[1]) | (rows == n[3])
+        on_ring |= (cols == n[0]) | (cols == n[2])
+        on_ring &= np.isfinite(field.distance)
+        ring_rows, ring_cols = np.nonzero(on_ring)
+        self.rings[sector] = (ring_cols + field.origin[0], ring_rows + field.origin[1], field.distance[ring_rows, ring_cols], field.dirs[ring_rows, ring_cols])
+
+        self.builds += 1
+        self.build_time += field.build_time
+        return field
+
+    def get_move_at(self, pos):
+        sector = self.sector_of(pos)
+        move = self.field(sector).get_move_at(pos)
+        if move is flowField.NO_DIR and sector not in self.widened and sector not in self.goal_sectors:
+            # Cut off from the next sector's border, seed from every closer neighbor instead
+            self.widened.add(sector)
+            self.fields.pop(sector, None)
+            self.rings.pop(sector, None)
+            move = self.field(sector).get_move_at(pos)
+        return move
+
+    def get_moves_at(self, positions, interpolate = None) -> np.ndarray:
+        """
+        Samples many positions at once, one get_moves_at call on the field
+        of each sector they fall in. Returns (N, 2) directions, NaN rows
+        where get_move_at returns NO_DIR.
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        x = np.floor(positions[:, 0] / self.density).astype(np.int64) - self.base[0]
+        y = np.floor(positions[:, 1] / self.density).astype(np.int64) - self.base[1]
+        sx = np.clip(x // self.sector_nodes, 0, self.shape[0] - 1)
+        sy = np.clip(y // self.sector_nodes, 0, self.shape[1] - 1)
+
+        # Group positions by sector so each sector field is sampled once
+        keys = sx * self.shape[1] + sy
+        order = np.argsort(keys, kind = "stable")
+        starts = np.flatnonzero(np.diff(keys[order], prepend = -1))
+        moves = np.empty((len(positions), 2))
+        for group in np.split(order, starts[1:]):
+            if len(group) == 0:
+                continue
+            if len(group) < BATCH_MIN and interpolate is None:
+                for i in group.tolist():
+                    move = self.get_move_at((positions.item(i, 0), positions.item(i, 1)))
+                    moves[i] = move if move is not flowField.NO_DIR else np.nan
+                continue
+            sector = (int(sx[group[0]]), int(sy[group[0]]))
+            group_moves = self.field(sector).get_moves_at(positions[group], interpolate)
+            if np.isnan(group_moves[:, 0]).any() and sector not in self.widened and sector not in self.goal_sectors:
+                # Cut off from the next sector's border, seed from every closer neighbor instead
+                self.widened.add(sector)
+                self.fields.pop(sector, None)
+                self.rings.pop(sector, None)
+                group_moves = self.field(sector).get_moves_at(positions[group], interpolate)
+            moves[group] = group_moves
+        return moves
+
+    def held_bytes(self) -> int:
+        fields = sum(f.stats()["bytes"] for f in self.fields.values())
+        return fields + sum(sum(a.nbytes for a in ring) for ring in self.rings.values())
+
+    def reset_stats(self):
+        self.lookups = 0
+        self.hits = 0
+        self.builds = 0
+        self.evictions = 0
+        self.build_time = 0
+        self.max_bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "sectors": self.shape[0] * self.shape[1],
+            "held": len(self.fields),
+            "builds": self.builds,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / self.lookups if self.lookups > 0 else 0,
+            "rings": len(self.rings),
+            "bytes": self.held_bytes(),
+            "max_bytes": self.max_bytes,
+            "graph_time": self.graph_time,
+            "build_time": self.build_time,
+        }
+
+    def render(self, surface, offset = (0,0), scale = 1):
+        for field in self.fields.values():
+            field.render(surface, offset, scale)
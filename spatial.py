@@ -0,0 +1,215 @@
+"""
+spatial.py
+
+Uniform bucket grid spatial index for obstacle collision queries.
+
+Instead of scanning every Area in an environment for each point query,
+the index buckets obstacles by their bounding boxes into fixed size
+cells. A point query then only checks the handful of Areas whose
+bounds overlap the cell containing the point.
+
+Indexes are built once per environment list and shared by every
+problem, planner and agent that queries the same environment. Only the
+MAX_INDEXES most recently used environments keep their index, so a sweep
+over many environments does not keep every one of them alive.
+
+Obstacles that move (see area.MovingRectArea) must be passed to
+SpatialIndex.update after they change. The index records the bounds
+each change touched in changes, so incremental planners (dstar) can
+repair only the affected part of their search.
+
+Dependencies:
+- area (defines Area objects with bounds and collision checks)
+"""
+
+import collections
+import itertools
+import time
+import math
+import area
+
+INDEX_CACHE = collections.OrderedDict()  # Maps id(env) → SpatialIndex built for that environment, least recently used first
+MAX_INDEXES = 8         # Environments whose indexes are kept
+BUILDS = itertools.count()
+
+
+class SpatialIndex:
+    """
+    Uniform grid of buckets holding references to overlapping Areas.
+
+    Attributes:
+        areas (list[Area]): Environment the index was built from.
+        cell_size (float): Side length of a bucket.
+        buckets (dict[tuple[int, int], list[Area]]): Areas overlapping each cell.
+        unbounded (list[Area]): Areas without bounds, checked on every query.
+        build_time (int): Nanoseconds spent building the index.
+        queries (int): Number of point queries answered.
+        checks (int): Number of exact Area collision checks performed.
+        changes (list[tuple[float, float, float, float]]): Box covering the old
+            and new bounds of each update, in order. Readers remember how
+            many they have seen.
+        serial (int): Number of this build. A rebuilt index starts a new change
+            log, fingerprints include the serial so it never matches an older one.
+    """
+
+    def __init__(self, areas, cell_size = None):
+        self.areas = areas
+        self.size = len(areas)
+        self.cell_size = cell_size if cell_size is not None else SpatialIndex.pick_cell_size(areas)
+        self.buckets = {}
+        self.unbounded = []
+        self.queries = 0
+        self.checks = 0
+        self.changes = []
+        self.serial = next(BUILDS)
+
+        start = time.time_ns()
+        for obstacle in areas:
+            self.insert(obstacle)
+        self.build_time = time.time_ns() - start
+
+    @staticmethod
+    def pick_cell_size(areas) -> float:
+        """
+        Picks a bucket size close to the average obstacle extent so each
+        obstacle only lands in a few buckets.
+        """
+        total = 0
+        count = 0
+        for obstacle in areas:
+            bounds = obstacle.get_bounds()
+            if bounds is None:
+                continue
+            total += max(bounds[2] - bounds[0], bounds[3] - bounds[1])
+            count += 1
+        if count == 0 or total == 0:
+            return 32
+        return max(1, total / count)
+
+    def to_cell(self, pos) -> tuple[int, int]:
+        return (math.floor(pos[0] / self.cell_size), math.floor(pos[1] / self.cell_size))
+
+    def insert(self, obstacle : area.Area):
+        bounds = obstacle.get_bounds()
+        if bounds is None:
+            self.unbounded.append(obstacle)
+            return
+        min_x, min_y = self.to_cell((bounds[0], bounds[1]))
+        max_x, max_y = self.to_cell((bounds[2], bounds[3]))
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                self.buckets.setdefault((x, y), []).append(obstacle)
+
+    def remove(self, obstacle : area.Area):
+        if obstacle in self.unbounded:
+            self.unbounded.remove(obstacle)
+            return
+        for key in list(self.buckets.keys()):
+            bucket = self.buckets[key]
+            if obstacle in bucket:
+                bucket.remove(obstacle)
+                if len(bucket) == 0:
+                    del self.buckets[key]
+
+    def update(self, obstacle : area.Area, old_bounds = None):
+        """
+        Re-buckets an obstacle after it moved or changed size.
+
+        Args:
+            obstacle (Area): Obstacle already holding its new geometry.
+            old_bounds (tuple | None): Bounds before the change, recorded in
+                changes so cells it left are repaired too.
+        """
+        self.remove(obstacle)
+        self.insert(obstacle)
+        bounds = obstacle.get_bounds()
+        if old_bounds is not None and bounds is not None:
+            # One box covering both, a small move mostly overlaps itself
+            bounds = (min(bounds[0], old_bounds[0]), min(bounds[1], old_bounds[1]), max(bounds[2], old_bounds[2]), max(bounds[3], old_bounds[3]))
+        elif bounds is None:
+            bounds = old_bounds
+        if bounds is not None:
+            self.changes.append(bounds)
+
+    def first_collision(self, pos) -> area.Area:
+        """
+        Returns the first Area colliding with pos, or None if the point is free.
+        """
+        self.queries += 1
+        for obstacle in self.buckets.get(self.to_cell(pos), ()):
+            self.checks += 1
+            if obstacle.check_collision(pos):
+                return obstacle
+        for obstacle in self.unbounded:
+            self.checks += 1
+            if obstacle.check_collision(pos):
+                return obstacle
+        return None
+
+    def check_collision(self, pos) -> bool:
+        return self.first_collision(pos) is not None
+
+    def check_box(self, bounds) -> bool:
+        """
+        Returns True if any obstacle's bounding box overlaps the box
+        (min_x, min_y, max_x, max_y). Conservative for non-rectangular Areas.
+        """
+        self.queries += 1
+        min_x, min_y = self.to_cell((bounds[0], bounds[1]))
+        max_x, max_y = self.to_cell((bounds[2], bounds[3]))
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                for obstacle in self.buckets.get((x, y), ()):
+                    self.checks += 1
+                    other = obstacle.get_bounds()
+                    if other[0] <= bounds[2] and bounds[0] <= other[2] and other[1] <= bounds[3] and bounds[1] <= other[3]:
+                        return True
+        return len(self.unbounded) > 0
+
+    def reset_stats(self):
+        self.queries = 0
+        self.checks = 0
+
+    def stats(self) -> dict:
+        return {
+            "obstacles": self.size,
+            "buckets": len(self.buckets),
+            "build_time": self.build_time,
+            "queries": self.queries,
+            "checks": self.checks,
+            "checks_per_query": self.checks / self.queries if self.queries > 0 else 0,
+        }
+
+
+def get_index(env) -> SpatialIndex:
+    """
+    Returns the shared index for an environment, building it on first use
+    or when obstacles have been added to or removed from the list.
+
+    Environments that already are collision backends (such as an
+    occupancy.OccupancyGrid) are returned as is. Only the MAX_INDEXES most
+    recently used environments keep their index.
+    """
+    if hasattr(env, "first_collision"):
+        return env
+    index = INDEX_CACHE.get(id(env))
+    if index is None or index.areas is not env or index.size != len(env):
+        index = SpatialIndex(env)
+        INDEX_CACHE[id(env)] = index
+    INDEX_CACHE.move_to_end(id(env))
+    while len(INDEX_CACHE) > MAX_INDEXES:
+        INDEX_CACHE.popitem(last = False)
+    return index
+
+
+def layout(env) -> tuple:
+    """
+    Obstacle count, index build and moves the index logged, changes
+    whenever obstacles are added, removed or moved.
+    """
+    index = get_index(env)
+    return (len(env), getattr(index, "serial", None), len(getattr(index, "changes", ())))
+
+
+def clear_cache():
+    INDEX_CACHE.clear()
@@ -0,0 +1,283 @@
+"""
+store.py
+
+Persistent on-disk store of precomputed flow fields and HA* caches, so a
+new process can load them instead of recomputing them.
+
+Entries are grouped under a directory per environment, named by a digest
+of the obstacle geometry (type and bounds of every obstacle), so the
+same layout maps to the same entries across processes while any moved,
+added or removed obstacle maps to new ones. Inside it, each flow field
+is a directory named by a digest of its goal, density, region and field
+type, holding its arrays as uncompressed .npy files that are loaded
+memory-mapped: a warm start maps the arrays instead of marching. HA*
+waypoint lists and segment paths are stored as flat float arrays with
+offsets.
+
+Every entry records the format version and the key it was saved under in
+meta.json. An entry whose record does not match the request (an older
+format, a partial write, a digest collision) is stale: it is removed and
+the data is recomputed. Entries are written to a temporary directory and
+renamed into place, so readers never see half of one.
+
+Environment directories are touched whenever they are read or written.
+After each write, the least recently used ones are removed until the
+store fits in max_bytes. When obstacles of an environment this store has
+seen change, the directory of its previous layout is removed at once.
+
+Dependencies:
+- numpy (array files, memory mapping)
+- flowField (fields and environment fingerprints)
+- hastar (waypoint and segment caches)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import flowField, hastar
+
+FORMAT = 1      # Bumped whenever the layout of an entry changes, older entries are stale
+MAX_BYTES = 256 * 1024 * 1024   # Default bound on the bytes a store keeps on disk
+FIELD_ARRAYS = ("origin", "blocked", "distance", "dirs", "reached", "free")
+
+
+def shape_of(obstacle) -> tuple:
+    bounds = obstacle.get_bounds()
+    return (type(obstacle).__name__, tuple(bounds) if bounds is not None else tuple(obstacle.get_center()))
+
+
+def digest(value) -> str:
+    return hashlib.sha1(repr(value).encode()).hexdigest()[:20]
+
+
+def folder_bytes(path) -> int:
+    return sum(os.path.getsize(os.path.join(folder, name)) for folder, _, names in os.walk(path) for name in names)
+
+
+class PrecomputeStore:
+    """
+    Directory of precomputed flow fields and HA* caches keyed by environment geometry.
+
+    Attributes:
+        root (str): Directory holding the entries.
+        max_bytes (int): Bytes kept on disk before least recently used environments are removed.
+        digests (dict[int, tuple]): (environment, fingerprint, digest) by id of the
+            environment, so geometry is only hashed again after obstacles change.
+        hits (int): Entries loaded.
+        misses (int): Entries not found.
+        stale (int): Entries found but rejected and removed.
+        load_time (int): Nanoseconds spent loading entries.
+        save_time (int): Nanoseconds spent writing entries.
+        pruned (int): Environment directories removed as superseded or to fit max_bytes.
+    """
+
+    def __init__(self, root, max_bytes = MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.digests = {}
+        os.makedirs(root, exist_ok = True)
+        self.reset_stats()
+
+    def env_digest(self, env) -> str:
+        fingerprint = flowField.fingerprint(env)
+        known = self.digests.get(id(env))
+        if known is not None and known[0] is env and known[1] == fingerprint:
+            return known[2]
+        value = digest([shape_of(obstacle) for obstacle in env])
+        if known is not None and known[0] is env and known[2] != value:
+            # Obstacles moved, the old layout's entries cannot be read by this environment again
+            self.remove_env(known[2])
+        self.digests[id(env)] = (env, fingerprint, value)
+        return value
+
+    def remove_env(self, env_digest):
+        path = os.path.join(self.root, env_digest)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors = True)
+            self.pruned += 1
+
+    def touch(self, path):
+        try:
+            os.utime(os.path.dirname(path))
+        except OSError:
+            pass
+
+    def size(self) -> int:
+        """Bytes of every entry on disk."""
+        return folder_bytes(self.root)
+
+    def prune(self, keep = None):
+        """Removes least recently used environment directories, other than keep, until the store fits in max_bytes."""
+        sizes = {}
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isdir(path) and not name.startswith("."):
+                sizes[name] = folder_bytes(path)
+        total = sum(sizes.values())
+        for name in sorted(sizes, key = lambda name: os.path.getmtime(os.path.join(self.root, name))):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            self.remove_env(name)
+            total -= sizes[name]
+
+    def field_key(self, goal, env, density, region, eikonal) -> dict:
+        return {"format": FORMAT, "env": self.env_digest(env), "goal": repr(shape_of(goal)),
+                "density": density, "region": repr(tuple(region)), "eikonal": eikonal}
+
+    def entry(self, key, name) -> str:
+        return os.path.join(self.root, key["env"], name)
+
+    def read_meta(self, path, key):
+        """
+        Returns the meta.json record of an entry, or None if the entry is
+        missing. An entry saved under a different key is removed as stale.
+        """
+        try:
+            with open(os.path.join(path, "meta.json")) as file:
+                meta = json.load(file)
+        except FileNotFoundError:
+            if not os.path.isdir(path):
+                self.misses += 1
+                return None
+            meta = None
+        except ValueError:
+            meta = None
+        if meta is None or meta.get("key") != key:
+            self.discard(path)
+            return None
+        return meta
+
+    def write(self, path, key, arrays, extra = None):
+        """Writes arrays and their meta.json record as one entry, replacing any old one."""
+        start = time.perf_counter_ns()
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        temp = tempfile.mkdtemp(dir = os.path.dirname(path), prefix = ".tmp-")
+        for name, array in arrays.items():
+            np.save(os.path.join(temp, name + ".npy"), np.ascontiguousarray(array))
+        with open(os.path.join(temp, "meta.json"), "w") as file:
+            json.dump({"key": key, **(extra or {})}, file)
+        shutil.rmtree(path, ignore_errors = True)
+        try:
+            os.replace(temp, path)
+        except OSError:
+            # Another process saved the same entry first
+            shutil.rmtree(temp, ignore_errors = True)
+        self.touch(path)
+        self.prune(keep = key["env"])
+        self.save_time += time.perf_counter_ns() - start
+
+    def discard(self, path):
+        self.stale += 1
+        shutil.rmtree(path, ignore_errors = True)
+
+    def load_field(self, goal, env, density = 5, region = (0, 0, 200, 125), eikonal = True) -> flowField.FlowField:
+        """Returns the stored field for these settings with memory-mapped arrays, or None."""
+        start = time.perf_counter_ns()
+        key = self.field_key(goal, env, density, region, eikonal)
+        path = self.entry(key, "flow-" + digest(key))
+        if self.read_meta(path, key) is None:
+            return None
+        try:
+            arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode = "r") for name in FIELD_ARRAYS}
+        except (OSError, ValueError):
+            self.discard(path)
+            return None
+        field = flowField.FlowField(goal, env, density, region, eikonal, arrays = arrays)
+        self.touch(path)
+        self.hits += 1
+        self.load_time += time.perf_counter_ns() - start
+        return field
+
+    def save_field(self, field : flowField.FlowField):
+        key = self.field_key(field.goal, field.env, field.density, field.region, field.eikonal)
+        arrays = {name: getattr(field, name) for name in FIELD_ARRAYS}
+        self.write(self.entry(key, "flow-" + digest(key)), key, arrays, {"build_time": field.build_time})
+
+    def get_field(self, goal, env, density = 5, region = (0, 0, 200, 125), eikonal = True) -> flowField.FlowField:
+        """Loads the stored field for these settings, fitting and saving it on a miss."""
+        field = self.load_field(goal, env, density, region, eikonal)
+        if field is None:
+            field = flowField.FlowField(goal, env, density, region, eikonal)
+            self.save_field(field)
+        return field
+
+    def save_hastar(self, env):
+        """Saves the waypoint and segment caches of env (see hastar.get_caches)."""
+        caches = hastar.get_caches(env)
+        key = self.hastar_key(env, caches)
+        arrays = {}
+        for name, cache in (("grid", caches.waypoints.entries), ("segment", caches.segments.entries)):
+            keys = [(*k[0], *k[1], *k[2:]) for k in cache]
+            lengths = [len(points) for points in cache.values()]
+            arrays[name + "_keys"] = np.array(keys, dtype=np.float64).reshape(len(keys), 5 if name == "grid" else 4)
+            arrays[name + "_offsets"] = np.concatenate(([0], np.cumsum(lengths, dtype=np.int64)))
+            arrays[name + "_points"] = np.array([p for points in cache.values() for p in points], dtype=np.float64).reshape(-1, 2)
+        self.write(self.entry(key, "hastar"), key, arrays)
+
+    def hastar_key(self, env, caches) -> dict:
+        # Segment keys are cells of the cache's quantum, another quantum cannot read them
+        return {"format": FORMAT, "env": self.env_digest(env), "quantum": caches.quantum}
+
+    def load_hastar(self, env) -> int:
+        """
+        Adds the stored HA* caches of env to its hastar.get_caches caches,
+        keeping entries already there. Entries past the caches' bounds are evicted.
+
+        Returns:
+            int: Cache entries loaded.
+        """
+        start = time.perf_counter_ns()
+        caches = hastar.get_caches(env)
+        key = self.hastar_key(env, caches)
+        path = self.entry(key, "hastar")
+        if self.read_meta(path, key) is None:
+            return 0
+        loaded = 0
+        for name, cache in (("grid", caches.waypoints), ("segment", caches.segments)):
+            try:
+                keys = np.load(os.path.join(path, name + "_keys.npy")).tolist()
+                offsets = np.load(os.path.join(path, name + "_offsets.npy")).tolist()
+                points = list(map(tuple, np.load(os.path.join(path, name + "_points.npy"), mmap_mode = "r").tolist()))
+            except (OSError, ValueError):
+                self.discard(path)
+                return loaded
+            for k, begin, end in zip(keys, offsets, offsets[1:]):
+                k = ((k[0], k[1]), (k[2], k[3]), *k[4:])
+                if k not in cache:
+                    cache.put(k, points[begin:end])
+                    loaded += 1
+        self.touch(path)
+        self.hits += 1
+        self.load_time += time.perf_counter_ns() - start
+        return loaded
+
+    def clear(self):
+        """Removes every entry from disk."""
+        shutil.rmtree(self.root, ignore_errors = True)
+        os.makedirs(self.root, exist_ok = True)
+        self.digests.clear()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.load_time = 0
+        self.save_time = 0
+        self.pruned = 0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "load_time": self.load_time,
+            "save_time": self.save_time,
+            "pruned": self.pruned,
+            "bytes": self.size(),
+        }
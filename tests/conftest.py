@@ -0,0 +1,54 @@
+"""
+Shared fixtures for the regression tests.
+
+The modules live at the repository root, so it is put on sys.path here.
+"""
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import area, flowField, hastar, occupancy, problem, spatial
+
+
+def density_env(dist = 160, density = 35):
+    """Small version of benchmarker.generate_density_env: staggered boxes between a start and a goal."""
+    env = []
+    flip = True
+    for x in range(70, dist - 60, density):
+        for y in range(0 if flip else -density // 2, dist // 2, density):
+            env.append(area.RectArea((x, y), (25, 25), "gray"))
+        flip = not flip
+    goal = area.RectArea((dist - 30, dist / 4 - 10), (20, 20), "green")
+    return env, goal
+
+
+@pytest.fixture
+def maze():
+    """(environment, goal, start) of a small density environment."""
+    env, goal = density_env()
+    return env, goal, (10.0, 10.0)
+
+
+@pytest.fixture(autouse = True)
+def fresh_state():
+    # Caches are module level and keyed by environment, every test starts from empty ones
+    quantum = problem.ContinuousNavigation.QUANTUM
+    yield
+    problem.ContinuousNavigation.QUANTUM = quantum
+    spatial.clear_cache()
+    occupancy.clear_cache()
+    flowField.clear_cache()
+    hastar.clear_caches()
+    hastar.clear_graphs()
+
+
+def replay(start, moves):
+    """Position reached after applying moves from start."""
+    x, y = start
+    for move in moves:
+        x += move[0]
+        y += move[1]
+    return (x, y)
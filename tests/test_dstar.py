@@ -0,0 +1,58 @@
+import area, dstar, spatial
+from problem import ContinuousNavigation
+from conftest import replay
+
+
+def assert_valid(problem, start, moves):
+    assert moves
+    assert problem.path_clear(start, moves)
+    assert problem.is_goal(replay(start, moves))
+
+
+def move_obstacle(env, obstacle, pos):
+    old_bounds = obstacle.get_bounds()
+    obstacle.pos = pos
+    spatial.get_index(env).update(obstacle, old_bounds)
+
+
+def test_plan(maze):
+    env, goal, start = maze
+    problem = ContinuousNavigation(start, env, goal)
+    assert_valid(problem, start, dstar.DStarLite(problem).plan())
+
+
+def test_repair_after_obstacle_moves_onto_path(maze):
+    env, goal, start = maze
+    blocker = area.MovingRectArea((0, 100), (10, 10), "gray")
+    env.append(blocker)
+    problem = ContinuousNavigation(start, env, goal)
+    planner = dstar.DStarLite(problem)
+    moves = planner.plan()
+    assert_valid(problem, start, moves)
+
+    # Drop the blocker on a point a few moves ahead
+    ahead = replay(start, moves[:30])
+    move_obstacle(env, blocker, (ahead[0] - 5, ahead[1] - 5))
+    assert not problem.path_clear(start, moves)
+
+    repaired = planner.plan(start)
+    assert_valid(problem, start, repaired)
+    fresh = dstar.DStarLite(ContinuousNavigation(start, env, goal)).plan()
+    assert_valid(problem, start, fresh)
+    assert len(repaired) == len(fresh)
+
+
+def test_obstacle_moving_onto_start(maze):
+    env, goal, start = maze
+    blocker = area.MovingRectArea((0, 100), (10, 10), "gray")
+    env.append(blocker)
+    problem = ContinuousNavigation(start, env, goal)
+    planner = dstar.DStarLite(problem)
+    moves = planner.plan()
+
+    # The agent walks a few moves, then an obstacle lands on its cell
+    pos = replay(start, moves[:10])
+    move_obstacle(env, blocker, (pos[0] - 0.4, pos[1] - 0.4))
+    escape = planner.plan(pos)
+    assert escape
+    assert problem.is_goal(replay(pos, escape))
@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+import agent, area, flowField, spatial
+
+REGION = (0, 0, 160, 80)
+
+
+def test_directions_step_closer(maze):
+    env, goal, _ = maze
+    field = flowField.FlowField(goal, env, density = 5, region = REGION, eikonal = False)
+    rows, cols = np.nonzero(field.reached & ~field.blocked)
+    checked = 0
+    for row, col in zip(rows, cols):
+        if field.distance[row, col] == 0:
+            continue
+        dx, dy = field.dirs[row, col] / field.density
+        assert abs(dx) + abs(dy) == 1
+        assert field.distance[row + int(dy), col + int(dx)] == field.distance[row, col] - 1
+        checked += 1
+    assert checked > 300
+
+
+def test_no_direction_far_outside(maze):
+    env, goal, _ = maze
+    field = flowField.FlowField(goal, env, density = 5, region = REGION, eikonal = False)
+    assert field.get_move_at((-500, -500)) == flowField.NO_DIR
+
+
+@pytest.mark.parametrize("density", [2, 5])
+def test_agents_reach_goal(maze, density):
+    env, goal, start = maze
+    field = flowField.FlowField(goal, env, density = density, region = REGION)
+    walker = agent.FlowAgent(start, env, goal, field)
+    for _ in range(2000):
+        if walker.update():
+            break
+    assert goal.check_collision(walker.pos)
+
+
+def test_eikonal_distance_is_euclidean_on_open_ground():
+    goal = area.RectArea((100, 40), (10, 10), "green")
+    field = flowField.FlowField(goal, [], density = 5, region = REGION)
+    grid = flowField.FlowField(goal, [], density = 5, region = REGION, eikonal = False)
+    for x, y in [(0, 0), (20, 70), (150, 5), (0, 80)]:
+        col, row = x // 5 - field.origin[0], y // 5 - field.origin[1]
+        nx, ny = goal.get_nearest((x, y))
+        straight = np.hypot(nx - x, ny - y) / 5
+        assert straight <= field.distance[row, col] <= 1.1 * straight
+        assert field.distance[row, col] < grid.distance[row, col]
+
+
+def test_pool_shares_equal_goals(maze):
+    env, goal, _ = maze
+    pool = flowField.FlowFieldPool()
+    field = pool.get(goal, env, region = REGION)
+    same = area.RectArea(goal.pos, goal.size, goal.color)
+    assert pool.get(same, env, region = REGION) is field
+    assert pool.get(goal, env, region = REGION, eikonal = False) is not field
+    assert pool.stats()["hits"] == 1
+
+
+def test_pool_evicts_least_recently_used(maze):
+    env, goal, _ = maze
+    goals = [area.RectArea((130, y), (20, 20), "green") for y in (0, 30, 60)]
+    size = flowField.FlowField(goal, env, region = REGION).stats()["bytes"]
+    pool = flowField.FlowFieldPool(max_bytes = 2 * size)
+    first, second, _ = (pool.get(target, env, region = REGION) for target in goals)
+    stats = pool.stats()
+    assert stats["fields"] == 2 and stats["evictions"] == 1
+    assert stats["bytes"] <= 2 * size
+    assert pool.get(goals[1], env, region = REGION) is second
+    assert pool.get(goals[0], env, region = REGION) is not first
+
+
+def test_get_field_refits_after_move(maze):
+    env, goal, _ = maze
+    mover = area.MovingRectArea((20, 20), (5, 5), "gray")
+    env.append(mover)
+    field = flowField.get_field(goal, env, region = REGION)
+    assert flowField.get_field(goal, env, region = REGION) is field
+    old_bounds = mover.get_bounds()
+    mover.update()
+    spatial.get_index(env).update(mover, old_bounds)
+    assert flowField.get_field(goal, env, region = REGION) is not field
+
+
+@pytest.mark.parametrize("eikonal", [True, False])
+def test_get_moves_at_matches_get_move_at(maze, eikonal):
+    env, goal, _ = maze
+    field = flowField.FlowField(goal, env, density = 5, region = REGION, eikonal = eikonal)
+
+    rng = np.random.default_rng(0)
+    # Inside the region, past its edges, on lattice nodes, and inside obstacles
+    points = np.vstack((rng.uniform(-10, 170, size = (400, 2)),
+                        np.column_stack((np.arange(0, 160, 5.0), np.full(32, 40.0))),
+                        [(80, 10), (82.5, 12.5), (0, 0), (160, 80)]))
+    batched = field.get_moves_at(points)
+    for point, move in zip(points, batched):
+        expected = field.get_move_at(tuple(point))
+        if expected == flowField.NO_DIR:
+            assert np.isnan(move).all()
+        else:
+            assert move == pytest.approx(expected, abs = 1e-9)
+
+
+def test_get_moves_at_overrides_field_type(maze):
+    env, goal, _ = maze
+    field = flowField.FlowField(goal, env, density = 5, region = REGION, eikonal = True)
+    points = [(12.3, 7.9), (41.0, 33.3)]
+    nearest = field.get_moves_at(points, interpolate = False)
+    field.eikonal = False
+    assert np.array_equal(nearest, field.get_moves_at(points))
+
+
+def test_crowd_matches_agent_updates(maze):
+    env, goal, _ = maze
+    field = flowField.FlowField(goal, env, density = 2, region = REGION)
+    starts = [(10.0, 10.0), (10.0, 60.0), (40.0, 40.0), (60.0, 5.0)]
+    walkers = [agent.FlowAgent(start, env, goal, field) for start in starts]
+    crowd = agent.FlowCrowd([agent.FlowAgent(start, env, goal, field) for start in starts])
+    for _ in range(300):
+        for walker in walkers:
+            walker.update()
+        crowd.update()
+    crowd.sync()
+    for walker, member in zip(walkers, crowd.agents):
+        assert member.pos == pytest.approx(walker.pos, abs = 1e-6)
+        assert member.steps == walker.steps
+    assert not crowd.active.any()
+
+
+def test_crowd_needs_agents():
+    with pytest.raises(ValueError):
+        agent.FlowCrowd([])
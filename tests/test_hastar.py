@@ -0,0 +1,142 @@
+import pytest
+
+import agent, hastar, spatial
+from problem import ContinuousNavigation
+from conftest import density_env, replay
+
+
+def free_at(graph, x, y):
+    return bool(graph.free[round(y / graph.step) - graph.origin[1], round(x / graph.step) - graph.origin[0]])
+
+
+@pytest.fixture
+def segment_pool():
+    pool = hastar.SegmentPool(workers = 1)
+    yield pool
+    pool.close()
+
+
+def test_find_waypoints(maze):
+    env, goal, start = maze
+    problem = ContinuousNavigation(start, env, goal)
+    waypoints = hastar.get_graph(env).find_waypoints(start, goal.get_center())
+    assert waypoints
+    assert waypoints[-1] == goal.get_center()
+    for waypoint in waypoints:
+        assert not problem.collision_at(*waypoint)
+
+
+def test_path_is_collision_free(maze):
+    env, goal, start = maze
+    problem = ContinuousNavigation(start, env, goal)
+    moves = hastar.hierarchical_astar_search(problem)
+    assert moves
+    assert problem.path_clear(start, moves)
+    assert problem.is_goal(replay(start, moves))
+
+    # The second query is served from the caches and returns the same moves
+    caches = hastar.get_caches(env)
+    misses = caches.segments.stats()["misses"]
+    assert hastar.hierarchical_astar_search(problem) == moves
+    assert caches.segments.stats()["misses"] == misses
+
+
+def test_stream_matches_search(maze):
+    env, goal, start = maze
+    problem = ContinuousNavigation(start, env, goal)
+    moves = hastar.hierarchical_astar_search(problem)
+    hastar.clear_caches()
+    streamed = [move for segment in hastar.stream_hierarchical_astar(problem) for move in segment]
+    assert streamed == moves
+
+
+def test_lazy_agent_refines_on_demand(maze):
+    env, goal, start = maze
+    walker = agent.HAAgent(start, env, goal)
+    walker.update()
+    caches = hastar.get_caches(env)
+    # Only the first segment is searched before the first move
+    assert caches.segments.stats()["misses"] == 1
+    for _ in range(2000):
+        if walker.update():
+            break
+    assert goal.check_collision(walker.pos)
+    assert caches.segments.stats()["misses"] > 1
+
+
+def test_graph_rebuilt_when_obstacles_move(maze):
+    env, goal, start = maze
+    graph = hastar.get_graph(env)
+    assert hastar.get_graph(env) is graph
+    # The first box covers (70, 0) to (95, 25), moved 20 to the left
+    assert free_at(graph, 55, 10) and not free_at(graph, 85, 10)
+
+    obstacle = env[0]
+    old_bounds = obstacle.get_bounds()
+    obstacle.pos = (obstacle.pos[0] - 20, obstacle.pos[1])
+    spatial.get_index(env).update(obstacle, old_bounds)
+    moved = hastar.get_graph(env)
+    assert moved is not graph
+    assert not free_at(moved, 55, 10) and free_at(moved, 85, 10)
+
+
+def test_unclear_segment_is_searched_again(maze):
+    env, goal, start = maze
+    problem = ContinuousNavigation(start, env, goal)
+    caches = hastar.get_caches(env)
+    key = caches.segment_key(start, (120.0, 10.0))
+    # Straight right from the start runs into the first box at x = 70
+    caches.segments.put(key, [(ContinuousNavigation.SPEED, 0)] * 200)
+    assert caches.cached_segment(problem, start, key) is None
+    assert caches.stats()["segment_unclear"] == 1
+
+    caches.segments.put(key, [(ContinuousNavigation.SPEED, 0)] * 20)
+    assert caches.cached_segment(problem, start, key) is not None
+
+
+def test_caches_and_graphs_are_bounded():
+    envs = [density_env(dist = 160)[0] for _ in range(hastar.MAX_ENVS + 2)]
+    first_caches = hastar.get_caches(envs[0])
+    first_graph = hastar.get_graph(envs[0])
+    for env in envs[1:]:
+        hastar.get_caches(env)
+        hastar.get_graph(env)
+    assert len(hastar.ENV_CACHES) == hastar.MAX_ENVS
+    assert len(hastar.GRAPH_CACHE) == hastar.MAX_ENVS
+    assert hastar.get_caches(envs[0]) is not first_caches
+    assert hastar.get_graph(envs[0]) is not first_graph
+
+    segments = hastar.LRUCache(2)
+    for i in range(3):
+        segments.put(i, [(0.5, 0)])
+    assert segments.get(0) is None
+    assert segments.get(2) is not None
+    assert segments.stats()["evictions"] == 1
+
+
+def test_pool_matches_serial(maze, segment_pool):
+    env, goal, start = maze
+    problem = ContinuousNavigation(start, env, goal)
+    moves = hastar.hierarchical_astar_search(problem)
+    hastar.clear_caches()
+    assert hastar.hierarchical_astar_search(problem, pool = segment_pool) == moves
+    assert hastar.get_caches(env).segments.stats()["entries"] > 0
+
+
+def test_pool_restarts_when_obstacles_move(maze, segment_pool):
+    env, goal, start = maze
+    problem = ContinuousNavigation(start, env, goal)
+    hastar.hierarchical_astar_search(problem, pool = segment_pool)
+    workers = segment_pool.pool
+    hastar.clear_caches()
+    hastar.hierarchical_astar_search(problem, pool = segment_pool)
+    assert segment_pool.pool is workers
+
+    obstacle = env[0]
+    old_bounds = obstacle.get_bounds()
+    obstacle.pos = (obstacle.pos[0] - 20, obstacle.pos[1])
+    spatial.get_index(env).update(obstacle, old_bounds)
+    moves = hastar.hierarchical_astar_search(problem, pool = segment_pool)
+    assert segment_pool.pool is not workers
+    hastar.clear_caches()
+    assert moves == hastar.hierarchical_astar_search(problem)
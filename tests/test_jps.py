@@ -0,0 +1,44 @@
+import area, jps, search
+from problem import ContinuousNavigation
+from conftest import replay
+
+
+def walk_clear(problem, moves):
+    x, y = problem.initial_state
+    for move in moves:
+        x += move[0]
+        y += move[1]
+        if problem.collision_at(x, y):
+            return False
+    return True
+
+
+def test_path_reaches_goal_without_collisions(maze):
+    env, goal, start = maze
+    problem = ContinuousNavigation(start, env, goal)
+    moves = jps.jps_search(problem)
+    assert moves
+    assert walk_clear(problem, moves)
+    assert problem.is_goal(replay(start, moves))
+
+
+def test_cost_close_to_optimal(maze):
+    env, goal, start = maze
+    problem = ContinuousNavigation(start, env, goal)
+    search.reset_stats()
+    optimal = search.weighted_astar_search(problem)
+    astar_expansions = search.SEARCH_STATS["expansions"]
+
+    search.reset_stats()
+    moves = jps.jps_search(problem)
+    # Both walk the agent's moves, but on different lattices, so either can be a little shorter
+    assert abs(len(moves) - len(optimal)) <= 0.1 * len(optimal)
+    assert search.SEARCH_STATS["expansions"] < astar_expansions / 10
+
+
+def test_enclosed_goal_has_no_path():
+    goal = area.RectArea((30, 0), (4, 4), "green")
+    walls = [area.RectArea((26, -4), (2, 12), "gray"), area.RectArea((36, -4), (2, 12), "gray"),
+             area.RectArea((26, -6), (12, 2), "gray"), area.RectArea((26, 8), (12, 2), "gray")]
+    problem = ContinuousNavigation((0.0, 0.0), walls, goal)
+    assert jps.jps_search(problem) == []
@@ -0,0 +1,100 @@
+import random
+
+import area, occupancy, spatial
+from problem import ContinuousNavigation
+from conftest import density_env
+
+
+def sample(count, seed = 0):
+    rng = random.Random(seed)
+    return [(rng.uniform(-10, 170), rng.uniform(-30, 100)) for _ in range(count)]
+
+
+def test_conservative(maze):
+    env, _, _ = maze
+    env.append(area.CircleArea((40, 40), 6.3, "gray"))
+    grid = occupancy.OccupancyGrid(env)
+    false_pos, false_neg = grid.mismatches(sample(3000))
+    assert false_neg == 0
+    assert false_pos < 3000 * 0.05
+
+
+def test_matches_exact_away_from_edges(maze):
+    env, _, _ = maze
+    env.append(area.CircleArea((40, 40), 6.3, "gray"))
+    grid = occupancy.OccupancyGrid(env, resolution = 2)
+    cell = 1 / grid.resolution
+    exact = spatial.SpatialIndex(env)
+    checked = 0
+    for x, y in sample(3000, seed = 1):
+        near = {exact.check_collision((x + dx, y + dy)) for dx in (-cell, 0, cell) for dy in (-cell, 0, cell)}
+        if len(near) == 1:
+            assert grid.check_collision((x, y)) == near.pop()
+            checked += 1
+    assert checked > 2000
+
+
+def test_first_collision_is_exact(maze):
+    env, _, _ = maze
+    grid = occupancy.OccupancyGrid(env)
+    box = env[0]
+    assert grid.first_collision(box.get_center()) is box
+    # Just outside the box, inside its conservative border cell
+    outside = (box.pos[0] - 0.1, box.pos[1] + 5)
+    assert grid.first_collision(outside) is None
+
+
+def test_problem_on_grid(maze):
+    env, goal, start = maze
+    grid = occupancy.get_grid(env)
+    exact = ContinuousNavigation(start, env, goal)
+    rastered = ContinuousNavigation(start, grid, goal)
+    for x, y in sample(1000, seed = 2):
+        if exact.collision_at(x, y):
+            assert rastered.collision_at(x, y)
+
+
+def test_shared_until_obstacles_change(maze):
+    env, _, _ = maze
+    grid = occupancy.get_grid(env)
+    assert occupancy.get_grid(env) is grid
+    assert not grid.check_collision((22, 22))
+
+    env.append(area.RectArea((20, 20), (5, 5), "gray"))
+    rebuilt = occupancy.get_grid(env)
+    assert rebuilt is not grid
+    assert rebuilt.check_collision((22, 22))
+
+
+def test_cache_is_bounded():
+    envs = [density_env()[0] for _ in range(occupancy.MAX_GRIDS + 2)]
+    grids = [occupancy.get_grid(env) for env in envs]
+    assert len(occupancy.GRID_CACHE) == occupancy.MAX_GRIDS
+    assert (id(envs[0]), 2) not in occupancy.GRID_CACHE
+    assert occupancy.GRID_CACHE[(id(envs[-1]), 2)] is grids[-1]
+
+
+def test_check_box_is_conservative(maze):
+    env, _, _ = maze
+    grid = occupancy.OccupancyGrid(env)
+    exact = spatial.SpatialIndex(env)
+    boxes = [(x, y, x + 1, y + 1) for x, y in sample(1000, seed = 3)]
+    hits = [box for box in boxes if exact.check_box(box)]
+    assert hits
+    assert all(grid.check_box(box) for box in hits)
+
+
+def test_rebuilt_when_obstacles_move(maze):
+    env, _, _ = maze
+    mover = area.MovingRectArea((20, 20), (5, 5), "gray")
+    env.append(mover)
+    grid = occupancy.get_grid(env)
+    assert grid.check_collision((22, 22))
+
+    old_bounds = mover.get_bounds()
+    mover.pos = (40, 40)
+    spatial.get_index(env).update(mover, old_bounds)
+    moved = occupancy.get_grid(env)
+    assert moved is not grid
+    assert not moved.check_collision((22, 22))
+    assert moved.check_collision((42, 42))
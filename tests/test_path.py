@@ -0,0 +1,57 @@
+import pytest
+
+from path import Path
+
+UP = (0.0, -0.5)
+RIGHT = (0.5, 0.0)
+DIAGONAL = (0.35, 0.35)
+MOVES = [UP] * 3 + [RIGHT] + [DIAGONAL] * 5 + [UP, UP, RIGHT]
+
+
+def test_runs_are_compressed():
+    assert [run[1] for run in Path(MOVES).runs] == [3, 1, 5, 2, 1]
+
+
+def test_matches_list():
+    stored = Path(MOVES)
+    expected = list(MOVES)
+    assert len(stored) == len(expected)
+    assert list(stored) == expected
+    while expected:
+        assert stored.peek() == expected[0]
+        assert stored.pop() == expected.pop(0)
+        assert len(stored) == len(expected)
+        assert list(stored) == expected
+    with pytest.raises(IndexError):
+        stored.pop()
+
+
+@pytest.mark.parametrize("taken", [0, 1, 3, 4, len(MOVES) - 1, len(MOVES)])
+def test_extend_after_pop(taken):
+    stored = Path(MOVES)
+    for _ in range(taken):
+        stored.pop()
+    # Continuing the current run, starting a new one, and repeating the last move
+    stored.extend([RIGHT, RIGHT, UP])
+    expected = MOVES[taken:] + [RIGHT, RIGHT, UP]
+    assert len(stored) == len(expected)
+    assert stored.to_list() == expected
+    assert [stored.pop() for _ in range(len(expected))] == expected
+
+
+def test_append_to_current_run():
+    stored = Path([UP, UP])
+    stored.pop()
+    stored.append(UP)
+    assert stored.to_list() == [UP, UP]
+    assert stored.pop() == UP
+    assert stored.pop() == UP
+    assert len(stored) == 0
+
+
+def test_empty():
+    stored = Path()
+    assert len(stored) == 0
+    assert list(stored) == []
+    with pytest.raises(IndexError):
+        stored.peek()
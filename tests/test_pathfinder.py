@@ -0,0 +1,155 @@
+import asyncio
+import functools
+import time
+import pytest
+
+import area, pathfinder, search, spatial
+from conftest import replay
+from problem import ContinuousNavigation
+
+STARTS = [(10.0, 10.0), (12.0, 30.0), (5.0, 50.0)]
+
+
+def request_all(pather, env, goal, starts = STARTS):
+    for index, start in enumerate(starts):
+        pather.queue_path(index, ContinuousNavigation(start, env, goal))
+    if pather.workers is None:
+        while pather.busy():
+            pather.pop_queue()
+    else:
+        pather.wait()
+    return [pather.complete[index].to_list() for index in range(len(starts))]
+
+
+@pytest.fixture
+def pool_pather():
+    pather = pathfinder.Pathfinder(search.default_search, workers = 1)
+    yield pather
+    pather.close()
+
+
+def test_workers_match_main_thread(maze, pool_pather):
+    env, goal, _ = maze
+    expected = request_all(pathfinder.Pathfinder(search.default_search), env, goal)
+
+    search.reset_stats()
+    assert request_all(pool_pather, env, goal) == expected
+    # Worker statistics are merged back
+    assert search.SEARCH_STATS["searches"] == len(STARTS)
+
+
+def test_pool_restarts_when_obstacles_change(maze, pool_pather):
+    env, goal, _ = maze
+    request_all(pool_pather, env, goal, STARTS[:1])
+    pool = pool_pather.pool
+    request_all(pool_pather, env, goal, STARTS[:1])
+    assert pool_pather.pool is pool
+
+    env.append(area.RectArea((20, 0), (4, 30), "gray"))
+    moved = request_all(pool_pather, env, goal, STARTS[:1])
+    assert pool_pather.pool is not pool
+    assert moved == request_all(pathfinder.Pathfinder(search.default_search), env, goal, STARTS[:1])
+
+
+def test_frame_budget_matches_one_shot(maze):
+    env, goal, _ = maze
+    expected = request_all(pathfinder.Pathfinder(search.default_search), env, goal)
+
+    pather = pathfinder.Pathfinder(search.default_search, frame_budget = 1_000_000)
+    for index, start in enumerate(STARTS):
+        pather.queue_path(index, ContinuousNavigation(start, env, goal))
+    frames = 0
+    while pather.busy():
+        pather.pop_queue()
+        frames += 1
+    assert frames > 1
+    assert [pather.complete[index].to_list() for index in range(len(STARTS))] == expected
+
+
+def test_frame_budget_slices_the_given_method():
+    pather = pathfinder.Pathfinder(functools.partial(search.weighted_astar_search, w = 2), frame_budget = 1_000_000)
+    assert pather.incremental.func is search.incremental_weighted_astar_search
+    with pytest.raises(ValueError):
+        pathfinder.Pathfinder(search.greedy_search, frame_budget = 1_000_000)
+
+
+def test_identical_requests_share_one_search(maze):
+    env, goal, _ = maze
+    pather = pathfinder.Pathfinder(search.default_search)
+    # Same quantized start cell
+    request_all(pather, env, goal, [(10.0, 10.0), (10.05, 10.0), (10.0, 10.0)])
+    stats = pather.stats()
+    assert stats["requests"] == 3
+    assert stats["searches"] == 1
+    assert stats["dedupe_hits"] == 2
+
+    # Finished results answer later identical requests
+    request_all(pather, env, goal, [(10.0, 10.0)])
+    assert pather.stats()["searches"] == 1
+    assert pather.stats()["cache_hits"] == 1
+
+
+def test_new_obstacles_give_new_keys(maze):
+    env, goal, start = maze
+    before = pathfinder.Pathfinder.request_key(ContinuousNavigation(start, env, goal))
+    env.append(area.RectArea((20, 0), (4, 30), "gray"))
+    assert pathfinder.Pathfinder.request_key(ContinuousNavigation(start, env, goal)) != before
+
+
+def test_moved_obstacles_give_new_keys(maze):
+    env, goal, start = maze
+    mover = area.MovingRectArea((20, 20), (5, 5), "gray")
+    env.append(mover)
+    before = pathfinder.Pathfinder.request_key(ContinuousNavigation(start, env, goal))
+    old_bounds = mover.get_bounds()
+    mover.update()
+    spatial.get_index(env).update(mover, old_bounds)
+    assert pathfinder.Pathfinder.request_key(ContinuousNavigation(start, env, goal)) != before
+
+
+def test_unclear_shared_path_is_searched_again():
+    goal = area.RectArea((30, 8), (4, 4), "green")
+    # Bottom edge between the two starts, the first start's straight path passes just under it
+    env = [area.RectArea((15, 10.05), (5, 5), "gray")]
+    starts = [(10.0, 10.0), (10.0, 10.1)]
+    pather = pathfinder.Pathfinder(search.weighted_astar_search)
+    paths = request_all(pather, env, goal, starts)
+    stats = pather.stats()
+    assert stats["unclear"] == 1
+    assert stats["searches"] == 2
+    for start, moves in zip(starts, paths):
+        problem = ContinuousNavigation(start, env, goal)
+        assert problem.path_clear(start, moves)
+        assert problem.is_goal(replay(start, moves))
+
+
+async def plan_all(pather, env, goal, starts):
+    server = asyncio.create_task(pather.serve())
+    longest = 0
+    futures = [pather.plan(ContinuousNavigation(start, env, goal)) for start in starts]
+    last = time.perf_counter()
+    # Heartbeat, serve() must keep yielding while it searches
+    while not all(future.done() for future in futures):
+        await asyncio.sleep(0)
+        now = time.perf_counter()
+        longest = max(longest, now - last)
+        last = now
+    server.cancel()
+    return [future.result().to_list() for future in futures], longest
+
+
+def test_plan_resolves_through_serve(maze):
+    env, goal, _ = maze
+    expected = request_all(pathfinder.Pathfinder(search.weighted_astar_search), env, goal)
+
+    pather = pathfinder.Pathfinder(search.weighted_astar_search)
+    paths, longest = asyncio.run(plan_all(pather, env, goal, STARTS))
+    assert paths == expected
+    assert longest < 0.1
+    assert pather.wakeup is None
+
+
+def test_serve_needs_a_resumable_planner(maze):
+    pather = pathfinder.Pathfinder(search.greedy_search)
+    with pytest.raises(ValueError):
+        asyncio.run(pather.serve())
@@ -0,0 +1,24 @@
+import search
+from problem import ContinuousNavigation, Node
+
+
+def test_nodes_have_no_dict():
+    node = Node((0.0, 0.0))
+    assert not hasattr(node, "__dict__")
+
+
+def test_moves_are_shared(maze):
+    env, goal, start = maze
+    problem = ContinuousNavigation(start, env, goal)
+    first = problem.actions(start)
+    second = problem.actions((start[0] + 1, start[1]))
+    assert len(first) == 8
+    for move in first:
+        assert any(move is other for other in second)
+
+
+def test_heuristic_is_admissible(maze):
+    env, goal, start = maze
+    problem = ContinuousNavigation(start, env, goal)
+    assert problem.h(start) <= len(search.weighted_astar_search(problem))
+    assert problem.h(goal.get_center()) == 0
@@ -0,0 +1,135 @@
+import functools
+import pytest
+
+import agent, area, search
+from problem import ContinuousNavigation
+
+
+def navigation(maze):
+    env, goal, start = maze
+    return ContinuousNavigation(start, env, goal)
+
+
+def walk(problem, moves):
+    """Replays moves from the initial state, returns the end position or None on a collision."""
+    x, y = problem.initial_state
+    for move in moves:
+        x += move[0]
+        y += move[1]
+        if problem.collision_at(x, y):
+            return None
+    return (x, y)
+
+
+@pytest.mark.parametrize("method", [search.astar_search, search.greedy_search, search.weighted_astar_search,
+                                    search.default_search, search.bidirectional_astar_search])
+def test_path_reaches_goal_without_collisions(maze, method):
+    problem = navigation(maze)
+    moves = method(problem)
+    assert moves
+    end = walk(problem, moves)
+    assert end is not None
+    assert problem.is_goal(end)
+
+
+def test_uniform_finds_shortest_path():
+    # Uniform search is exhaustive, keep the room small
+    wall = area.RectArea((4, -5), (1, 8), "gray")
+    problem = ContinuousNavigation((0.0, 0.0), [wall], area.RectArea((7, -1), (2, 2), "green"))
+    uniform = search.uniform_search(problem)
+    assert problem.is_goal(walk(problem, uniform))
+    assert len(uniform) <= len(search.astar_search(problem))
+    assert len(uniform) == len(search.weighted_astar_search(problem))
+
+
+def test_start_at_goal():
+    problem = ContinuousNavigation((1.0, 1.0), [], area.RectArea((0, 0), (2, 2), "green"))
+    assert search.astar_search(problem) == []
+
+
+def test_stats_count_expansions(maze):
+    search.reset_stats()
+    problem = navigation(maze)
+    search.astar_search(problem)
+    first = search.SEARCH_STATS["expansions"]
+    assert search.SEARCH_STATS["searches"] == 1
+    assert first > 0
+
+    # Same problem, same expansions: the closed set never re-expands a state
+    search.astar_search(problem)
+    assert search.SEARCH_STATS["searches"] == 2
+    assert search.SEARCH_STATS["expansions"] == 2 * first
+
+
+def test_quantum_key_merges_drifted_states():
+    problem = ContinuousNavigation((0.0, 0.0), [], None)
+    x = 0.1 + 0.2
+    assert x != 0.3
+    assert problem.key((x, 1.5)) == problem.key((0.3, 1.5))
+    assert problem.key((0.3, 1.5)) != problem.key((0.3 + ContinuousNavigation.QUANTUM, 1.5))
+
+    problem.QUANTUM = None
+    assert problem.key((x, 1.5)) != problem.key((0.3, 1.5))
+
+
+def test_weighted_cost_bound(maze):
+    problem = navigation(maze)
+    optimal = len(search.weighted_astar_search(problem, 1))
+    for w in (1.5, search.DEFAULT_WEIGHT):
+        cost = len(search.weighted_astar_search(problem, w))
+        assert optimal <= cost <= w * optimal
+
+
+def test_weighted_rejects_small_weight(maze):
+    with pytest.raises(ValueError):
+        search.weighted_astar_search(navigation(maze), 0.5)
+
+
+def test_agents_plan_optimal_by_default(maze):
+    env, goal, start = maze
+    assert agent.Agent(start, env, goal).method is search.weighted_astar_search
+
+
+def test_bidirectional_cost_bound(maze):
+    problem = navigation(maze)
+    optimal = len(search.weighted_astar_search(problem))
+    # Meeting states match on the lattice key only, allow that much slack
+    assert len(search.bidirectional_astar_search(problem)) <= optimal * 1.02
+    assert len(search.bidirectional_astar_search(problem, w = 2)) <= 2 * optimal
+
+
+def test_sliced_search_matches_one_shot(maze):
+    problem = navigation(maze)
+    expected = search.default_search(problem)
+
+    paused = search.incremental_default_search(problem)
+    slices = 0
+    while not paused.step(max_expansions = 25):
+        slices += 1
+    assert slices > 0
+    assert paused.path == expected
+
+
+def test_step_after_done_counts_moves_once(maze):
+    search.reset_stats()
+    paused = search.incremental_default_search(navigation(maze))
+    assert paused.step()
+    moves = search.SEARCH_STATS["moves"]
+    expansions = search.SEARCH_STATS["expansions"]
+    assert moves == len(paused.path)
+
+    assert paused.step()
+    assert search.SEARCH_STATS["moves"] == moves
+    assert search.SEARCH_STATS["expansions"] == expansions
+
+
+def test_resumable():
+    assert search.resumable(search.astar_search) is search.incremental_astar_search
+    assert search.resumable(search.default_search) is search.incremental_default_search
+
+    weighted = search.resumable(functools.partial(search.weighted_astar_search, w = 2))
+    assert weighted.func is search.incremental_weighted_astar_search
+    assert weighted.keywords == {"w": 2}
+
+    with pytest.raises(ValueError):
+        search.resumable(search.greedy_search)
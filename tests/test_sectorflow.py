@@ -0,0 +1,35 @@
+import pytest
+
+import agent, flowField, sectorFlow
+
+REGION = (0, 0, 160, 80)
+
+
+def walk(start, env, goal, field):
+    walker = agent.FlowAgent(start, env, goal, field)
+    for steps in range(3000):
+        if walker.update():
+            break
+    assert goal.check_collision(walker.pos)
+    return steps
+
+
+@pytest.mark.parametrize("start", [(10.0, 10.0), (10.0, 60.0), (40.0, 40.0)])
+def test_sector_agents_match_full_field(maze, start):
+    env, goal, _ = maze
+    sectors = sectorFlow.SectorFlowField(goal, env, density = 2, region = REGION, sector_nodes = 10, max_sectors = 4)
+    full = flowField.FlowField(goal, env, density = 2, region = REGION)
+    assert walk(start, env, goal, sectors) <= 1.05 * walk(start, env, goal, full)
+
+    stats = sectors.stats()
+    assert stats["held"] <= 4
+    assert stats["evictions"] > 0
+
+
+def test_sectors_fit_lazily(maze):
+    env, goal, start = maze
+    sectors = sectorFlow.SectorFlowField(goal, env, density = 2, region = REGION, sector_nodes = 10)
+    assert sectors.stats()["builds"] == 0
+    assert sectors.get_move_at(start) != flowField.NO_DIR
+    # The sampled sector and the sectors on its route to the goal, not the whole region
+    assert 0 < sectors.stats()["builds"] < sectors.stats()["sectors"] / 2
@@ -0,0 +1,88 @@
+import random
+
+import area, spatial
+from conftest import density_env
+
+
+def brute_force(env, pos):
+    return any(obstacle.check_collision(pos) for obstacle in env)
+
+
+def test_matches_brute_force(maze):
+    env, _, _ = maze
+    env.append(area.CircleArea((40, 40), 6, "gray"))
+    index = spatial.SpatialIndex(env)
+    rng = random.Random(0)
+    for _ in range(2000):
+        pos = (rng.uniform(-10, 170), rng.uniform(-30, 100))
+        assert index.check_collision(pos) == brute_force(env, pos)
+        hit = index.first_collision(pos)
+        assert hit is None or hit.check_collision(pos)
+    # Points on an edge and a corner of a box
+    box = env[0]
+    assert index.check_collision(box.pos)
+    assert index.check_collision((box.pos[0] + box.size[0], box.pos[1] + 1))
+
+
+def test_small_cells(maze):
+    env, _, _ = maze
+    index = spatial.SpatialIndex(env, cell_size = 3)
+    rng = random.Random(1)
+    for _ in range(500):
+        pos = (rng.uniform(60, 110), rng.uniform(-20, 90))
+        assert index.check_collision(pos) == brute_force(env, pos)
+
+
+def test_insert_and_remove(maze):
+    env, _, _ = maze
+    index = spatial.SpatialIndex(env)
+    box = env[0]
+    inside = box.get_center()
+    index.remove(box)
+    assert not index.check_collision(inside)
+    index.insert(box)
+    assert index.first_collision(inside) is box
+
+
+def test_shared_until_obstacles_change(maze):
+    env, _, _ = maze
+    index = spatial.get_index(env)
+    assert spatial.get_index(env) is index
+    layout = spatial.layout(env)
+
+    env.append(area.RectArea((20, 20), (5, 5), "gray"))
+    rebuilt = spatial.get_index(env)
+    assert rebuilt is not index
+    assert rebuilt.serial != index.serial
+    assert rebuilt.check_collision((22, 22))
+    assert spatial.layout(env) != layout
+
+
+def test_cache_is_bounded():
+    envs = [density_env()[0] for _ in range(spatial.MAX_INDEXES + 2)]
+    indexes = [spatial.get_index(env) for env in envs]
+    assert len(spatial.INDEX_CACHE) == spatial.MAX_INDEXES
+    assert id(envs[0]) not in spatial.INDEX_CACHE
+    # The most recently used environment is kept
+    assert spatial.INDEX_CACHE[id(envs[-1])] is indexes[-1]
+    spatial.get_index(envs[2])
+    spatial.get_index(density_env()[0])
+    assert id(envs[2]) in spatial.INDEX_CACHE
+
+
+def test_update_logs_moves(maze):
+    env, _, _ = maze
+    mover = area.MovingRectArea((20, 20), (5, 5), "gray")
+    env.append(mover)
+    index = spatial.get_index(env)
+    layout = spatial.layout(env)
+
+    old_bounds = mover.get_bounds()
+    mover.pos = (40, 40)
+    index.update(mover, old_bounds)
+    assert not index.check_collision((22, 22))
+    assert index.first_collision((42, 42)) is mover
+    # One box covering where it was and where it went
+    assert index.changes == [(20, 20, 45, 45)]
+    assert spatial.get_index(env) is index
+    assert spatial.layout(env) != layout
@@ -0,0 +1,86 @@
+import json
+import os
+import numpy as np
+
+import hastar, store
+from problem import ContinuousNavigation
+from conftest import density_env
+
+REGION = (0, 0, 160, 80)
+
+
+def field_path(precompute, goal, env):
+    key = precompute.field_key(goal, env, 5, REGION, True)
+    return precompute.entry(key, "flow-" + store.digest(key))
+
+
+def test_field_round_trip(tmp_path, maze):
+    env, goal, _ = maze
+    fitted = store.PrecomputeStore(str(tmp_path)).get_field(goal, env, region = REGION)
+
+    # A new store over the same directory, as a new process would open it
+    precompute = store.PrecomputeStore(str(tmp_path))
+    loaded = precompute.load_field(goal, env, region = REGION)
+    assert loaded is not None
+    assert precompute.stats()["hits"] == 1
+    assert loaded.build_time == 0
+    assert isinstance(loaded.dirs, np.memmap)
+    for name in store.FIELD_ARRAYS:
+        assert np.array_equal(getattr(loaded, name), getattr(fitted, name), equal_nan = True)
+    points = [(12.3, 7.9), (41.0, 33.3), (150.0, 30.0)]
+    assert np.array_equal(loaded.get_moves_at(points), fitted.get_moves_at(points), equal_nan = True)
+
+
+def test_corrupted_entry_is_stale(tmp_path, maze):
+    env, goal, _ = maze
+    precompute = store.PrecomputeStore(str(tmp_path))
+    precompute.get_field(goal, env, region = REGION)
+    path = field_path(precompute, goal, env)
+    with open(os.path.join(path, "meta.json"), "w") as file:
+        file.write("{\"key\": ")
+
+    assert precompute.load_field(goal, env, region = REGION) is None
+    assert precompute.stats()["stale"] == 1
+    assert not os.path.exists(path)
+
+
+def test_entry_under_other_key_is_stale(tmp_path, maze):
+    env, goal, _ = maze
+    precompute = store.PrecomputeStore(str(tmp_path))
+    precompute.get_field(goal, env, region = REGION)
+    path = field_path(precompute, goal, env)
+    meta_path = os.path.join(path, "meta.json")
+    with open(meta_path) as file:
+        meta = json.load(file)
+    meta["key"]["format"] = store.FORMAT - 1
+    with open(meta_path, "w") as file:
+        json.dump(meta, file)
+
+    misses = precompute.stats()["misses"]
+    assert precompute.load_field(goal, env, region = REGION) is None
+    assert precompute.stats()["stale"] == 1
+    # Removed, so the next load is a plain miss
+    assert precompute.load_field(goal, env, region = REGION) is None
+    assert precompute.stats()["misses"] == misses + 1
+
+
+def test_hastar_round_trip(tmp_path, maze):
+    env, goal, start = maze
+    hastar.hierarchical_astar_search(ContinuousNavigation(start, env, goal))
+    caches = hastar.get_caches(env)
+    saved = len(caches.waypoints) + len(caches.segments)
+    assert saved > 0
+    store.PrecomputeStore(str(tmp_path)).save_hastar(env)
+
+    hastar.clear_caches()
+    assert store.PrecomputeStore(str(tmp_path)).load_hastar(env) == saved
+    assert hastar.get_caches(env).segments.entries == caches.segments.entries
+
+
+def test_prune_keeps_newest_environment(tmp_path):
+    precompute = store.PrecomputeStore(str(tmp_path), max_bytes = 1)
+    for dist in (160, 200):
+        env, goal = density_env(dist = dist)
+        precompute.get_field(goal, env, region = REGION)
+    assert precompute.stats()["pruned"] == 1
+    assert os.listdir(str(tmp_path)) == [precompute.env_digest(env)]
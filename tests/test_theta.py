@@ -0,0 +1,36 @@
+import math
+
+import agent, search, theta
+from problem import ContinuousNavigation
+
+
+def test_waypoints_are_in_sight(maze):
+    env, goal, start = maze
+    problem = ContinuousNavigation(start, env, goal)
+    waypoints = theta.theta_star_search(problem)
+    assert waypoints
+    assert problem.is_goal(waypoints[-1])
+    for a, b in zip([start] + waypoints, waypoints):
+        assert theta.line_of_sight(problem, a, b, 0.5)
+
+
+def test_shorter_than_lattice_path(maze):
+    env, goal, start = maze
+    problem = ContinuousNavigation(start, env, goal)
+    waypoints = theta.theta_star_search(problem)
+    length = sum(math.dist(a, b) for a, b in zip([start] + waypoints, waypoints))
+    # Any-angle segments beat the 8 lattice directions
+    optimal = len(search.weighted_astar_search(problem)) * ContinuousNavigation.SPEED
+    assert length <= optimal * 1.01
+    assert len(waypoints) < optimal / 10
+
+
+def test_agent_follows_waypoints_without_collisions(maze):
+    env, goal, start = maze
+    problem = ContinuousNavigation(start, env, goal)
+    walker = agent.ThetaAgent(start, env, goal)
+    for step in range(2000):
+        if walker.update():
+            break
+        assert not problem.collision_at(*walker.pos)
+    assert goal.check_collision(walker.pos)
@@ -0,0 +1,151 @@
+"""
+theta.py
+
+Implements Theta*, an any-angle planner for ContinuousNavigation.
+
+Theta* searches the same kind of grid as JPS, but when a neighbor is in
+line of sight of the current node's parent it is linked straight to that
+parent instead of to the current node. The result is a short list of
+waypoints joined by straight segments at any angle, instead of one
+movement vector per step along the 8 lattice directions.
+
+Line of sight is checked lazily (Lazy Theta*): a neighbor is optimistically
+linked to the parent when generated, and the link is only verified once
+the neighbor is expanded, falling back to its best closed grid neighbor
+if the check fails. This runs one check per expansion instead of one per
+generated neighbor.
+
+Agents following the waypoints must land exactly on each one (see
+agent.ThetaAgent), so a segment is clear whenever its line of sight
+check passes.
+
+Dependencies:
+- problem (ContinuousNavigation problem definition)
+- search (shared search statistics)
+- jps (grid view of the problem)
+"""
+
+import heapq
+import math
+import time
+import search
+from problem import ContinuousNavigation
+from jps import JumpPointGrid
+
+
+def line_of_sight(problem: ContinuousNavigation, a: tuple[float, float], b: tuple[float, float], clearance: float) -> bool:
+    """
+    Returns True if the segment from a to b keeps clearance from every obstacle.
+
+    The segment is sampled every clearance units, and each sample checks a
+    box of half-size clearance, so together the boxes cover the whole segment.
+    """
+    dx = b[0] - a[0]
+    dy = b[1] - a[1]
+    samples = max(1, math.ceil(math.sqrt(dx ** 2 + dy ** 2) / clearance))
+    for i in range(samples + 1):
+        x = a[0] + dx * i / samples
+        y = a[1] + dy * i / samples
+        if problem.index.check_box((x - clearance, y - clearance, x + clearance, y + clearance)):
+            return False
+    return True
+
+
+def theta_star_search(problem: ContinuousNavigation, step: float = 1.0) -> list[tuple[float, float]]:
+    """
+    Implements Theta* Search.
+
+    Args:
+        problem (ContinuousNavigation): Navigation problem.
+        step (float): Grid pitch of the searched nodes. Defaults to 1.0.
+
+    Returns:
+        list[tuple[float, float]]: Waypoints after the start, ending inside the goal area.
+    """
+    start_time = time.perf_counter_ns()
+    search.SEARCH_STATS["searches"] += 1
+
+    if problem.is_goal(problem.initial_state):
+        return []
+
+    grid = JumpPointGrid(problem, step = step)
+    clearance = step / 2
+    start = (0, 0)
+
+    def h(cell) -> float:
+        pos = grid.to_world(cell)
+        goal = problem.goal_state.get_nearest(pos)
+        return math.sqrt((goal[0] - pos[0]) ** 2 + (goal[1] - pos[1]) ** 2)
+
+    def dist(a, b) -> float:
+        return math.sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) * step
+
+    frontier = [(h(start), 0, start)]
+    g_score = {start: 0}
+    came_from = {start: start}
+    closed = set()
+    counter = 1
+    expansions = 0
+    goal = None
+
+    while frontier:
+        _, _, cell = heapq.heappop(frontier)
+        if cell in closed:
+            continue
+
+        # Verify the optimistic link, otherwise relink through the best closed neighbor
+        parent = came_from[cell]
+        if parent != cell and not line_of_sight(problem, grid.to_world(parent), grid.to_world(cell), clearance):
+            best = None
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    other = (cell[0] + dx, cell[1] + dy)
+                    if other == cell or other not in closed:
+                        continue
+                    if dx != 0 and dy != 0 and not (grid.walkable(cell[0] + dx, cell[1]) and grid.walkable(cell[0], cell[1] + dy)):
+                        continue
+                    cost = g_score[other] + dist(other, cell)
+                    if best is None or cost < best:
+                        best = cost
+                        parent = other
+            g_score[cell] = best
+            came_from[cell] = parent
+
+        if grid.is_goal(cell[0], cell[1]):
+            goal = cell
+            break
+        closed.add(cell)
+        expansions += 1
+
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                if dx == 0 and dy == 0:
+                    continue
+                neighbor = (cell[0] + dx, cell[1] + dy)
+                if neighbor in closed or not grid.walkable(neighbor[0], neighbor[1]):
+                    continue
+                # No corner cutting on the grid moves themselves
+                if dx != 0 and dy != 0 and not (grid.walkable(cell[0] + dx, cell[1]) and grid.walkable(cell[0], cell[1] + dy)):
+                    continue
+
+                # Assume the parent can see the neighbor, checked on expansion
+                new_g = g_score[parent] + dist(parent, neighbor)
+
+                if neighbor not in g_score or new_g < g_score[neighbor]:
+                    g_score[neighbor] = new_g
+                    came_from[neighbor] = parent
+                    heapq.heappush(frontier, (new_g + h(neighbor), counter, neighbor))
+                    counter += 1
+
+    waypoints = []
+    if goal is not None:
+        cell = goal
+        while cell != start:
+            waypoints.append(grid.to_world(cell))
+            cell = came_from[cell]
+        waypoints.reverse()
+
+    search.SEARCH_STATS["expansions"] += expansions
+    search.SEARCH_STATS["moves"] += len(waypoints)
+    search.SEARCH_STATS["time"] += time.perf_counter_ns() - start_time
+    return waypoints